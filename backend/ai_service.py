@@ -12,24 +12,28 @@ from openai import OpenAI
 from sqlalchemy import create_engine, text
 import traceback
 
+from rollups import ROLLUP_METRICS
+
 logger = logging.getLogger(__name__)
 
 class AIService:
     """AI智能服务类"""
 
-    def __init__(self, api_key: str, engine=None):
+    def __init__(self, api_key: str, engine=None, analytics=None):
         """
         初始化AI服务
 
         Args:
             api_key: DeepSeek API密钥
             engine: SQLAlchemy数据库引擎
+            analytics: 可选的DuckDB分析引擎，汇总表未覆盖的指标在Arrow镜像上聚合
         """
         self.client = OpenAI(
             api_key=api_key,
             base_url="https://api.deepseek.com"
         )
         self.engine = engine
+        self.analytics = analytics
 
         self.system_prompt = """你是一个专业的B站数据分析助手，名字叫"B站小助手"。你的主要职责是：
 
@@ -82,20 +86,20 @@ class AIService:
             context_parts = []
 
             with self.engine.connect() as conn:
+                # 统计数据读取小时汇总表，避免扫描videos表
                 result = conn.execute(text("""
                     SELECT 
-                        COUNT(*) as total_videos,
-                        AVG(view) as avg_views,
-                        AVG(`like`) as avg_likes,
-                        AVG(coin) as avg_coins,
-                        AVG(share) as avg_shares,
-                        MAX(view) as max_views,
-                        MIN(view) as min_views
-                    FROM videos 
-                    WHERE collected_at >= DATE_SUB(NOW(), INTERVAL 7 DAY)
+                        SUM(video_count) as total_videos,
+                        SUM(total_view) / SUM(video_count) as avg_views,
+                        SUM(total_like) / SUM(video_count) as avg_likes,
+                        SUM(total_coin) / SUM(video_count) as avg_coins,
+                        SUM(total_share) / SUM(video_count) as avg_shares,
+                        MAX(max_view) as max_views
+                    FROM video_rollup_hourly 
+                    WHERE hour >= DATE_FORMAT(DATE_SUB(NOW(), INTERVAL 7 DAY), '%Y-%m-%d %H:00:00')
                 """)).fetchone()
                 
-                if result:
+                if result and result.total_videos:
                     context_parts.append(f"""
 最近7天数据统计：
 - 总视频数：{result.total_videos}
@@ -104,20 +108,20 @@ class AIService:
 - 平均投币数：{int(result.avg_coins):,}
 - 平均分享数：{int(result.avg_shares):,}
 - 最高播放量：{int(result.max_views):,}
-- 最低播放量：{int(result.min_views):,}
 """)
 
                 # 热门分区统计
                 result = conn.execute(text("""
                     SELECT 
                         tname,
-                        COUNT(*) as video_count,
-                        AVG(view) as avg_views,
-                        SUM(view) as total_views
-                    FROM videos 
-                    WHERE collected_at >= DATE_SUB(NOW(), INTERVAL 7 DAY)
-                        AND tname IS NOT NULL
+                        SUM(video_count) as video_count,
+                        SUM(total_view) / SUM(video_count) as avg_views,
+                        SUM(total_view) as total_views
+                    FROM video_rollup_hourly 
+                    WHERE hour >= DATE_FORMAT(DATE_SUB(NOW(), INTERVAL 7 DAY), '%Y-%m-%d %H:00:00')
+                        AND tname <> ''
                     GROUP BY tname
+                    HAVING SUM(video_count) > 0
                     ORDER BY video_count DESC
                     LIMIT 5
                 """)).fetchall()
@@ -298,19 +302,47 @@ class AIService:
 
         try:
             with self.engine.connect() as conn:
-                query = f"""
-                    SELECT 
-                        DATE(collected_at) as date,
-                        COUNT(*) as video_count,
-                        AVG({metric}) as avg_value,
-                        SUM({metric}) as total_value
-                    FROM videos 
-                    WHERE collected_at >= DATE_SUB(NOW(), INTERVAL 7 DAY)
-                    GROUP BY DATE(collected_at)
-                    ORDER BY date
-                """
-
-                result = conn.execute(text(query)).fetchall()
+                if metric in ROLLUP_METRICS:
+                    # 汇总表已有的指标直接读取小时汇总
+                    query = f"""
+                        SELECT 
+                            DATE(hour) as date,
+                            SUM(video_count) as video_count,
+                            SUM(total_{metric}) / SUM(video_count) as avg_value,
+                            SUM(total_{metric}) as total_value
+                        FROM video_rollup_hourly 
+                        WHERE hour >= DATE_FORMAT(DATE_SUB(NOW(), INTERVAL 7 DAY), '%Y-%m-%d %H:00:00')
+                        GROUP BY DATE(hour)
+                        HAVING SUM(video_count) > 0
+                        ORDER BY date
+                    """
+                else:
+                    query = f"""
+                        SELECT 
+                            DATE(collected_at) as date,
+                            COUNT(*) as video_count,
+                            AVG({metric}) as avg_value,
+                            SUM({metric}) as total_value
+                        FROM videos 
+                        WHERE collected_at >= DATE_SUB(NOW(), INTERVAL 7 DAY)
+                        GROUP BY DATE(collected_at)
+                        ORDER BY date
+                    """
+
+                if metric not in ROLLUP_METRICS and self.analytics is not None:
+                    result = self.analytics.query(f"""
+                        SELECT
+                            CAST(collected_at AS DATE) AS date,
+                            COUNT(*) AS video_count,
+                            AVG("{metric}") AS avg_value,
+                            SUM("{metric}") AS total_value
+                        FROM videos
+                        WHERE collected_at >= $since
+                        GROUP BY 1
+                        ORDER BY 1
+                    """, {"since": datetime.now() - timedelta(days=7)})
+                else:
+                    result = conn.execute(text(query)).fetchall()
 
                 if not result:
                     return {"success": False, "error": "暂无数据"}
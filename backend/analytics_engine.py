@@ -0,0 +1,209 @@
+"""
+嵌入式DuckDB分析引擎
+直接在videos表的Arrow镜像上执行聚合查询（相关性矩阵、按分区/发布小时分组、周度统计），
+MySQL仍是唯一的数据源，镜像由VideoArrowMirror增量同步
+"""
+
+import logging
+from collections import Counter, namedtuple
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from arrow_mirror import VideoArrowMirror
+from streaming_analysis import VIEW_HISTOGRAM_EDGES, VideoAnalysisAccumulator
+
+logger = logging.getLogger(__name__)
+
+# 在镜像上补充互动率与发布小时，列名与全量分析一致；
+# 与pandas的clip(lower=1)相同，播放量为NULL时互动率为NULL（GREATEST会忽略NULL）
+ANALYSIS_VIEW_SQL = """
+SELECT *,
+    (danmaku + reply + favorite + coin + share + "like") / CASE WHEN view < 1 THEN 1 ELSE view END
+        AS interaction_rate,
+    hour(pubdate) AS pub_hour
+FROM videos
+"""
+
+# 词云最多使用的标签数
+WORDCLOUD_TAG_LIMIT = 1000
+
+
+class MirrorUnavailable(RuntimeError):
+    """Arrow镜像尚未生成，调用方应改用MySQL"""
+
+
+def _quote(column: str) -> str:
+    return f'"{column}"'
+
+
+class DuckDBAnalytics:
+    """在Arrow镜像上执行SQL聚合的嵌入式分析引擎"""
+
+    def __init__(self, mirror: VideoArrowMirror, threads: Optional[int] = None, memory_limit: Optional[str] = None,
+                 chunksize: int = 50000):
+        """
+        初始化分析引擎
+
+        Args:
+            mirror: videos表的Arrow镜像
+            threads: DuckDB工作线程数
+            memory_limit: DuckDB内存上限，如'1GB'
+            chunksize: 没有标签时按块提取标题关键词的行数，与流式分析的分块一致
+        """
+        import duckdb
+
+        self.mirror = mirror
+        self.chunksize = chunksize
+        self._conn = duckdb.connect(':memory:')
+        if threads:
+            self._conn.execute(f"SET threads = {int(threads)}")
+        if memory_limit:
+            self._conn.execute(f"SET memory_limit = '{memory_limit}'")
+
+    def available(self) -> bool:
+        """镜像是否已经生成；尚未生成时调用方应改用MySQL，镜像由启动与定时任务在后台刷新"""
+        return self.mirror.version() is not None
+
+    def _cursor(self):
+        """
+        每次查询使用独立游标并注册当前镜像为videos视图
+
+        游标可在多个线程间并发使用；注册Arrow表不复制数据，查询直接扫描内存映射的列。
+        镜像不存在时抛出MirrorUnavailable，不在请求中同步全量构建镜像。
+        """
+        table = self.mirror.read_table()
+        if table is None:
+            raise MirrorUnavailable("Arrow镜像尚未生成")
+
+        cursor = self._conn.cursor()
+        cursor.register('videos', table)
+        return cursor
+
+    def query(self, sql: str, params: Optional[Dict[str, Any]] = None) -> List[Any]:
+        """
+        执行查询，返回可按列名取值的行（与SQLAlchemy的Row用法一致）
+
+        Args:
+            sql: DuckDB SQL，命名参数写作$name
+            params: 命名参数
+
+        Returns:
+            List: 结果行
+        """
+        cursor = self._cursor()
+        try:
+            result = cursor.execute(sql, params or {})
+            Row = namedtuple('Row', [column[0] for column in result.description], rename=True)
+            return [Row(*row) for row in result.fetchall()]
+        finally:
+            cursor.close()
+
+    def build_accumulator(self) -> VideoAnalysisAccumulator:
+        """
+        用SQL聚合一次性算出全表分析所需的统计量，结果与流式分析的累加器等价
+
+        Returns:
+            VideoAnalysisAccumulator: 可直接生成analysis_results与图表
+        """
+        accumulator = VideoAnalysisAccumulator()
+        columns = accumulator.columns
+        k = len(columns)
+
+        cursor = self._cursor()
+        try:
+            cursor.execute(f"CREATE OR REPLACE TEMP VIEW analysis AS {ANALYSIS_VIEW_SQL}")
+
+            complete = " AND ".join(f"{_quote(column)} IS NOT NULL" for column in columns)
+            moments = ", ".join(
+                [f"AVG({_quote(column)})" for column in columns] +
+                [f"COVAR_POP({_quote(columns[i])}, {_quote(columns[j])})" for i in range(k) for j in range(i, k)]
+            )
+            row = cursor.execute(f"""
+            SELECT
+                (SELECT COUNT(*) FROM analysis),
+                (SELECT COUNT(view) FROM analysis),
+                (SELECT COALESCE(SUM(view), 0) FROM analysis),
+                (SELECT COUNT(interaction_rate) FROM analysis),
+                (SELECT COALESCE(SUM(interaction_rate), 0) FROM analysis),
+                COUNT(*),
+                {moments}
+            FROM analysis
+            WHERE {complete}
+            """).fetchone()
+
+            (accumulator.count, accumulator.view_count, view_sum,
+             accumulator.interaction_rate_count, rate_sum, accumulator.moment_count) = row[:6]
+            accumulator.view_sum = float(view_sum)
+            accumulator.interaction_rate_sum = float(rate_sum)
+
+            if accumulator.moment_count:
+                accumulator.mean = np.array(row[6:6 + k], dtype=float)
+                covariances = iter(row[6 + k:])
+                for i in range(k):
+                    for j in range(i, k):
+                        value = (next(covariances) or 0.0) * accumulator.moment_count
+                        accumulator.comoment[i, j] = accumulator.comoment[j, i] = value
+
+            bins = len(VIEW_HISTOGRAM_EDGES) - 1
+            width = float(VIEW_HISTOGRAM_EDGES[1] - VIEW_HISTOGRAM_EDGES[0])
+            upper = float(VIEW_HISTOGRAM_EDGES[-1])
+            for bin_index, count in cursor.execute(f"""
+                SELECT LEAST(CAST(FLOOR(LEAST(GREATEST(LOG10(view + 1), 0), {upper}) / {width}) AS INTEGER), {bins - 1}),
+                       COUNT(*)
+                FROM analysis
+                WHERE view IS NOT NULL
+                GROUP BY 1
+            """).fetchall():
+                accumulator.view_histogram[bin_index] = count
+
+            accumulator.tag_counts = Counter(dict(cursor.execute(f"""
+                SELECT tag, COUNT(*) AS count
+                FROM (SELECT TRIM(UNNEST(STRING_SPLIT(tags, ','))) AS tag FROM analysis WHERE tags IS NOT NULL)
+                WHERE tag <> ''
+                GROUP BY tag
+                ORDER BY count DESC
+                LIMIT {WORDCLOUD_TAG_LIMIT}
+            """).fetchall()))
+
+            # 与流式分析一样，没有任何标签时改用标题关键词，按相同的分块逐块提取
+            if not accumulator.tag_counts:
+                result = cursor.execute("SELECT title FROM analysis")
+                while True:
+                    rows = result.fetchmany(self.chunksize)
+                    if not rows:
+                        break
+                    accumulator.add_title_keywords([title for (title,) in rows if title is not None], len(rows))
+
+            accumulator.category_counts = Counter(dict(cursor.execute("""
+                SELECT tname, COUNT(*) FROM analysis WHERE tname IS NOT NULL GROUP BY tname
+            """).fetchall()))
+
+            for hour, count, view_total in cursor.execute("""
+                SELECT pub_hour, COUNT(*), COALESCE(SUM(view), 0)
+                FROM analysis
+                WHERE pub_hour IS NOT NULL
+                GROUP BY pub_hour
+            """).fetchall():
+                accumulator.hour_counts[int(hour)] = count
+                accumulator.hour_view_sums[int(hour)] = float(view_total)
+        finally:
+            cursor.close()
+
+        return accumulator
+
+
+def create_analytics_engine(mirror: Optional[VideoArrowMirror], config: Dict[str, Any],
+                            chunksize: int = 50000) -> Optional[DuckDBAnalytics]:
+    """
+    根据配置创建DuckDB分析引擎，chunksize与流式分析的分块行数一致
+
+    未启用、没有Arrow镜像或未安装duckdb时返回None，调用方回退到MySQL/pandas。
+    """
+    if not config.get('enabled') or mirror is None:
+        return None
+    try:
+        return DuckDBAnalytics(mirror, config.get('threads'), config.get('memory_limit'), chunksize)
+    except ImportError:
+        logger.warning("未安装duckdb，分析查询继续使用MySQL")
+        return None
@@ -0,0 +1,221 @@
+"""
+videos表的Arrow列式镜像
+按updated_at水位增量刷新，定期全量重建以去掉已删除的行，原子替换文件；
+读取时内存映射，多个worker进程共享同一份页缓存
+
+用法:
+    python arrow_mirror.py refresh [--full]
+"""
+
+import argparse
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+VIDEO_SCHEMA = pa.schema([
+    ('bvid', pa.string()),
+    ('title', pa.string()),
+    ('aid', pa.string()),
+    ('author', pa.string()),
+    ('mid', pa.string()),
+    ('view', pa.int64()),
+    ('danmaku', pa.int64()),
+    ('reply', pa.int64()),
+    ('favorite', pa.int64()),
+    ('coin', pa.int64()),
+    ('share', pa.int64()),
+    ('like', pa.int64()),
+    ('duration', pa.int64()),
+    ('pubdate', pa.timestamp('s')),
+    ('tid', pa.int64()),
+    ('tname', pa.string()),
+    ('copyright', pa.int64()),
+    ('tags', pa.string()),
+    ('desc', pa.string()),
+    ('ctime', pa.timestamp('s')),
+    ('collected_at', pa.timestamp('s')),
+    ('updated_at', pa.timestamp('s')),
+])
+
+WATERMARK_KEY = b'updated_at_watermark'
+FULL_REBUILD_KEY = b'full_rebuilt_at'
+
+
+class VideoArrowMirror:
+    """videos表的Arrow IPC镜像文件"""
+
+    def __init__(self, engine, path: str, overlap_seconds: int = 300, full_rebuild_hours: Optional[float] = 24):
+        """
+        初始化镜像
+
+        Args:
+            engine: SQLAlchemy数据库引擎（刷新时读取）
+            path: 镜像文件路径
+            overlap_seconds: 增量刷新时水位回退的秒数，覆盖刷新期间尚未提交的写入事务
+            full_rebuild_hours: 距上次全量重建超过该小时数时，下一次刷新改为全量重建；
+                增量刷新只能看到新增与更新的行，videos表删除的行（如归档的分区）靠全量重建去掉。为空时不自动重建
+        """
+        self.engine = engine
+        self.path = path
+        self.overlap_seconds = overlap_seconds
+        self.full_rebuild_hours = full_rebuild_hours
+        self._table: Optional[pa.Table] = None
+        self._table_version = None
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+
+    def version(self):
+        """镜像文件的版本标识(inode, mtime)，文件不存在时返回None；每次刷新都会替换文件"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns
+
+    def read_table(self) -> Optional[pa.Table]:
+        """
+        内存映射打开镜像，文件未变化时复用已打开的表；镜像不存在时返回None
+
+        表中的列直接引用映射的文件页，不会复制到进程堆内存。
+        """
+        version = self.version()
+        if version is None:
+            return None
+
+        with self._lock:
+            if version != self._table_version:
+                source = pa.memory_map(self.path, 'r')
+                self._table = pa.ipc.open_file(source).read_all()
+                self._table_version = version
+            return self._table
+
+    def to_dataframe(self, columns=None) -> Optional[pd.DataFrame]:
+        """
+        从镜像构造DataFrame，镜像不存在时返回None
+
+        数值列在没有空值时零拷贝引用映射内存，字符串列需要转换为Python对象。
+        """
+        table = self.read_table()
+        if table is None:
+            return None
+        if columns:
+            table = table.select(columns)
+        return table.to_pandas(split_blocks=True, self_destruct=False)
+
+    def _metadata_time(self, key: bytes) -> Optional[datetime]:
+        table = self.read_table()
+        if table is None or not table.schema.metadata or key not in table.schema.metadata:
+            return None
+        return datetime.fromisoformat(table.schema.metadata[key].decode())
+
+    def watermark(self) -> Optional[datetime]:
+        """当前镜像包含的最大updated_at"""
+        return self._metadata_time(WATERMARK_KEY)
+
+    def full_rebuilt_at(self) -> Optional[datetime]:
+        """当前镜像最近一次全量重建的时间"""
+        return self._metadata_time(FULL_REBUILD_KEY)
+
+    def _full_rebuild_due(self) -> bool:
+        if not self.full_rebuild_hours:
+            return False
+        rebuilt_at = self.full_rebuilt_at()
+        return rebuilt_at is None or datetime.now() - rebuilt_at >= timedelta(hours=self.full_rebuild_hours)
+
+    def _fetch(self, since: Optional[datetime]) -> pa.Table:
+        columns = ", ".join(f"`{name}`" for name in VIDEO_SCHEMA.names)
+        sql = f"SELECT {columns} FROM videos"
+        params = {}
+        if since is not None:
+            # 没有updated_at的行无法按水位判断是否变化，每次增量刷新都重新读取
+            sql += " WHERE updated_at >= :since OR updated_at IS NULL"
+            params["since"] = since
+
+        with self.engine.connect() as conn:
+            df = pd.read_sql(text(sql), conn, params=params)
+        # 含NULL的整数列被pandas读成float，按固定schema转换时NaN会转为null
+        return pa.Table.from_pandas(df, schema=VIDEO_SCHEMA, preserve_index=False, safe=False)
+
+    def refresh(self, full: bool = False) -> dict:
+        """
+        刷新镜像：读取updated_at不早于(水位 - overlap)或为NULL的行，按bvid覆盖旧行后原子替换文件；
+        距上次全量重建超过full_rebuild_hours时改为全量重建
+
+        Args:
+            full: 是否全量重建
+
+        Returns:
+            dict: 刷新统计
+        """
+        with self._refresh_lock:
+            current = None if full or self._full_rebuild_due() else self.read_table()
+            watermark = None if current is None else self.watermark()
+            since = watermark - timedelta(seconds=self.overlap_seconds) if watermark else None
+
+            delta = self._fetch(since)
+            if current is not None and since is not None:
+                if delta.num_rows == 0:
+                    return {"mode": "incremental", "changed": 0, "rows": current.num_rows}
+                keep = pc.invert(pc.is_in(current['bvid'], value_set=delta['bvid']))
+                merged = pa.concat_tables([current.filter(keep).cast(VIDEO_SCHEMA), delta])
+                mode = "incremental"
+            else:
+                merged = delta
+                mode = "full"
+
+            merged = merged.sort_by([('collected_at', 'descending'), ('bvid', 'descending')])
+            new_watermark = pc.max(merged['updated_at']).as_py() if merged.num_rows else watermark
+            rebuilt_at = datetime.now() if mode == "full" else self.full_rebuilt_at()
+            metadata = {}
+            if new_watermark:
+                metadata[WATERMARK_KEY] = new_watermark.isoformat().encode()
+            if rebuilt_at:
+                metadata[FULL_REBUILD_KEY] = rebuilt_at.isoformat(timespec='seconds').encode()
+            self._write_atomic(merged.replace_schema_metadata(metadata))
+
+            stats = {"mode": mode, "changed": delta.num_rows, "rows": merged.num_rows}
+            logger.info(f"Arrow镜像刷新完成: {stats}")
+            return stats
+
+    def _write_atomic(self, table: pa.Table):
+        """写入临时文件后rename替换，读取方要么看到旧文件要么看到完整的新文件"""
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        # 不压缩，保证读取方可以直接内存映射列数据
+        with pa.OSFile(tmp_path, 'wb') as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, self.path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="videos表Arrow镜像维护")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    refresh_parser = subparsers.add_parser("refresh", help="刷新镜像")
+    refresh_parser.add_argument("--full", action="store_true", help="全量重建")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    from config import ARROW_MIRROR_CONFIG
+    from database import read_engine
+
+    if args.command == "refresh":
+        mirror = VideoArrowMirror(read_engine, ARROW_MIRROR_CONFIG['path'], ARROW_MIRROR_CONFIG['overlap_seconds'],
+                                  ARROW_MIRROR_CONFIG['full_rebuild_hours'])
+        print(mirror.refresh(full=args.full))
+
+
+if __name__ == "__main__":
+    main()
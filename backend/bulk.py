@@ -0,0 +1,401 @@
+"""
+批量导出/导入模块
+以恒定内存流式导出videos、user_data、users、user_watch_events为zstd压缩的Parquet或NDJSON，
+导入时按批多行upsert，多个表并行，用于迁移或初始化新环境而无需重新爬取。
+
+导入videos时每批在同一事务中计入汇总表与视频总数计数器（并递增数据版本），
+已有视频的collected_at与tname保持不变，updated_at设为导入时间，Arrow镜像下次增量刷新即可读到
+
+用法:
+    python bulk.py export --dir data/export [--format parquet|ndjson] [--tables videos users]
+    python bulk.py import --dir data/export [--tables videos] [--workers 4]
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import text
+from tqdm import tqdm
+
+logger = logging.getLogger(__name__)
+
+# 表名 -> 主键列（导入时不参与ON DUPLICATE KEY UPDATE）
+BULK_TABLES: Dict[str, List[str]] = {
+    'videos': ['bvid'],
+    'users': ['id'],
+    'user_data': ['id', 'created_at'],
+    'user_watch_events': ['user_mid', 'view_at', 'bvid'],
+}
+
+# 导入时覆盖已有行也保持不变的列：汇总表按视频首次采集的时段与分区分桶
+BULK_KEEP_COLUMNS: Dict[str, List[str]] = {
+    'videos': ['collected_at', 'tname'],
+}
+
+# 导入时设为当前时间的列：Arrow镜像按updated_at水位增量刷新
+BULK_TOUCH_COLUMNS: Dict[str, str] = {
+    'videos': 'updated_at',
+}
+
+# 为NULL时用导入时间填充的列：汇总表与游标分页依赖采集时间
+BULK_DEFAULT_NOW: Dict[str, List[str]] = {
+    'videos': ['collected_at'],
+}
+
+FORMAT_EXTENSIONS = {
+    'parquet': '.parquet',
+    'ndjson': '.ndjson.zst',
+}
+
+# MySQL列类型 -> Arrow类型，未列出的类型按字符串导出
+MYSQL_ARROW_TYPES = {
+    'tinyint': pa.int64(), 'smallint': pa.int64(), 'mediumint': pa.int64(), 'int': pa.int64(),
+    'bigint': pa.int64(), 'year': pa.int64(), 'bit': pa.int64(),
+    'float': pa.float64(), 'double': pa.float64(),
+    'datetime': pa.timestamp('us'), 'timestamp': pa.timestamp('us'), 'date': pa.date32(),
+    'time': pa.duration('us'),
+    'binary': pa.binary(), 'varbinary': pa.binary(), 'tinyblob': pa.binary(), 'blob': pa.binary(),
+    'mediumblob': pa.binary(), 'longblob': pa.binary(),
+}
+
+# NDJSON中时间按字符串保存，导入时按表结构还原，汇总表钩子与upsert拿到的与Parquet导入一致
+NDJSON_TEMPORAL_PARSERS: Dict[str, Callable[[str], Any]] = {
+    'datetime': datetime.fromisoformat, 'timestamp': datetime.fromisoformat, 'date': date.fromisoformat,
+}
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat(sep=' ') if isinstance(value, datetime) else value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, bytes):
+        return value.decode('utf-8', errors='replace')
+    raise TypeError(f"无法序列化的类型: {type(value)}")
+
+
+def _estimated_rows(conn, table: str) -> Optional[int]:
+    """information_schema中的估算行数，仅用于进度条"""
+    return conn.execute(text("""
+    SELECT table_rows FROM information_schema.tables
+    WHERE table_schema = DATABASE() AND table_name = :table
+    """), {"table": table}).scalar()
+
+
+def arrow_schema(columns: List[Dict[str, Any]]) -> pa.Schema:
+    """
+    按表结构生成Parquet的schema，不依赖首批数据（首批某列全为NULL或恰好都是整数时类型不会推断错）
+
+    Args:
+        columns: information_schema.columns中的行（column_name、data_type、column_type、
+            numeric_precision、numeric_scale），按列顺序排列
+
+    Returns:
+        pa.Schema: 导出文件的schema
+    """
+    fields = []
+    for column in columns:
+        data_type = column['data_type'].lower()
+        if data_type == 'decimal':
+            arrow_type = pa.decimal128(int(column['numeric_precision']), int(column['numeric_scale'] or 0))
+        elif data_type == 'bigint' and 'unsigned' in column['column_type'].lower():
+            arrow_type = pa.uint64()
+        else:
+            arrow_type = MYSQL_ARROW_TYPES.get(data_type, pa.string())
+        fields.append(pa.field(column['column_name'], arrow_type))
+    return pa.schema(fields)
+
+
+def temporal_parsers(columns: List[Dict[str, Any]]) -> Dict[str, Callable[[str], Any]]:
+    """
+    表结构中的时间列 -> 把NDJSON中的字符串还原为datetime/date的函数
+
+    Args:
+        columns: information_schema.columns中的行，格式同arrow_schema
+    """
+    parsers = {}
+    for column in columns:
+        parser = NDJSON_TEMPORAL_PARSERS.get(column['data_type'].lower())
+        if parser is not None:
+            parsers[column['column_name']] = parser
+    return parsers
+
+
+def _table_columns(conn, table: str) -> List[Dict[str, Any]]:
+    rows = conn.execute(text("""
+    SELECT column_name, data_type, column_type, numeric_precision, numeric_scale
+    FROM information_schema.columns
+    WHERE table_schema = DATABASE() AND table_name = :table
+    ORDER BY ordinal_position
+    """), {"table": table}).fetchall()
+    return [
+        {
+            "column_name": row[0], "data_type": row[1], "column_type": row[2],
+            "numeric_precision": row[3], "numeric_scale": row[4]
+        }
+        for row in rows
+    ]
+
+
+def _stream_batches(conn, table: str, batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+    """服务端游标逐批读取整张表"""
+    result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(
+        text(f"SELECT * FROM `{table}`")
+    )
+    for partition in result.mappings().partitions(batch_size):
+        yield [dict(row) for row in partition]
+
+
+def export_table(engine, table: str, directory: str, fmt: str, batch_size: int, position: int = 0) -> int:
+    """
+    导出一张表，写入临时文件后重命名
+
+    Args:
+        engine: SQLAlchemy数据库引擎
+        table: 表名
+        directory: 输出目录
+        fmt: parquet或ndjson
+        batch_size: 每批行数
+        position: 进度条位置
+
+    Returns:
+        int: 导出的行数
+    """
+    path = os.path.join(directory, f"{table}{FORMAT_EXTENSIONS[fmt]}")
+    tmp_path = f"{path}.tmp"
+    exported = 0
+
+    with engine.connect() as conn:
+        progress = tqdm(total=_estimated_rows(conn, table), desc=f"export {table}", unit="rows", position=position)
+        if fmt == 'parquet':
+            writer = None
+            schema = arrow_schema(_table_columns(conn, table))
+            try:
+                for rows in _stream_batches(conn, table, batch_size):
+                    if writer is None:
+                        writer = pq.ParquetWriter(tmp_path, schema, compression='zstd')
+                    writer.write_table(pa.Table.from_pylist(rows, schema=schema))
+                    exported += len(rows)
+                    progress.update(len(rows))
+            finally:
+                if writer is not None:
+                    writer.close()
+        else:
+            with pa.output_stream(tmp_path, compression='zstd') as sink:
+                for rows in _stream_batches(conn, table, batch_size):
+                    sink.write("".join(
+                        json.dumps(row, ensure_ascii=False, default=_json_default) + "\n" for row in rows
+                    ).encode('utf-8'))
+                    exported += len(rows)
+                    progress.update(len(rows))
+        progress.close()
+
+    if exported or fmt == 'ndjson':
+        os.replace(tmp_path, path)
+    elif os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    logger.info(f"{table}导出{exported}行到{path}")
+    return exported
+
+
+def _read_parquet(path: str, batch_size: int) -> Iterator[List[Dict[str, Any]]]:
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size):
+        yield batch.to_pylist()
+
+
+def _read_ndjson(path: str, batch_size: int,
+                 parsers: Optional[Dict[str, Callable[[str], Any]]] = None) -> Iterator[List[Dict[str, Any]]]:
+    """逐批读取NDJSON，parsers中的列由字符串还原（见temporal_parsers）"""
+    def parse(line: bytes) -> Dict[str, Any]:
+        row = json.loads(line)
+        for column, parser in (parsers or {}).items():
+            if isinstance(row.get(column), str):
+                row[column] = parser(row[column])
+        return row
+
+    rows = []
+    pending = b''
+    with pa.input_stream(path, compression='zstd') as source:
+        while True:
+            data = source.read(1 << 20)
+            if not data:
+                break
+            lines = (pending + data).split(b'\n')
+            pending = lines.pop()
+            for line in lines:
+                if line.strip():
+                    rows.append(parse(line))
+                    if len(rows) >= batch_size:
+                        yield rows
+                        rows = []
+    if pending.strip():
+        rows.append(parse(pending))
+    if rows:
+        yield rows
+
+
+def _upsert_statement(table: str, columns: List[str], keys: List[str], keep: Optional[List[str]] = None):
+    """
+    多行upsert语句，主键与keep中的列在覆盖已有行时不更新
+
+    pymysql会把executemany改写为单条多行INSERT（按max_allowed_packet自动分段），
+    每批只需一次网络往返。
+    """
+    fixed = set(keys) | set(keep or [])
+    updates = ", ".join(f"`{column}` = VALUES(`{column}`)" for column in columns if column not in fixed)
+    return text(f"""
+    INSERT INTO `{table}` ({', '.join(f'`{column}`' for column in columns)})
+    VALUES ({', '.join(f':{column}' for column in columns)})
+    ON DUPLICATE KEY UPDATE {updates or f'`{keys[0]}` = `{keys[0]}`'}
+    """)
+
+
+def import_table(engine, table: str, path: str, batch_size: int, position: int = 0,
+                 pre_hook: Optional[Callable[[Any, List[Dict[str, Any]]], None]] = None,
+                 isolation_level: Optional[str] = None) -> int:
+    """
+    导入一个导出文件，每批一个事务，按主键upsert，可重复执行
+
+    目标表为空时导入期间关闭唯一性检查；已有数据时保持开启，否则ON DUPLICATE KEY UPDATE
+    可能漏判二级唯一索引上的重复而写入重复行。
+
+    Args:
+        engine: SQLAlchemy数据库引擎
+        table: 表名
+        path: 导出文件路径
+        batch_size: 每批行数
+        position: 进度条位置
+        pre_hook: 每批upsert之前、同一事务中执行的钩子hook(conn, rows)，videos表用于更新汇总表
+        isolation_level: 导入事务的隔离级别
+
+    Returns:
+        int: 导入的行数
+    """
+    ndjson = not path.endswith(FORMAT_EXTENSIONS['parquet'])
+    total = None if ndjson else pq.ParquetFile(path).metadata.num_rows
+
+    keys = BULK_TABLES[table]
+    touch = BULK_TOUCH_COLUMNS.get(table)
+    default_now = BULK_DEFAULT_NOW.get(table, [])
+    statement = None
+    columns = None
+    imported = 0
+
+    progress = tqdm(total=total, desc=f"import {table}", unit="rows", position=position)
+    with engine.connect() as conn:
+        if isolation_level:
+            conn = conn.execution_options(isolation_level=isolation_level)
+        if ndjson:
+            batches = _read_ndjson(path, batch_size, temporal_parsers(_table_columns(conn, table)))
+        else:
+            batches = _read_parquet(path, batch_size)
+        empty = conn.execute(text(f"SELECT 1 FROM `{table}` LIMIT 1")).first() is None
+        # 外键检查始终跳过；唯一性检查只在空表上跳过
+        conn.execute(text(f"SET SESSION unique_checks = {0 if empty else 1}, foreign_key_checks = 0"))
+        conn.commit()
+        try:
+            for rows in batches:
+                if statement is None:
+                    columns = list(rows[0].keys())
+                    columns += [column for column in [touch, *default_now] if column and column not in columns]
+                    statement = _upsert_statement(table, columns, keys, BULK_KEEP_COLUMNS.get(table))
+                params = [{column: row.get(column) for column in columns} for row in rows]
+                if touch or default_now:
+                    now = datetime.now().replace(microsecond=0)
+                    for row in params:
+                        if touch:
+                            row[touch] = now
+                        for column in default_now:
+                            if row.get(column) is None:
+                                row[column] = now
+                with conn.begin():
+                    if pre_hook is not None:
+                        pre_hook(conn, params)
+                    conn.execute(statement, params)
+                imported += len(rows)
+                progress.update(len(rows))
+        finally:
+            conn.execute(text("SET SESSION unique_checks = 1, foreign_key_checks = 1"))
+            conn.commit()
+            progress.close()
+
+    logger.info(f"{table}从{path}导入{imported}行")
+    return imported
+
+
+def run_parallel(tasks: Dict[str, Any], workers: int) -> Dict[str, int]:
+    """每个表一个任务并行执行，返回表名 -> 行数"""
+    stats = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(task, position): table for position, (table, task) in enumerate(tasks.items())}
+        for future in as_completed(futures):
+            table = futures[future]
+            try:
+                stats[table] = future.result()
+            except Exception as e:
+                logger.error(f"{table}处理失败: {str(e)}")
+                stats[table] = -1
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量导出/导入videos、user_data、users等表")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    for name, help_text in (("export", "导出到目录"), ("import", "从目录导入")):
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument("--dir", default="data/export", help="导出文件目录")
+        sub.add_argument("--tables", nargs="+", choices=list(BULK_TABLES), default=list(BULK_TABLES),
+                         help="要处理的表，默认全部")
+        sub.add_argument("--batch-size", type=int, default=10000, help="每批行数")
+        sub.add_argument("--workers", type=int, default=4, help="并行处理的表数")
+        if name == "export":
+            sub.add_argument("--format", choices=list(FORMAT_EXTENSIONS), default="parquet")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    start = time.perf_counter()
+
+    if args.command == "export":
+        from database import engine
+
+        os.makedirs(args.dir, exist_ok=True)
+        tasks = {
+            table: (lambda position, table=table: export_table(
+                engine, table, args.dir, args.format, args.batch_size, position))
+            for table in args.tables
+        }
+    else:
+        # 导入main时会创建全部表结构
+        from config import CRAWLER_CONFIG
+        from main import analytics_system, engine
+
+        # videos按批计入汇总表与计数器，与爬虫写入使用相同的隔离级别
+        hooks = {'videos': analytics_system.rollup_store.apply}
+        tasks = {}
+        for table in args.tables:
+            for extension in FORMAT_EXTENSIONS.values():
+                path = os.path.join(args.dir, f"{table}{extension}")
+                if os.path.exists(path):
+                    tasks[table] = lambda position, table=table, path=path: import_table(
+                        engine, table, path, args.batch_size, position, hooks.get(table),
+                        CRAWLER_CONFIG['sink_isolation_level'] if table in hooks else None)
+                    break
+            else:
+                logger.warning(f"{args.dir}中没有{table}的导出文件，跳过")
+
+    stats = run_parallel(tasks, args.workers)
+    print(json.dumps({"rows": stats, "seconds": round(time.perf_counter() - start, 1)}, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
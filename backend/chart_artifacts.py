@@ -0,0 +1,202 @@
+"""
+分析图表产物模块
+图表在后台的绘图执行器中渲染，按内容哈希命名保存，latest.json指向最新一份；
+分析接口不再等待绘图，图表接口按ETag返回最新产物
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Executor
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "latest.json"
+
+
+class ChartArtifactStore:
+    """按内容哈希保存的图表文件与指向最新产物的清单"""
+
+    def __init__(self, directory: str, prefix: str = "analysis", keep: int = 5):
+        """
+        初始化产物目录
+
+        Args:
+            directory: 产物目录
+            prefix: 文件名前缀
+            keep: 保留的历史产物数量
+        """
+        self.directory = directory
+        self.prefix = prefix
+        self.keep = keep
+        self._manifest_path = os.path.join(directory, MANIFEST_NAME)
+        self._cached_manifest: Optional[Dict[str, Any]] = None
+        self._cached_mtime: Optional[int] = None
+        os.makedirs(directory, exist_ok=True)
+
+    def save(self, png: bytes, source: Optional[str] = None) -> Dict[str, Any]:
+        """
+        保存一份图表并更新清单，内容相同的图表复用同一个文件
+
+        Args:
+            png: PNG字节
+            source: 生成该图表的分析模式等说明
+
+        Returns:
+            Dict: 新的清单
+        """
+        digest = hashlib.sha256(png).hexdigest()[:20]
+        filename = f"{self.prefix}-{digest}.png"
+        path = os.path.join(self.directory, filename)
+        if not os.path.exists(path):
+            self._write_atomic(path, png)
+
+        manifest = {
+            "etag": f'"{digest}"',
+            "file": filename,
+            "size": len(png),
+            "source": source,
+            "rendered_at": datetime.now().isoformat(timespec='seconds')
+        }
+        self._write_atomic(self._manifest_path, json.dumps(manifest, ensure_ascii=False).encode('utf-8'))
+        self._prune(filename)
+        logger.info(f"分析图表已更新: {filename} ({len(png) // 1024}KB)")
+        return manifest
+
+    def latest(self) -> Optional[Dict[str, Any]]:
+        """最新产物的清单（含文件绝对路径），还没有产物时返回None"""
+        try:
+            mtime = os.stat(self._manifest_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        if mtime != self._cached_mtime:
+            with open(self._manifest_path, encoding='utf-8') as f:
+                manifest = json.load(f)
+            manifest["path"] = os.path.join(self.directory, manifest["file"])
+            self._cached_manifest, self._cached_mtime = manifest, mtime
+        return self._cached_manifest
+
+    @staticmethod
+    def _write_atomic(path: str, data: bytes):
+        """写临时文件后重命名，读取方不会看到写了一半的文件"""
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _prune(self, current: str):
+        """按修改时间只保留最近keep份产物"""
+        try:
+            artifacts = [
+                entry for entry in os.scandir(self.directory)
+                if entry.name.startswith(f"{self.prefix}-") and entry.name.endswith(".png") and entry.name != current
+            ]
+            artifacts.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+            for entry in artifacts[max(self.keep - 1, 0):]:
+                os.remove(entry.path)
+        except OSError as e:
+            logger.error(f"清理旧图表失败: {str(e)}")
+
+
+class ChartRenderJob:
+    """
+    后台图表渲染任务
+
+    渲染请求合并执行：渲染进行中再次提交时只保留最新的一份输入，当前渲染结束后接着渲染它。
+    最近一次渲染失败时记录错误，之后查询状态时（间隔至少retry_interval秒）重新提交该次渲染。
+    """
+
+    def __init__(self, store: ChartArtifactStore, executor: Executor, retry_interval: float = 30.0):
+        """
+        Args:
+            store: 图表产物存储
+            executor: 执行渲染的线程池（pyplot需要单线程的绘图执行器）
+            retry_interval: 渲染失败后重新提交的最短间隔秒数
+        """
+        self.store = store
+        self.executor = executor
+        self.retry_interval = retry_interval
+        self._lock = threading.Lock()
+        self._pending = None
+        self._running = False
+        # 最近一次失败的渲染输入、错误信息与失败时间，渲染成功后清空
+        self._failed = None
+        self._last_error: Optional[str] = None
+        self._failed_at: Optional[float] = None
+
+    def submit(self, render: Callable[..., bytes], *args, source: Optional[str] = None):
+        """
+        提交一次渲染，立即返回
+
+        Args:
+            render: 返回PNG字节的绘图函数
+            args: 绘图函数参数
+            source: 记录在清单中的来源说明
+        """
+        self._submit((render, args, source))
+
+    def _submit(self, job):
+        with self._lock:
+            self._pending = job
+            if self._running:
+                return
+            self._running = True
+        try:
+            self.executor.submit(self._drain)
+        except Exception as e:
+            # 执行器已关闭或拒绝任务时，不能停在running状态，否则之后提交的渲染都只会排队
+            logger.error(f"提交图表渲染失败: {str(e)}")
+            with self._lock:
+                self._running, self._pending = False, None
+                self._failed, self._last_error, self._failed_at = job, str(e), time.monotonic()
+
+    @property
+    def pending(self) -> bool:
+        """是否有渲染正在进行或等待执行"""
+        return self._running
+
+    def _drain(self):
+        while True:
+            with self._lock:
+                job, self._pending = self._pending, None
+                if job is None:
+                    self._running = False
+                    return
+            render, args, source = job
+            try:
+                self.store.save(render(*args), source)
+            except Exception as e:
+                logger.error(f"图表渲染失败: {str(e)}")
+                with self._lock:
+                    self._failed, self._last_error, self._failed_at = job, str(e), time.monotonic()
+            else:
+                with self._lock:
+                    self._failed, self._last_error, self._failed_at = None, None, None
+
+    def retry_failed(self) -> bool:
+        """最近一次渲染失败且距失败已超过retry_interval时重新提交，返回是否提交"""
+        with self._lock:
+            job = self._failed
+            if job is None or self._running or time.monotonic() - self._failed_at < self.retry_interval:
+                return False
+            # 重新提交后在下次失败前不再重复提交
+            self._failed = None
+        logger.info("重新提交上次失败的图表渲染")
+        self._submit(job)
+        return True
+
+    def status(self) -> Dict[str, Any]:
+        """最新产物的ETag与渲染状态；上次渲染失败时顺带重新提交"""
+        self.retry_failed()
+        manifest = self.store.latest()
+        return {
+            "etag": manifest["etag"] if manifest else None,
+            "rendered_at": manifest["rendered_at"] if manifest else None,
+            "pending": self.pending,
+            "last_error": self._last_error
+        }
@@ -5,6 +5,7 @@ B站数据分析系统配置文件
 
 import os
 from typing import Dict, Any
+from urllib.parse import quote_plus
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -14,10 +15,24 @@ DB_CONFIG = {
     "port": int(os.getenv("DB_PORT", 3306)),
     "user": os.getenv("DB_USER", "root"),
     "password": os.getenv("DB_PASSWORD", "123456"),
-    "database": os.getenv("DB_NAME", "bilibili_analytics"),
+    "database": os.getenv("DB_NAME", "bilibili_analysis"),
     "charset": "utf8mb4"
 }
 
+# 只读副本连接URL，为空时分析类查询也走主库
+DB_READ_REPLICA_URL = os.getenv("DB_READ_REPLICA_URL", "")
+
+DB_POOL_CONFIG: Dict[str, Any] = {
+    'pool_size': int(os.getenv("DB_POOL_SIZE", 10)),
+    'max_overflow': int(os.getenv("DB_MAX_OVERFLOW", 20)),
+    # 获取连接的最长等待时间(秒)
+    'pool_timeout': 30,
+    # 连接最长存活时间(秒)，需小于MySQL的wait_timeout，避免拿到被服务端关闭的连接
+    'pool_recycle': 1800,
+    # 取出连接时先探活，失效连接自动重建
+    'pool_pre_ping': True
+}
+
 DEEPSEEK_API_KEY = os.getenv("DEEPSEEK_API_KEY", "")
 
 DEFAULT_COOKIE = os.getenv("DEFAULT_COOKIE", "")
@@ -43,15 +58,139 @@ CRAWLER_CONFIG: Dict[str, Any] = {
         "Origin": "https://www.bilibili.com"
     },
 
-    'request_interval': 1.5,
-
     'request_timeout': 10,
 
     'max_retries': 3,
 
+    # 自适应令牌桶限速(请求/秒)：成功时逐步提速，遇到风控(412/-412/-799)时减半
+    'rate_limit': {
+        'rate': 4,
+        'burst': 8,
+        'min_rate': 0.2,
+        'max_rate': 12
+    },
+
+    # 指数退避(秒)与熔断器
+    'backoff_base': 1.0,
+    'backoff_max': 60,
+    'circuit_failure_threshold': 5,
+    'circuit_reset_timeout': 60,
+
+    # 异步爬取引擎的最大并发请求数
+    'concurrency': int(os.getenv("CRAWL_CONCURRENCY", 8)),
+
+    # 视频批量写入：缓冲行数阈值与时间阈值(秒)
+    'sink_batch_size': 100,
+    'sink_flush_interval': 5,
+    # 写入事务的隔离级别：READ COMMITTED下汇总表读取旧统计时不加间隙锁，并发写入不会互相死锁
+    'sink_isolation_level': 'READ COMMITTED',
+
+    # 已抓取过详情的视频在该时间(小时)内直接用热门列表数据刷新统计
+    'detail_refresh_hours': 24,
+
+    # 标签缓存：有效期(小时)与内存层容量
+    'tag_cache_ttl_hours': 24 * 7,
+    'tag_cache_max_entries': 20000,
+
+    # 收藏夹分页的最大并发请求数
+    'favorites_concurrency': 6,
+
+    # 观看历史同步：首次全量回填的页数、增量同步的最大页数与每页条数；
+    # 推荐与用户分析每个用户读取的最近观看记录条数
+    'history_backfill_pages': 10,
+    'history_incremental_pages': 5,
+    'history_page_size': 30,
+    'history_max_items': 1000,
+
     'schedule_interval': 2
 }
 
+REDIS_CONFIG: Dict[str, Any] = {
+    # redis 或 memory(fakeredis，仅单进程内有效，用于测试)
+    'backend': os.getenv("REDIS_BACKEND", "redis"),
+    'host': os.getenv("REDIS_HOST", "localhost"),
+    'port': int(os.getenv("REDIS_PORT", 6379)),
+    'db': int(os.getenv("REDIS_DB", 0)),
+    'password': os.getenv("REDIS_PASSWORD", "")
+}
+
+CRAWL_QUEUE_CONFIG: Dict[str, Any] = {
+    # 开启后定时任务与手动爬取只提交任务，由crawl_worker.py进程消费
+    'enabled': os.getenv("CRAWL_QUEUE_ENABLED", "False").lower() == "true",
+    'namespace': 'crawl',
+    'lease_seconds': 120,
+    'max_attempts': 3,
+    'dedupe_ttl': 6 * 3600,
+    'batch_size': 20,
+    'poll_interval': 2
+}
+
+ARROW_MIRROR_CONFIG: Dict[str, Any] = {
+    # videos表的内存映射Arrow镜像，分析与机器学习接口优先从镜像读取
+    'enabled': os.getenv("ARROW_MIRROR_ENABLED", "True").lower() == "true",
+    'path': os.getenv("ARROW_MIRROR_PATH", "data/videos.arrow"),
+    # 增量刷新时水位回退的秒数，覆盖刷新时尚未提交的写入
+    'overlap_seconds': 300,
+    'refresh_minutes': 10,
+    # 增量刷新看不到被删除的行，每隔该小时数的下一次刷新改为全量重建
+    'full_rebuild_hours': 24
+}
+
+EXECUTOR_CONFIG: Dict[str, Any] = {
+    # 同步数据库/HTTP调用的线程数，应不超过连接池容量(pool_size + max_overflow)
+    'io_workers': int(os.getenv("IO_WORKERS", 24)),
+    # pandas、sklearn等计算任务的线程数
+    'cpu_workers': int(os.getenv("CPU_WORKERS", os.cpu_count() or 4))
+}
+
+RESULT_CACHE_CONFIG: Dict[str, Any] = {
+    # memory：每个worker进程各自缓存；redis：多个worker共享（使用REDIS_CONFIG）
+    'backend': os.getenv("RESULT_CACHE_BACKEND", "memory"),
+    # 数据版本在进程内的缓存秒数，其它进程写入的新数据最多延迟这么久可见
+    'version_ttl': 2,
+    'result_ttl': 24 * 3600
+}
+
+DASHBOARD_CONFIG: Dict[str, Any] = {
+    # 检查数据版本的间隔秒数，有变化时重新计算大屏汇总并推送
+    'poll_seconds': 3,
+    'heartbeat_seconds': 15,
+    'recent_videos': 50,
+    'top_tags': 20,
+    'tag_window_hours': 24
+}
+
+DUCKDB_CONFIG: Dict[str, Any] = {
+    # 在Arrow镜像上用DuckDB执行分析聚合（需启用ARROW_MIRROR_CONFIG并安装duckdb）
+    'enabled': os.getenv("DUCKDB_ENABLED", "False").lower() == "true",
+    'threads': int(os.getenv("DUCKDB_THREADS", 4)),
+    'memory_limit': os.getenv("DUCKDB_MEMORY_LIMIT", "1GB")
+}
+
+PARTITION_CONFIG: Dict[str, Any] = {
+    # 冷分区导出为Parquet的目录
+    'archive_dir': os.getenv("ARCHIVE_DIR", "data/archive"),
+    'future_months': 3,
+    # 按月分区的表：分区列、列类型(datetime/epoch秒)与保留月数（不设置则只分区、不归档），
+    # 需要调整主键的表给出新主键与分区列定义（分区列必须包含在所有唯一键中）
+    'tables': {
+        'video_stat_snapshots': {'column': 'snapshot_at', 'retention_months': 24},
+        'user_watch_events': {'column': 'view_at', 'kind': 'epoch', 'retention_months': 24},
+        # user_data中的user_info、favorites是每个用户的最新状态，不活跃用户唯一的一行可能很旧，
+        # 按月归档会把它删掉，因此只分区、不设保留期
+        'user_data': {
+            'column': 'created_at',
+            'primary_key': ['id', 'created_at'],
+            'column_definition': 'DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP'
+        },
+        'system_logs': {
+            'column': 'created_at', 'retention_months': 6,
+            'primary_key': ['id', 'created_at'],
+            'column_definition': 'DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP'
+        }
+    }
+}
+
 LOGGING_CONFIG: Dict[str, Any] = {
     'level': 'INFO',
     'format': '%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -76,7 +215,10 @@ ANALYSIS_CONFIG: Dict[str, Any] = {
         'figsize': (18, 15),
         'dpi': 300,
         'font_family': 'SimHei',
-        'save_format': 'png'
+        'save_format': 'png',
+        # 后台渲染的图表按内容哈希保存在此目录，latest.json指向最新一份
+        'artifact_dir': 'static/charts',
+        'keep_artifacts': 5
     },
 
     'wordcloud': {
@@ -88,12 +230,16 @@ ANALYSIS_CONFIG: Dict[str, Any] = {
     },
 
     'top_tags_count': 10,
-    'min_hour_videos': 5
+    'min_hour_videos': 5,
+
+    # 视频数超过阈值时/api/analysis/videos改为分块流式分析
+    'streaming_threshold': 500000,
+    'streaming_chunksize': 50000
 }
 
 def get_database_url() -> str:
     """获取数据库连接URL"""
-    return (f"mysql+pymysql://{DB_CONFIG['user']}:{DB_CONFIG['password']}@"
+    return (f"mysql+pymysql://{DB_CONFIG['user']}:{quote_plus(DB_CONFIG['password'])}@"
             f"{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['database']}?charset={DB_CONFIG['charset']}")
 
 def create_directories():
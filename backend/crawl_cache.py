@@ -0,0 +1,192 @@
+"""
+爬虫缓存模块
+记录已抓取过详情的视频，避免重复请求详情与标签接口
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+
+class KnownVideoIndex:
+    """已知视频索引：bvid -> (最近一次详情抓取时间, 标签列表)"""
+
+    def __init__(self, ttl_seconds: float):
+        """
+        初始化索引
+
+        Args:
+            ttl_seconds: 详情有效期，超过后重新抓取详情
+        """
+        self.ttl_seconds = ttl_seconds
+        self.loaded = False
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[str, Tuple[float, List[str]]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def load_from_db(self, engine):
+        """从videos表预热索引，只加载有效期内采集的视频"""
+        since = datetime.now() - timedelta(seconds=self.ttl_seconds)
+        try:
+            with engine.connect() as conn:
+                rows = conn.execute(text("""
+                SELECT bvid, tags, collected_at
+                FROM videos
+                WHERE collected_at >= :since
+                """), {"since": since}).fetchall()
+        except Exception as e:
+            logger.error(f"预热已知视频索引失败: {str(e)}")
+            return
+
+        with self._lock:
+            for row in rows:
+                if row.bvid in self._entries or row.collected_at is None:
+                    continue
+                tags = [tag for tag in (row.tags or "").split(",") if tag]
+                self._entries[row.bvid] = (row.collected_at.timestamp(), tags)
+            self.loaded = True
+
+        logger.info(f"已知视频索引预热完成: {len(rows)}条")
+
+    def get_fresh(self, bvid: str) -> Optional[List[str]]:
+        """返回有效期内的标签列表；视频未知或已过期时返回None"""
+        with self._lock:
+            entry = self._entries.get(bvid)
+            if entry and time.time() - entry[0] < self.ttl_seconds:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            return None
+
+    def record(self, bvid: str, tags: List[str]):
+        """记录一次详情抓取"""
+        with self._lock:
+            self._entries[bvid] = (time.time(), list(tags))
+
+    def prune(self):
+        """清理已过期的条目"""
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            expired = [bvid for bvid, (fetched_at, _) in self._entries.items() if fetched_at < cutoff]
+            for bvid in expired:
+                del self._entries[bvid]
+
+
+class TagCache:
+    """视频标签缓存：以aid为键的持久化缓存，前置LRU内存层"""
+
+    def __init__(self, engine, ttl_seconds: float, max_entries: int = 10000):
+        """
+        初始化标签缓存
+
+        Args:
+            engine: SQLAlchemy数据库引擎
+            ttl_seconds: 标签有效期
+            max_entries: 内存层最多保留的条目数
+        """
+        self.engine = engine
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, int(max_entries))
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+        self._lru: "OrderedDict[int, Tuple[float, List[str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._init_table()
+
+    def _init_table(self):
+        """初始化标签缓存表"""
+        with self.engine.begin() as conn:
+            conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS video_tag_cache (
+                aid BIGINT UNSIGNED PRIMARY KEY,
+                tags TEXT,
+                fetched_at DATETIME NOT NULL,
+                INDEX idx_fetched_at (fetched_at)
+            )
+            """))
+
+    def _remember(self, aid: int, fetched_at: float, tags: List[str]):
+        with self._lock:
+            self._lru[aid] = (fetched_at, tags)
+            self._lru.move_to_end(aid)
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+
+    def get(self, aid: Any) -> Optional[List[str]]:
+        """查询标签，依次查内存层和数据库；未命中或已过期返回None"""
+        try:
+            aid = int(aid)
+        except (TypeError, ValueError):
+            return None
+
+        now = time.time()
+        with self._lock:
+            entry = self._lru.get(aid)
+            if entry and now - entry[0] < self.ttl_seconds:
+                self._lru.move_to_end(aid)
+                self.memory_hits += 1
+                return entry[1]
+
+        try:
+            with self.engine.connect() as conn:
+                row = conn.execute(text("""
+                SELECT tags, fetched_at FROM video_tag_cache WHERE aid = :aid
+                """), {"aid": aid}).fetchone()
+        except Exception as e:
+            logger.error(f"查询标签缓存失败: {str(e)}")
+            row = None
+
+        if row and now - row.fetched_at.timestamp() < self.ttl_seconds:
+            tags = [tag for tag in (row.tags or "").split(",") if tag]
+            self._remember(aid, row.fetched_at.timestamp(), tags)
+            with self._lock:
+                self.db_hits += 1
+            return tags
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, aid: Any, tags: List[str]):
+        """写入标签（内存层与数据库）"""
+        try:
+            aid = int(aid)
+        except (TypeError, ValueError):
+            return
+
+        fetched_at = datetime.now()
+        self._remember(aid, fetched_at.timestamp(), list(tags))
+        try:
+            with self.engine.begin() as conn:
+                conn.execute(text("""
+                INSERT INTO video_tag_cache (aid, tags, fetched_at)
+                VALUES (:aid, :tags, :fetched_at)
+                ON DUPLICATE KEY UPDATE tags=VALUES(tags), fetched_at=VALUES(fetched_at)
+                """), {"aid": aid, "tags": ",".join(tags), "fetched_at": fetched_at})
+        except Exception as e:
+            logger.error(f"写入标签缓存失败: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存命中统计"""
+        with self._lock:
+            lookups = self.memory_hits + self.db_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "db_hits": self.db_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.memory_hits + self.db_hits) / lookups, 4) if lookups else 0.0,
+                "memory_entries": len(self._lru),
+                "memory_capacity": self.max_entries
+            }
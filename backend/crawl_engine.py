@@ -0,0 +1,204 @@
+"""
+异步并发爬取引擎
+基于asyncio + httpx实现热门视频的并发抓取
+"""
+
+import asyncio
+import logging
+import re
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+BASE_URL = "https://api.bilibili.com"
+
+
+class BilibiliAPIError(Exception):
+    """B站接口返回非0业务码"""
+
+
+def extract_tags(detail: Dict[str, Any], tag_items: Optional[List[Dict[str, Any]]] = None) -> List[str]:
+    """从标签接口结果或视频详情中提取标签"""
+    tags = [tag["tag_name"] for tag in (tag_items or []) if tag.get("tag_name")]
+
+    if not tags and "dynamic" in detail:
+        dynamic_text = str(detail.get("dynamic", ""))
+        tags = re.findall(r'#([^#\s]+)#', dynamic_text)
+
+    if not tags and "tname" in detail:
+        tags = [detail["tname"]]
+
+    return tags
+
+
+def build_video_data(detail: Dict[str, Any]) -> Dict[str, Any]:
+    """将视频详情映射为videos表的一行数据"""
+    now = datetime.now()
+    return {
+        "bvid": detail.get("bvid", ""),
+        "title": detail.get("title", ""),
+        "aid": str(detail.get("aid", "")),
+        "author": detail.get("owner", {}).get("name", ""),
+        "mid": str(detail.get("owner", {}).get("mid", "")),
+        "view": detail.get("stat", {}).get("view", 0),
+        "danmaku": detail.get("stat", {}).get("danmaku", 0),
+        "reply": detail.get("stat", {}).get("reply", 0),
+        "favorite": detail.get("stat", {}).get("favorite", 0),
+        "coin": detail.get("stat", {}).get("coin", 0),
+        "share": detail.get("stat", {}).get("share", 0),
+        "like": detail.get("stat", {}).get("like", 0),
+        "duration": detail.get("duration", 0),
+        "pubdate": datetime.fromtimestamp(detail.get("pubdate", 0)) if detail.get("pubdate") else None,
+        "tid": detail.get("tid", 0),
+        "tname": detail.get("tname", ""),
+        "copyright": detail.get("copyright", 0),
+        "tags": ",".join(detail.get("processed_tags", [])),
+        "desc": detail.get("desc", ""),
+        "ctime": datetime.fromtimestamp(detail.get("ctime", 0)) if detail.get("ctime") else None,
+        "collected_at": now,
+        "updated_at": now
+    }
+
+
+class AsyncCrawlEngine:
+    """异步爬取引擎：共享连接池，并发抓取分页与视频详情"""
+
+    def __init__(self, headers: Dict[str, str], concurrency: int = 8,
+                 timeout: float = 10, base_url: str = BASE_URL, tag_cache=None, throttle=None):
+        """
+        初始化爬取引擎
+
+        Args:
+            headers: 请求头
+            concurrency: 同时进行的最大请求数
+            timeout: 单次请求超时时间(秒)
+            base_url: B站API地址
+            tag_cache: 可选的标签缓存(TagCache)，命中时跳过标签接口
+            throttle: 可选的RequestThrottle，负责限速、重试与熔断
+        """
+        self.headers = headers
+        self.tag_cache = tag_cache
+        self.throttle = throttle
+        self.concurrency = max(1, int(concurrency))
+        self.timeout = timeout
+        self.base_url = base_url
+        self.client: Optional[httpx.AsyncClient] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def __aenter__(self):
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers=self.headers,
+            timeout=self.timeout,
+            limits=httpx.Limits(
+                max_connections=self.concurrency,
+                max_keepalive_connections=self.concurrency
+            )
+        )
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.client.aclose()
+        self.client = None
+
+    async def get_json(self, path: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """发起GET请求并解析JSON"""
+        async def request():
+            async with self._semaphore:
+                with metrics.track_request(path):
+                    return await self.client.get(path, params=params)
+
+        if self.throttle is not None:
+            return await self.throttle.run_async(request)
+
+        response = await request()
+        response.raise_for_status()
+        return response.json()
+
+    async def fetch_popular_page(self, page: int) -> List[Dict[str, Any]]:
+        """获取一页热门视频列表；接口返回错误码时抛出BilibiliAPIError，与真正的空页区分"""
+        data = await self.get_json("/x/web-interface/popular", {"pn": page})
+        if data.get("code") != 0:
+            raise BilibiliAPIError(f"第{page}页返回异常: {data.get('message')} (code: {data.get('code')})")
+        return data.get("data", {}).get("list", [])
+
+    async def fetch_tags(self, aid: Any) -> Optional[List[Dict[str, Any]]]:
+        """获取视频标签列表，请求失败或接口返回错误码时返回None"""
+        try:
+            tag_data = await self.get_json("/x/tag/archive/tags", {"aid": aid})
+        except Exception as e:
+            logger.warning(f"获取视频{aid}标签失败: {str(e)}")
+            return None
+        if tag_data.get("code") != 0:
+            logger.warning(f"获取视频{aid}标签返回异常: {tag_data.get('message')} (code: {tag_data.get('code')})")
+            return None
+        return tag_data.get("data", []) or []
+
+    async def get_tags(self, detail: Dict[str, Any], use_cache: bool = True) -> List[str]:
+        """获取视频标签，优先使用标签缓存"""
+        aid = detail.get("aid")
+        if aid is None:
+            return extract_tags(detail)
+
+        if use_cache and self.tag_cache is not None:
+            cached = await asyncio.to_thread(self.tag_cache.get, aid)
+            if cached is not None:
+                return cached
+
+        tag_items = await self.fetch_tags(aid)
+        tags = extract_tags(detail, tag_items)
+        # 请求失败时的降级结果不写入缓存
+        if self.tag_cache is not None and tag_items is not None:
+            await asyncio.to_thread(self.tag_cache.put, aid, tags)
+        return tags
+
+    async def fetch_video_details(self, bvid: str, use_tag_cache: bool = True) -> Optional[Dict[str, Any]]:
+        """获取视频详情及标签；调用方已查过标签缓存时可传use_tag_cache=False"""
+        try:
+            detail_data = await self.get_json("/x/web-interface/view", {"bvid": bvid})
+            if detail_data.get("code") != 0:
+                return None
+
+            detail = detail_data["data"]
+            detail["processed_tags"] = await self.get_tags(detail, use_cache=use_tag_cache)
+            return detail
+
+        except Exception as e:
+            logger.error(f"获取视频{bvid}详情失败: {str(e)}")
+            return None
+
+    async def crawl_popular(self, pages: int,
+                            handle_item: Callable[["AsyncCrawlEngine", Dict[str, Any]], Awaitable[None]]) -> Dict[str, int]:
+        """
+        并发爬取热门视频
+
+        Args:
+            pages: 爬取页数
+            handle_item: 处理单个列表项的协程
+
+        Returns:
+            Dict: 爬取统计
+        """
+        stats = {"pages": 0, "items": 0, "failed_pages": 0}
+
+        async def crawl_page(page: int):
+            try:
+                items = await self.fetch_popular_page(page)
+            except Exception as e:
+                logger.error(f"第{page}页请求失败: {str(e)}")
+                stats["failed_pages"] += 1
+                return
+
+            stats["pages"] += 1
+            metrics.PAGES_FETCHED.labels(source="popular").inc()
+            stats["items"] += len(items)
+            await asyncio.gather(*(handle_item(self, item) for item in items))
+
+        await asyncio.gather(*(crawl_page(page) for page in range(1, pages + 1)))
+        return stats
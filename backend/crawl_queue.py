@@ -0,0 +1,226 @@
+"""
+分布式爬取任务队列
+基于Redis实现任务租约、去重与死信，供多个爬虫worker进程/节点协同消费
+"""
+
+import json
+import logging
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def create_redis_client(config: Dict[str, Any]):
+    """
+    根据配置创建Redis客户端
+
+    backend为memory时使用fakeredis，仅在单进程内共享，用于测试与本地调试。
+    """
+    if config.get('backend') == 'memory':
+        import fakeredis
+        return fakeredis.FakeRedis(decode_responses=True)
+
+    import redis
+    return redis.Redis(
+        host=config['host'],
+        port=config['port'],
+        db=config['db'],
+        password=config.get('password') or None,
+        decode_responses=True
+    )
+
+
+class CrawlQueue:
+    """爬取任务队列：worker租用任务，处理完成后确认，超时未确认的任务重新入队"""
+
+    def __init__(self, redis_client, namespace: str = "crawl", lease_seconds: float = 120,
+                 max_attempts: int = 3, dedupe_ttl: int = 6 * 3600):
+        """
+        初始化任务队列
+
+        Args:
+            redis_client: Redis客户端(decode_responses=True)
+            namespace: 键前缀
+            lease_seconds: 租约时长，超时未确认的任务会被重新分配
+            max_attempts: 最大尝试次数，超过后进入死信队列
+            dedupe_ttl: 去重键的有效期(秒)
+        """
+        self.redis = redis_client
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.dedupe_ttl = dedupe_ttl
+        self.pending_key = f"{namespace}:pending"
+        self.jobs_key = f"{namespace}:jobs"
+        self.leases_key = f"{namespace}:leases"
+        self.owners_key = f"{namespace}:owners"
+        self.dead_key = f"{namespace}:dead"
+        self.dedupe_prefix = f"{namespace}:dedupe:"
+
+    def enqueue(self, kind: str, payload: Dict[str, Any], dedupe_key: Optional[str] = None) -> Optional[str]:
+        """
+        提交任务
+
+        Args:
+            kind: 任务类型
+            payload: 任务参数
+            dedupe_key: 去重键，有效期内重复提交的任务会被忽略
+
+        Returns:
+            Optional[str]: 任务ID；被去重时返回None
+        """
+        if dedupe_key and not self.redis.set(self.dedupe_prefix + dedupe_key, 1, nx=True, ex=self.dedupe_ttl):
+            return None
+
+        job_id = uuid.uuid4().hex
+        job = {"id": job_id, "kind": kind, "payload": payload, "attempts": 0}
+        pipe = self.redis.pipeline()
+        pipe.hset(self.jobs_key, job_id, json.dumps(job, ensure_ascii=False, default=str))
+        pipe.lpush(self.pending_key, job_id)
+        pipe.execute()
+        return job_id
+
+    def lease(self, worker_id: str, count: int = 1) -> List[Dict[str, Any]]:
+        """为worker租用最多count个任务"""
+        jobs = []
+        for _ in range(count):
+            job_id = self.redis.transaction(
+                lambda pipe: self._lease_one(pipe, worker_id),
+                self.pending_key,
+                value_from_callable=True
+            )
+            if job_id is None:
+                break
+
+            raw = self.redis.hget(self.jobs_key, job_id)
+            if raw is None:
+                # 任务体已被清理（例如被其他worker确认），丢弃租约
+                self.redis.zrem(self.leases_key, job_id)
+                self.redis.hdel(self.owners_key, job_id)
+                continue
+            jobs.append(json.loads(raw))
+        return jobs
+
+    def _lease_one(self, pipe, worker_id: str) -> Optional[str]:
+        job_id = pipe.lindex(self.pending_key, -1)
+        if job_id is None:
+            return None
+        pipe.multi()
+        pipe.rpop(self.pending_key)
+        pipe.zadd(self.leases_key, {job_id: time.time() + self.lease_seconds})
+        pipe.hset(self.owners_key, job_id, worker_id)
+        return job_id
+
+    def renew(self, job: Dict[str, Any], worker_id: str) -> bool:
+        """延长租约，长任务处理期间定期调用"""
+        def renew_one(pipe):
+            if pipe.hget(self.owners_key, job["id"]) != worker_id:
+                return False
+            pipe.multi()
+            pipe.zadd(self.leases_key, {job["id"]: time.time() + self.lease_seconds})
+            return True
+
+        return self.redis.transaction(renew_one, self.owners_key, value_from_callable=True)
+
+    def ack(self, job: Dict[str, Any], worker_id: str) -> bool:
+        """确认任务完成；租约已转给其他worker时返回False"""
+        def ack_one(pipe):
+            if pipe.hget(self.owners_key, job["id"]) != worker_id:
+                return False
+            pipe.multi()
+            pipe.zrem(self.leases_key, job["id"])
+            pipe.hdel(self.owners_key, job["id"])
+            pipe.hdel(self.jobs_key, job["id"])
+            return True
+
+        return self.redis.transaction(ack_one, self.owners_key, value_from_callable=True)
+
+    def nack(self, job: Dict[str, Any], worker_id: str, error: str = "") -> bool:
+        """任务失败：未超过最大尝试次数时重新入队，否则进入死信队列"""
+        def nack_one(pipe):
+            if pipe.hget(self.owners_key, job["id"]) != worker_id:
+                return False
+            self._retry_or_bury(pipe, job["id"], error)
+            return True
+
+        return self.redis.transaction(nack_one, self.owners_key, value_from_callable=True)
+
+    def _retry_or_bury(self, pipe, job_id: str, error: str):
+        """在事务中重新入队或转入死信（调用前需处于WATCH状态）"""
+        raw = pipe.hget(self.jobs_key, job_id)
+        pipe.multi()
+        pipe.zrem(self.leases_key, job_id)
+        pipe.hdel(self.owners_key, job_id)
+        if raw is None:
+            return
+
+        job = json.loads(raw)
+        job["attempts"] += 1
+        job["last_error"] = error
+        if job["attempts"] >= self.max_attempts:
+            pipe.hdel(self.jobs_key, job_id)
+            pipe.lpush(self.dead_key, json.dumps(job, ensure_ascii=False, default=str))
+        else:
+            pipe.hset(self.jobs_key, job_id, json.dumps(job, ensure_ascii=False, default=str))
+            pipe.lpush(self.pending_key, job_id)
+
+    def reap_expired(self) -> int:
+        """回收租约超时的任务，返回回收数量"""
+        now = time.time()
+        reaped = 0
+        for job_id in self.redis.zrangebyscore(self.leases_key, 0, now):
+            def reap_one(pipe):
+                score = pipe.zscore(self.leases_key, job_id)
+                if score is None or score > now:
+                    return False
+                self._retry_or_bury(pipe, job_id, "租约超时")
+                return True
+
+            if self.redis.transaction(reap_one, self.leases_key, value_from_callable=True):
+                reaped += 1
+
+        if reaped:
+            logger.warning(f"回收超时任务: {reaped}个")
+        return reaped
+
+    def dead_letters(self, limit: int = 100) -> List[Dict[str, Any]]:
+        """查看死信任务"""
+        return [json.loads(raw) for raw in self.redis.lrange(self.dead_key, 0, limit - 1)]
+
+    def requeue_dead(self) -> int:
+        """将死信任务重新入队"""
+        requeued = 0
+        while True:
+            raw = self.redis.rpop(self.dead_key)
+            if raw is None:
+                break
+            job = json.loads(raw)
+            job["attempts"] = 0
+            pipe = self.redis.pipeline()
+            pipe.hset(self.jobs_key, job["id"], json.dumps(job, ensure_ascii=False, default=str))
+            pipe.lpush(self.pending_key, job["id"])
+            pipe.execute()
+            requeued += 1
+        return requeued
+
+    def stats(self) -> Dict[str, int]:
+        """队列状态，三个计数在一次往返中读取"""
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.llen(self.pending_key)
+        pipe.zcard(self.leases_key)
+        pipe.llen(self.dead_key)
+        pending, leased, dead = pipe.execute()
+        return {"pending": pending, "leased": leased, "dead": dead}
+
+
+def enqueue_popular_crawl(queue: CrawlQueue, pages: int) -> Dict[str, Any]:
+    """协调端：按轮次提交热门列表分页任务，视频任务由worker在处理分页时提交"""
+    round_id = time.strftime("%Y%m%d%H%M%S")
+    enqueued = 0
+    for page in range(1, pages + 1):
+        if queue.enqueue("popular_page", {"page": page, "round_id": round_id},
+                         dedupe_key=f"popular_page:{round_id}:{page}"):
+            enqueued += 1
+    logger.info(f"已提交热门爬取任务: 第{round_id}轮，{enqueued}页")
+    return {"round_id": round_id, "pages": enqueued}
@@ -0,0 +1,141 @@
+"""
+分布式爬虫worker
+从爬取任务队列租用任务并处理，可在多个进程/节点上同时运行
+
+用法:
+    python crawl_worker.py work --worker-id node1-a --metrics-port 9101
+    python crawl_worker.py enqueue --pages 5
+    python crawl_worker.py stats
+    python crawl_worker.py requeue-dead
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import socket
+from typing import Any, Dict, List
+
+from config import CRAWL_QUEUE_CONFIG, REDIS_CONFIG
+from crawl_queue import CrawlQueue, create_redis_client, enqueue_popular_crawl
+
+logger = logging.getLogger(__name__)
+
+
+def create_crawl_queue() -> CrawlQueue:
+    """根据配置创建爬取任务队列"""
+    return CrawlQueue(
+        create_redis_client(REDIS_CONFIG),
+        namespace=CRAWL_QUEUE_CONFIG['namespace'],
+        lease_seconds=CRAWL_QUEUE_CONFIG['lease_seconds'],
+        max_attempts=CRAWL_QUEUE_CONFIG['max_attempts'],
+        dedupe_ttl=CRAWL_QUEUE_CONFIG['dedupe_ttl']
+    )
+
+
+async def keep_leases(queue: CrawlQueue, worker_id: str, jobs: List[Dict[str, Any]], interval: float):
+    """批次处理期间定期续租，避免限速退避或熔断等待超过租约时长后任务被回收并重复处理"""
+    while True:
+        await asyncio.sleep(interval)
+        for job in jobs:
+            if not await asyncio.to_thread(queue.renew, job, worker_id):
+                logger.warning(f"任务{job['id']}的租约已失效，可能被其他worker接手")
+
+
+async def process_batch(analytics_system, crawler, queue: CrawlQueue, worker_id: str,
+                        jobs: List[Dict[str, Any]]):
+    """处理一批任务：视频数据全部落库后再确认，保证任务不丢失"""
+    sink = analytics_system.create_video_sink(batch_size=len(jobs))
+
+    async def handle(job: Dict[str, Any]) -> bool:
+        payload = job["payload"]
+        try:
+            if job["kind"] == "popular_page":
+                items = await crawler.fetch_popular_page(payload["page"])
+                for item in items:
+                    await asyncio.to_thread(
+                        queue.enqueue,
+                        "video",
+                        {"item": item},
+                        f"video:{payload['round_id']}:{item['bvid']}"
+                    )
+                return True
+            if job["kind"] == "video":
+                return await analytics_system.process_video_item_async(crawler, payload["item"], sink)
+            logger.error(f"未知任务类型: {job['kind']}")
+            return False
+        except Exception as e:
+            logger.error(f"处理任务{job['id']}失败: {str(e)}")
+            return False
+
+    renewer = asyncio.create_task(keep_leases(queue, worker_id, jobs, queue.lease_seconds / 3))
+    try:
+        results = await asyncio.gather(*(handle(job) for job in jobs))
+        await asyncio.to_thread(sink.close)
+
+        flush_failed = sink.total_failed > 0
+        for job, ok in zip(jobs, results):
+            if ok and not (flush_failed and job["kind"] == "video"):
+                await asyncio.to_thread(queue.ack, job, worker_id)
+            else:
+                await asyncio.to_thread(queue.nack, job, worker_id, "处理失败")
+    finally:
+        renewer.cancel()
+
+
+async def run_worker(worker_id: str, batch_size: int, poll_interval: float):
+    """worker主循环"""
+    # 延迟导入：复用主服务的爬取流水线（限速器、标签缓存、快照写入等）
+    from main import analytics_system
+
+    queue = create_crawl_queue()
+    await asyncio.to_thread(analytics_system.prepare_video_index)
+    logger.info(f"爬虫worker {worker_id} 已启动")
+
+    async with analytics_system.create_crawl_engine() as crawler:
+        while True:
+            await asyncio.to_thread(queue.reap_expired)
+            jobs = await asyncio.to_thread(queue.lease, worker_id, batch_size)
+            if not jobs:
+                await asyncio.sleep(poll_interval)
+                continue
+            await process_batch(analytics_system, crawler, queue, worker_id, jobs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="B站分布式爬虫worker")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    work_parser = subparsers.add_parser("work", help="启动worker")
+    work_parser.add_argument("--worker-id", default=f"{socket.gethostname()}-{os.getpid()}")
+    work_parser.add_argument("--batch-size", type=int, default=CRAWL_QUEUE_CONFIG['batch_size'])
+    work_parser.add_argument("--poll-interval", type=float, default=CRAWL_QUEUE_CONFIG['poll_interval'])
+    work_parser.add_argument("--metrics-port", type=int, default=None, help="暴露Prometheus指标的端口")
+
+    enqueue_parser = subparsers.add_parser("enqueue", help="提交热门视频爬取任务")
+    enqueue_parser.add_argument("--pages", type=int, default=5)
+
+    subparsers.add_parser("stats", help="查看队列状态")
+    subparsers.add_parser("requeue-dead", help="死信任务重新入队")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.command == "work":
+        if args.metrics_port:
+            from prometheus_client import start_http_server
+            start_http_server(args.metrics_port)
+        asyncio.run(run_worker(args.worker_id, args.batch_size, args.poll_interval))
+        return
+
+    queue = create_crawl_queue()
+    if args.command == "enqueue":
+        print(enqueue_popular_crawl(queue, args.pages))
+    elif args.command == "stats":
+        print(queue.stats())
+    elif args.command == "requeue-dead":
+        print(f"重新入队: {queue.requeue_dead()}个")
+
+
+if __name__ == "__main__":
+    main()
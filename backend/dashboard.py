@@ -0,0 +1,201 @@
+"""
+数据大屏汇总模块
+大屏所需的指标保存在内存中，只在数据版本变化时从汇总表与最近采集的视频重新计算，
+所有请求共享同一份结果；变化的部分通过Server-Sent Events推送给订阅的浏览器
+"""
+
+import asyncio
+import logging
+import threading
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+
+from sqlalchemy import text
+
+from json_response import dumps
+from rollups import VideoRollupStore
+from video_store import list_videos
+
+logger = logging.getLogger(__name__)
+
+
+class DashboardSummary:
+    """内存中的大屏汇总，按数据版本增量刷新"""
+
+    def __init__(self, engine, rollup_store: VideoRollupStore, recent_limit: int = 50,
+                 top_tags: int = 20, tag_window_hours: int = 24):
+        """
+        初始化大屏汇总
+
+        Args:
+            engine: SQLAlchemy数据库引擎（可使用只读副本）
+            rollup_store: 视频汇总表，提供数据版本与写入时维护的聚合
+            recent_limit: 最新视频条数
+            top_tags: 热门标签个数
+            tag_window_hours: 热门标签统计最近多少小时内更新的视频
+        """
+        self.engine = engine
+        self.rollup_store = rollup_store
+        self.recent_limit = recent_limit
+        self.top_tags = top_tags
+        self.tag_window_hours = tag_window_hours
+        self._summary: Optional[Dict[str, Any]] = None
+        self._lock = threading.Lock()
+
+    def snapshot(self) -> Optional[Dict[str, Any]]:
+        """当前汇总，尚未加载时返回None"""
+        return self._summary
+
+    def is_current(self, version: int) -> bool:
+        """汇总是否已是该数据版本的结果；调用方可先在异步连接上读取版本，变化时才刷新"""
+        summary = self._summary
+        return summary is not None and summary["version"] == version
+
+    def refresh_if_changed(self) -> Optional[Dict[str, Any]]:
+        """
+        数据版本变化时重新计算汇总
+
+        Returns:
+            Optional[Dict]: 与上一次相比发生变化的字段（含version），没有变化时返回None
+        """
+        with self._lock:
+            previous = self._summary
+            version = self.rollup_store.data_version()
+            if previous is not None and previous["version"] == version:
+                return None
+
+            summary = self._compute(version)
+            self._summary = summary
+
+        if previous is None:
+            return summary
+        return {
+            key: value for key, value in summary.items()
+            if key in ("version", "updated_at") or value != previous.get(key)
+        }
+
+    def _compute(self, version: int) -> Dict[str, Any]:
+        """从汇总表、计数器与最近采集的视频计算大屏数据，耗时与videos表大小无关"""
+        now = datetime.now()
+        with self.engine.connect() as conn:
+            totals = conn.execute(text("""
+            SELECT COALESCE(SUM(video_count), 0) AS videos, COALESCE(SUM(total_view), 0) AS views,
+                   COALESCE(SUM(total_like + total_coin + total_share), 0) AS interactions
+            FROM video_rollup_daily
+            """)).fetchone()
+
+            categories = conn.execute(text("""
+            SELECT tname, SUM(video_count) AS videos
+            FROM video_rollup_daily
+            WHERE tname <> ''
+            GROUP BY tname
+            ORDER BY videos DESC
+            LIMIT 10
+            """)).fetchall()
+
+            since = (now - timedelta(hours=23)).replace(minute=0, second=0, microsecond=0)
+            hourly = {
+                row.hour: row
+                for row in conn.execute(text("""
+                SELECT hour, SUM(video_count) AS videos, SUM(total_view) AS views,
+                       SUM(total_like + total_coin + total_share) AS interactions
+                FROM video_rollup_hourly
+                WHERE hour >= :since
+                GROUP BY hour
+                """), {"since": since})
+            }
+
+            tag_counter = Counter()
+            for (tags,) in conn.execute(text("""
+            SELECT tags FROM videos
+            WHERE updated_at >= :since AND tags IS NOT NULL
+            ORDER BY updated_at DESC
+            LIMIT 5000
+            """), {"since": now - timedelta(hours=self.tag_window_hours)}):
+                tag_counter.update(tag.strip() for tag in tags.split(',') if tag.strip())
+
+            recent_videos, _ = list_videos(conn, self.recent_limit)
+            total_videos = self.rollup_store.total_videos(conn)
+
+        views = int(totals.views)
+        trend: List[Dict[str, Any]] = []
+        for offset in range(24):
+            hour = since + timedelta(hours=offset)
+            row = hourly.get(hour)
+            trend.append({
+                "hour": hour,
+                "new_videos": int(row.videos) if row else 0,
+                "views": int(row.views) if row else 0,
+                "interactions": int(row.interactions) if row else 0
+            })
+
+        return {
+            "version": version,
+            "updated_at": now,
+            "metrics": {
+                "total_videos": total_videos,
+                "avg_views": int(views / totals.videos) if totals.videos else 0,
+                # 点赞、投币、分享总数与播放总数之比
+                "interaction_rate": float(totals.interactions) / views if views else 0.0
+            },
+            "top_tags": [[tag, count] for tag, count in tag_counter.most_common(self.top_tags)],
+            "categories": [[row.tname, int(row.videos)] for row in categories],
+            "trend": trend,
+            "recent_videos": recent_videos
+        }
+
+
+class DashboardHub:
+    """Server-Sent Events订阅者管理：每个连接一个队列，刷新后把变化推送给所有连接"""
+
+    def __init__(self, heartbeat_seconds: float = 15.0, queue_size: int = 16):
+        self.heartbeat_seconds = heartbeat_seconds
+        self.queue_size = queue_size
+        self._subscribers: Set[asyncio.Queue] = set()
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    @staticmethod
+    def _message(event: str, data: Dict[str, Any]) -> str:
+        return f"event: {event}\ndata: {dumps(data).decode('utf-8')}\n\n"
+
+    def publish(self, delta: Dict[str, Any], summary: Dict[str, Any]):
+        """
+        在事件循环中调用，向所有订阅者推送一次变化
+
+        积压满了的连接丢弃未发送的变化，改为发送一份完整汇总，客户端据此重新同步。
+
+        Args:
+            delta: 变化的字段
+            summary: 当前完整汇总
+        """
+        message = self._message("delta", delta)
+        for queue in list(self._subscribers):
+            if queue.full():
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(self._message("summary", summary))
+            else:
+                queue.put_nowait(message)
+
+    async def stream(self, initial: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """
+        单个连接的事件流：先发送完整汇总，之后推送变化，空闲时发送心跳注释保持连接
+
+        Args:
+            initial: 连接建立时发送的完整汇总
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        try:
+            if initial is not None:
+                yield self._message("summary", initial)
+            while True:
+                try:
+                    yield await asyncio.wait_for(queue.get(), timeout=self.heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+        finally:
+            self._subscribers.discard(queue)
@@ -0,0 +1,59 @@
+"""
+数据库连接模块
+按配置创建主库与只读副本引擎：写入与事务走主库，重量级分析查询走只读副本；
+另提供基于aiomysql的异步引擎，供接口在事件循环上直接访问数据库
+"""
+
+import logging
+
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from config import DB_POOL_CONFIG, DB_READ_REPLICA_URL, get_database_url
+
+logger = logging.getLogger(__name__)
+
+
+def create_db_engine(url: str, **overrides) -> Engine:
+    """
+    使用统一的连接池参数创建引擎
+
+    Args:
+        url: 数据库连接URL
+        **overrides: 覆盖DB_POOL_CONFIG中的参数
+
+    Returns:
+        Engine: SQLAlchemy数据库引擎
+    """
+    return create_engine(url, **{**DB_POOL_CONFIG, **overrides})
+
+
+def create_async_db_engine(url: str, **overrides) -> AsyncEngine:
+    """
+    使用统一的连接池参数创建异步引擎，驱动替换为aiomysql
+
+    Args:
+        url: 数据库连接URL（同步驱动的URL即可）
+        **overrides: 覆盖DB_POOL_CONFIG中的参数
+
+    Returns:
+        AsyncEngine: SQLAlchemy异步引擎
+    """
+    async_url = make_url(url).set(drivername="mysql+aiomysql")
+    return create_async_engine(async_url, **{**DB_POOL_CONFIG, **overrides})
+
+
+# 主库：爬虫写入、用户与认证数据
+engine = create_db_engine(get_database_url())
+
+# 只读副本：未配置时与主库共用同一个引擎
+if DB_READ_REPLICA_URL:
+    read_engine = create_db_engine(DB_READ_REPLICA_URL)
+    logger.info("分析类查询将使用只读副本")
+else:
+    read_engine = engine
+
+# 异步引擎：与同步引擎对应，连接池相互独立
+async_engine = create_async_db_engine(get_database_url())
+async_read_engine = create_async_db_engine(DB_READ_REPLICA_URL) if DB_READ_REPLICA_URL else async_engine
@@ -0,0 +1,55 @@
+"""
+阻塞任务执行模块
+接口处理函数运行在事件循环上，同步数据库、HTTP与文件IO交给有界的IO线程池，
+pandas/sklearn计算交给CPU线程池；pyplot依赖全局状态，所有绘图在单线程的绘图执行器中串行执行
+"""
+
+import asyncio
+import functools
+import logging
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Awaitable, Callable
+
+from config import EXECUTOR_CONFIG
+
+logger = logging.getLogger(__name__)
+
+io_executor = ThreadPoolExecutor(max_workers=EXECUTOR_CONFIG['io_workers'], thread_name_prefix='blocking-io')
+cpu_executor = ThreadPoolExecutor(max_workers=EXECUTOR_CONFIG['cpu_workers'], thread_name_prefix='cpu-bound')
+render_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='chart-render')
+
+
+async def _run_in(executor: Executor, func: Callable, *args, **kwargs) -> Any:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, functools.partial(func, *args, **kwargs))
+
+
+async def run_io(func: Callable, *args, **kwargs) -> Any:
+    """在IO线程池中执行同步的数据库、HTTP或文件操作"""
+    return await _run_in(io_executor, func, *args, **kwargs)
+
+
+async def run_cpu(func: Callable, *args, **kwargs) -> Any:
+    """在CPU线程池中执行计算密集的操作（pandas、sklearn、bcrypt等）"""
+    return await _run_in(cpu_executor, func, *args, **kwargs)
+
+
+async def run_render(func: Callable, *args, **kwargs) -> Any:
+    """在绘图执行器中执行会调用matplotlib.pyplot的操作"""
+    return await _run_in(render_executor, func, *args, **kwargs)
+
+
+def run_coroutine_sync(func: Callable[..., Awaitable], *args, **kwargs) -> Any:
+    """
+    在当前线程的新事件循环中运行协程函数
+
+    用于内部全是同步调用的async方法（如报告与AI服务），配合run_io/run_render放到线程池执行。
+    """
+    return asyncio.run(func(*args, **kwargs))
+
+
+def shutdown_executors():
+    """应用关闭时等待执行中的任务结束"""
+    for executor in (io_executor, cpu_executor, render_executor):
+        executor.shutdown(wait=True, cancel_futures=True)
+    logger.info("阻塞任务线程池已关闭")
@@ -0,0 +1,63 @@
+"""
+JSON序列化模块
+基于orjson的序列化与FastAPI响应类：numpy标量与数组、datetime、Decimal直接序列化，
+DataFrame/Series交给pandas的C序列化器按列编码后原样嵌入，不再构造逐行字典，也无需先递归清理数据
+"""
+
+from decimal import Decimal
+from typing import Any
+
+import numpy as np
+import orjson
+import pandas as pd
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+# DataFrame/Series按pandas生成的JSON片段嵌入，需要orjson>=3.9（见requirements.txt）
+if not hasattr(orjson, "Fragment"):
+    raise ImportError(f"json_response需要orjson>=3.9，当前为{orjson.__version__}，请按requirements.txt安装依赖")
+
+# 原生序列化numpy；允许整数、日期等非字符串键（如按小时分组的统计）
+DUMPS_OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(value: Any) -> Any:
+    """orjson不能直接处理的类型"""
+    if isinstance(value, pd.DataFrame):
+        # 与to_dict('records')输出结构相同，NaN为null，时间为ISO格式
+        return orjson.Fragment(value.to_json(orient='records', date_format='iso', force_ascii=False))
+    if isinstance(value, pd.Series):
+        return orjson.Fragment(value.to_json(orient='values', date_format='iso', force_ascii=False))
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if value is pd.NaT:
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    if isinstance(value, np.ndarray):
+        # 非连续或object类型的数组，orjson无法直接序列化
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    raise TypeError(f"无法序列化的类型: {type(value).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """把响应数据序列化为UTF-8编码的JSON"""
+    return orjson.dumps(content, default=_default, option=DUMPS_OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    使用orjson渲染的JSON响应
+
+    作为应用的默认响应类；接口直接返回FastJSONResponse(content)时还可跳过jsonable_encoder，
+    适合包含DataFrame、numpy数组或大量行的结果。
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
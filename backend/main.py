@@ -1,18 +1,21 @@
 import requests
+from requests.adapters import HTTPAdapter
 import json
 import time
+import random
+import asyncio
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 from wordcloud import WordCloud
 from datetime import datetime, timedelta
-from tqdm import tqdm
 from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 import jieba
 import jieba.analyse
 import re
-from sqlalchemy import create_engine, text, Column, String, Integer, DateTime, Text, DECIMAL
+from sqlalchemy import text, Column, String, Integer, DateTime, Text, DECIMAL
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import pymysql
@@ -22,7 +25,7 @@ import base64
 from io import BytesIO
 from fastapi import FastAPI, HTTPException, BackgroundTasks, Depends, Request, Header
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
 from apscheduler.schedulers.background import BackgroundScheduler
@@ -31,6 +34,29 @@ from ml_models import MLService
 from auth import AuthService
 from ai_service import AIService
 from report_service import ReportService
+from crawl_engine import AsyncCrawlEngine, build_video_data, extract_tags
+from video_store import BufferedVideoSink, VideoSnapshotStore, list_videos_async, upsert_videos
+from crawl_cache import KnownVideoIndex, TagCache
+from rate_limit import RequestThrottle
+from rollups import VideoRollupStore
+from arrow_mirror import VideoArrowMirror
+from partitions import PartitionManager
+from analytics_engine import create_analytics_engine
+from streaming_analysis import (
+    ANALYSIS_COLUMNS, VIEW_HISTOGRAM_EDGES, VideoAnalysisAccumulator,
+    accumulate, add_derived_columns, dataframe_results, iter_arrow_chunks, iter_video_chunks
+)
+import pyarrow.compute as pc
+from user_history import (
+    SyncCursorStore, UserHistoryRepository, WatchEventStore, save_watch_history, sync_watch_history
+)
+import metrics
+from crawl_queue import create_redis_client, enqueue_popular_crawl
+from result_cache import VersionedResultCache
+from chart_artifacts import ChartArtifactStore, ChartRenderJob
+from dashboard import DashboardHub, DashboardSummary
+from json_response import FastJSONResponse
+from crawl_worker import create_crawl_queue
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -55,21 +81,13 @@ def get_chinese_font():
 
 jieba.initialize()
 
-MYSQL_CONFIG = {
-    'host': 'localhost',
-    'user': 'root',
-    'password': 'htlovewql1314',
-    'database': 'bilibili_analysis',
-    'charset': 'utf8mb4'
-}
-
-engine = create_engine(
-    f"mysql+pymysql://{MYSQL_CONFIG['user']}:{MYSQL_CONFIG['password']}@"
-    f"{MYSQL_CONFIG['host']}/{MYSQL_CONFIG['database']}?charset={MYSQL_CONFIG['charset']}"
+from database import async_engine, engine, read_engine
+from executors import render_executor, run_coroutine_sync, run_cpu, run_io, run_render, shutdown_executors
+from config import (
+    DEFAULT_COOKIE, DEEPSEEK_API_KEY, CRAWLER_CONFIG, CRAWL_QUEUE_CONFIG, ARROW_MIRROR_CONFIG, ANALYSIS_CONFIG,
+    PARTITION_CONFIG, DUCKDB_CONFIG, REDIS_CONFIG, RESULT_CACHE_CONFIG, DASHBOARD_CONFIG, validate_config
 )
 
-from config import DEFAULT_COOKIE, DEEPSEEK_API_KEY, validate_config
-
 class CookieRequest(BaseModel):
     cookie: str
 
@@ -118,21 +136,36 @@ class DailyReportRequest(BaseModel):
 class WeeklyReportRequest(BaseModel):
     week_start: Optional[str] = None
 
-app = FastAPI(title="B站数据分析系统", version="1.0.0")
+app = FastAPI(title="B站数据分析系统", version="1.0.0", default_response_class=FastJSONResponse)
 
 ml_service = MLService()
 
 auth_service = AuthService(engine)
 
+# videos表的Arrow镜像与其上的DuckDB分析引擎（均可通过配置关闭）
+video_mirror = VideoArrowMirror(
+    read_engine, ARROW_MIRROR_CONFIG['path'], ARROW_MIRROR_CONFIG['overlap_seconds'],
+    ARROW_MIRROR_CONFIG['full_rebuild_hours']
+) if ARROW_MIRROR_CONFIG['enabled'] else None
+analytics_engine = create_analytics_engine(video_mirror, DUCKDB_CONFIG, ANALYSIS_CONFIG['streaming_chunksize'])
+
 ai_service = AIService(
     api_key=DEEPSEEK_API_KEY,
-    engine=engine
+    engine=read_engine,
+    analytics=analytics_engine
 )
 
-report_service = ReportService(engine=engine)
+report_service = ReportService(engine=read_engine, analytics=analytics_engine)
+
+sync_cursor_store = SyncCursorStore(engine)
+watch_event_store = WatchEventStore(engine)
+user_history_repository = UserHistoryRepository(read_engine, history_limit=CRAWLER_CONFIG['history_max_items'])
 
 security = HTTPBearer(auto_error=False)
 
+# 两个爬虫共享的B站请求限速器
+bilibili_throttle = RequestThrottle.from_config(CRAWLER_CONFIG)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000"],
@@ -152,7 +185,23 @@ class BiliBiliAnalyticsSystem:
         self.session = requests.Session()
         self.session.headers.update(self.headers)
         self.session.encoding = 'utf-8'
+        self.video_index = KnownVideoIndex(ttl_seconds=CRAWLER_CONFIG['detail_refresh_hours'] * 3600)
         self._init_db()
+        self.tag_cache = TagCache(
+            engine,
+            ttl_seconds=CRAWLER_CONFIG['tag_cache_ttl_hours'] * 3600,
+            max_entries=CRAWLER_CONFIG['tag_cache_max_entries']
+        )
+        self.snapshot_store = VideoSnapshotStore(engine)
+        self.rollup_store = VideoRollupStore(engine)
+        self.video_mirror = video_mirror
+        self.analytics = analytics_engine
+        self.chart_job = ChartRenderJob(
+            ChartArtifactStore(ANALYSIS_CONFIG['chart']['artifact_dir'], keep=ANALYSIS_CONFIG['chart']['keep_artifacts']),
+            render_executor
+        )
+        # 本进程写入新视频数据后的回调，参数为本次爬取统计
+        self.ingest_listeners = []
 
     def _init_db(self):
         """初始化数据库表"""
@@ -181,20 +230,37 @@ class BiliBiliAnalyticsSystem:
                     `desc` TEXT,
                     ctime DATETIME,
                     collected_at DATETIME,
+                    updated_at DATETIME,
                     INDEX idx_mid (mid),
                     INDEX idx_pubdate (pubdate),
-                    INDEX idx_tid (tid)
+                    INDEX idx_tid (tid),
+                    INDEX idx_collected_bvid (collected_at, bvid),
+                    INDEX idx_updated_at (updated_at)
                 )
                 """))
 
+                # 已有的videos表补建游标分页索引
+                self._ensure_index(conn, 'videos', 'idx_collected_bvid', '(collected_at, bvid)')
+                # 游标分页与汇总表都依赖采集时间，缺失的用最后更新时间或创建时间补上
+                conn.execute(text("""
+                UPDATE videos SET collected_at = COALESCE(updated_at, ctime, NOW()) WHERE collected_at IS NULL
+                """))
+
+                # 已有的videos表补建最后更新时间列（Arrow镜像增量刷新的水位）
+                self._ensure_column(conn, 'videos', 'updated_at', 'DATETIME')
+                self._ensure_index(conn, 'videos', 'idx_updated_at', '(updated_at)')
+                # 没有updated_at的行每次增量刷新都要重新读取，用采集时间补上
+                conn.execute(text("UPDATE videos SET updated_at = collected_at WHERE updated_at IS NULL"))
+
                 # 创建用户数据表
                 conn.execute(text("""
                 CREATE TABLE IF NOT EXISTS user_data (
-                    id INT AUTO_INCREMENT PRIMARY KEY,
+                    id INT AUTO_INCREMENT,
                     user_mid VARCHAR(20),
                     data_type VARCHAR(50),
                     data_content JSON,
-                    created_at DATETIME,
+                    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (id, created_at),
                     INDEX idx_user_mid (user_mid),
                     INDEX idx_data_type (data_type)
                 )
@@ -205,59 +271,131 @@ class BiliBiliAnalyticsSystem:
             logger.error(f"数据库初始化失败: {str(e)}")
             raise
 
+    def _ensure_index(self, conn, table: str, index: str, columns: str):
+        """索引不存在时创建"""
+        exists = conn.execute(text("""
+        SELECT 1 FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = :table AND index_name = :index
+        LIMIT 1
+        """), {"table": table, "index": index}).fetchone()
+        if not exists:
+            conn.execute(text(f"ALTER TABLE {table} ADD INDEX {index} {columns}"))
+            logger.info(f"已为{table}创建索引{index}")
+
+    def _ensure_column(self, conn, table: str, column: str, definition: str) -> bool:
+        """列不存在时添加，返回是否新增"""
+        exists = conn.execute(text("""
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = :table AND column_name = :column
+        LIMIT 1
+        """), {"table": table, "column": column}).fetchone()
+        if exists:
+            return False
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {definition}"))
+        logger.info(f"已为{table}添加列{column}")
+        return True
+
     def crawl_popular_videos(self, pages=5):
-        """爬取热门视频（移除UP主信息部分）"""
-        for page in tqdm(range(1, pages + 1), desc="爬取热门视频"):
-            try:
-                url = f"{self.base_url}/x/web-interface/popular?pn={page}"
-                response = self.session.get(url, timeout=10)
-                response.encoding = 'utf-8'
-                response.raise_for_status()
-                data = response.json()
+        """爬取热门视频（同步入口，供定时任务与后台任务调用）"""
+        return asyncio.run(self.crawl_popular_videos_async(pages))
+
+    async def crawl_popular_videos_async(self, pages=5):
+        """并发爬取热门视频"""
+        await asyncio.to_thread(self.prepare_video_index)
+        hits_before, misses_before = self.video_index.hits, self.video_index.misses
+
+        async with self.create_crawl_engine() as crawler, self.create_video_sink() as sink:
+            async def handle_item(crawler: AsyncCrawlEngine, item: Dict[str, Any]):
+                await self.process_video_item_async(crawler, item, sink)
 
-                if data.get("code") == 0:
-                    for item in data["data"]["list"]:
-                        self._process_video_item(item)
+            stats = await crawler.crawl_popular(pages, handle_item)
 
-                time.sleep(1.5)
+        stats["written"] = sink.total_written
+        stats["index_hits"] = self.video_index.hits - hits_before
+        stats["index_misses"] = self.video_index.misses - misses_before
+        logger.info(f"热门视频爬取完成: {stats}")
 
-            except requests.exceptions.RequestException as e:
-                logger.error(f"第{page}页请求失败: {str(e)}")
-                time.sleep(5)
+        if sink.total_written:
+            await asyncio.to_thread(self.refresh_video_mirror)
+            self.notify_ingest(stats)
+        return stats
+
+    def notify_ingest(self, stats: Dict[str, Any]):
+        """通知各监听方本进程写入了新数据"""
+        for listener in self.ingest_listeners:
+            try:
+                listener(stats)
             except Exception as e:
-                logger.error(f"第{page}页处理失败: {str(e)}")
-                time.sleep(3)
+                logger.error(f"数据写入回调失败: {str(e)}")
+
+    def prepare_video_index(self):
+        """首次使用时预热已知视频索引，并清理过期条目"""
+        if not self.video_index.loaded:
+            self.video_index.load_from_db(engine)
+        self.video_index.prune()
+
+    def create_crawl_engine(self) -> AsyncCrawlEngine:
+        """创建异步爬取引擎"""
+        return AsyncCrawlEngine(
+            self.headers,
+            concurrency=CRAWLER_CONFIG['concurrency'],
+            timeout=CRAWLER_CONFIG['request_timeout'],
+            base_url=self.base_url,
+            tag_cache=self.tag_cache,
+            throttle=bilibili_throttle
+        )
+
+    def create_video_sink(self, **kwargs) -> BufferedVideoSink:
+        """创建挂载了汇总表更新与快照写入的视频写入器"""
+        options = {
+            'batch_size': CRAWLER_CONFIG['sink_batch_size'],
+            'flush_interval': CRAWLER_CONFIG['sink_flush_interval'],
+            'isolation_level': CRAWLER_CONFIG['sink_isolation_level'],
+            **kwargs
+        }
+        return BufferedVideoSink(
+            engine,
+            pre_hooks=[self.rollup_store.apply],
+            hooks=[self.snapshot_store.write],
+            **options
+        )
+
+    def _get_json(self, url: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """经限速、重试与熔断发起GET请求"""
+        def request():
+            with metrics.track_request(url):
+                response = self.session.get(url, params=params, timeout=CRAWLER_CONFIG['request_timeout'])
+            response.encoding = 'utf-8'
+            return response
+
+        return bilibili_throttle.run(request)
 
     def get_video_details(self, bvid: str) -> Optional[Dict[str, Any]]:
         """获取视频详情"""
         try:
-            detail_url = f"{self.base_url}/x/web-interface/view?bvid={bvid}"
-            detail_res = self.session.get(detail_url, timeout=10)
-            detail_res.encoding = 'utf-8'
-            detail_res.raise_for_status()
-            detail_data = detail_res.json()
+            detail_data = self._get_json(f"{self.base_url}/x/web-interface/view", {"bvid": bvid})
 
             if detail_data.get("code") != 0:
                 return None
 
             detail = detail_data["data"]
 
-            tags = []
-            if "aid" in detail:
-                tag_url = f"{self.base_url}/x/tag/archive/tags?aid={detail['aid']}"
-                tag_res = self.session.get(tag_url, timeout=10)
-                tag_res.encoding = 'utf-8'
-                if tag_res.status_code == 200:
-                    tag_data = tag_res.json()
-                    if tag_data.get("code") == 0:
-                        tags = [tag["tag_name"] for tag in tag_data.get("data", [])]
-
-            if not tags and "dynamic" in detail:
-                dynamic_text = str(detail.get("dynamic", ""))
-                tags = re.findall(r'#([^#\s]+)#', dynamic_text)
-
-            if not tags and "tname" in detail:
-                tags = [detail["tname"]]
+            tags = self.tag_cache.get(detail["aid"]) if "aid" in detail else None
+            if tags is None:
+                tag_items = []
+                tag_fetched = False
+                if "aid" in detail:
+                    try:
+                        tag_data = self._get_json(f"{self.base_url}/x/tag/archive/tags", {"aid": detail['aid']})
+                        if tag_data.get("code") == 0:
+                            tag_items = tag_data.get("data", []) or []
+                            tag_fetched = True
+                    except Exception as e:
+                        logger.warning(f"获取视频{bvid}标签失败: {str(e)}")
+                tags = extract_tags(detail, tag_items)
+                # 只缓存标签接口成功返回的结果，降级得到的标签不写入缓存
+                if tag_fetched:
+                    self.tag_cache.put(detail["aid"], tags)
 
             detail["processed_tags"] = tags
             return detail
@@ -266,226 +404,357 @@ class BiliBiliAnalyticsSystem:
             logger.error(f"获取视频{bvid}详情失败: {str(e)}")
             return None
 
-    def _process_video_item(self, item: Dict[str, Any]):
+    def _process_video_item(self, item: Dict[str, Any], sink: Optional[BufferedVideoSink] = None):
         """处理视频数据并存入MySQL（移除UP主信息处理）"""
+        start = time.perf_counter()
         try:
             detail = self.get_video_details(item["bvid"])
             if not detail:
+                metrics.VIDEOS_FAILED.inc()
                 return
 
-            video_data = {
-                "bvid": detail.get("bvid", ""),
-                "title": detail.get("title", ""),
-                "aid": str(detail.get("aid", "")),
-                "author": detail.get("owner", {}).get("name", ""),
-                "mid": str(detail.get("owner", {}).get("mid", "")),
-                "view": detail.get("stat", {}).get("view", 0),
-                "danmaku": detail.get("stat", {}).get("danmaku", 0),
-                "reply": detail.get("stat", {}).get("reply", 0),
-                "favorite": detail.get("stat", {}).get("favorite", 0),
-                "coin": detail.get("stat", {}).get("coin", 0),
-                "share": detail.get("stat", {}).get("share", 0),
-                "like": detail.get("stat", {}).get("like", 0),
-                "duration": detail.get("duration", 0),
-                "pubdate": datetime.fromtimestamp(detail.get("pubdate", 0)) if detail.get("pubdate") else None,
-                "tid": detail.get("tid", 0),
-                "tname": detail.get("tname", ""),
-                "copyright": detail.get("copyright", 0),
-                "tags": ",".join(detail.get("processed_tags", [])),
-                "desc": detail.get("desc", ""),
-                "ctime": datetime.fromtimestamp(detail.get("ctime", 0)) if detail.get("ctime") else None,
-                "collected_at": datetime.now()
-            }
+            video_data = build_video_data(detail)
+            if sink is not None:
+                sink.add(video_data)
+            else:
+                with engine.execution_options(isolation_level=CRAWLER_CONFIG['sink_isolation_level']).begin() as conn:
+                    self.rollup_store.apply(conn, [video_data])
+                    upsert_videos(conn, [video_data])
+                    self.snapshot_store.write(conn, [video_data])
+                metrics.DB_UPSERTED_ROWS.inc()
+            metrics.VIDEOS_DETAIL.inc()
+            logger.info(f"成功处理视频: {item['bvid']}")
 
-            with engine.begin() as conn:
-                conn.execute(text("""
-                INSERT INTO videos (
-                    bvid, title, aid, author, mid, view, danmaku, reply, 
-                    favorite, coin, share, `like`, duration, pubdate, tid, 
-                    tname, copyright, tags, `desc`, ctime, collected_at
-                ) VALUES (
-                    :bvid, :title, :aid, :author, :mid, :view, 
-                    :danmaku, :reply, :favorite, :coin, :share, 
-                    :like, :duration, :pubdate, :tid, :tname, 
-                    :copyright, :tags, :desc, :ctime, :collected_at
-                )
-                ON DUPLICATE KEY UPDATE 
-                    title=VALUES(title), view=VALUES(view), danmaku=VALUES(danmaku),
-                    reply=VALUES(reply), favorite=VALUES(favorite), coin=VALUES(coin),
-                    share=VALUES(share), `like`=VALUES(`like`), tags=VALUES(tags)
-                """), video_data)
+        except Exception as e:
+            metrics.VIDEOS_FAILED.inc()
+            metrics.record_error(e)
+            logger.error(f"处理视频{item['bvid']}失败: {str(e)}")
+        finally:
+            metrics.VIDEO_PROCESSING.observe(time.perf_counter() - start)
 
+    async def process_video_item_async(self, crawler: AsyncCrawlEngine, item: Dict[str, Any],
+                                       sink: BufferedVideoSink) -> bool:
+        """并发模式下处理单个视频：详情与标签异步获取，写入缓冲区批量入库；返回是否成功"""
+        start = time.perf_counter()
+        try:
+            # 详情刷新周期由已知视频索引单独决定：近期抓取过详情的视频直接用列表中的数据刷新统计，
+            # 沿用已知标签；否则重新请求详情，标签缓存只用于省去标签接口请求
+            tags = self.video_index.get_fresh(item["bvid"])
+            if tags is not None:
+                detail = {**item, "processed_tags": tags}
+                processed = metrics.VIDEOS_CACHED
+            else:
+                detail = await crawler.fetch_video_details(item["bvid"])
+                if not detail:
+                    metrics.VIDEOS_FAILED.inc()
+                    return False
+                self.video_index.record(item["bvid"], detail["processed_tags"])
+                processed = metrics.VIDEOS_DETAIL
+
+            await asyncio.to_thread(sink.add, build_video_data(detail))
+            processed.inc()
             logger.info(f"成功处理视频: {item['bvid']}")
+            return True
 
         except Exception as e:
+            metrics.VIDEOS_FAILED.inc()
+            metrics.record_error(e)
             logger.error(f"处理视频{item['bvid']}失败: {str(e)}")
+            return False
+        finally:
+            metrics.VIDEO_PROCESSING.observe(time.perf_counter() - start)
 
-    def load_data_to_dataframe(self) -> pd.DataFrame:
-        """从MySQL加载数据到DataFrame"""
+    def refresh_video_mirror(self, full: bool = False) -> Optional[Dict[str, Any]]:
+        """增量刷新videos表的Arrow镜像，未启用或失败时返回None"""
+        if self.video_mirror is None:
+            return None
         try:
-            with engine.connect() as conn:
-                df = pd.read_sql("""
-                SELECT 
-                    bvid, title, author, view, danmaku, reply, 
-                    favorite, coin, share, `like`, duration, 
-                    pubdate, tname, tags, `desc`
-                FROM videos
-                ORDER BY collected_at DESC
-                """, conn)
+            return self.video_mirror.refresh(full=full)
+        except Exception as e:
+            logger.error(f"刷新Arrow镜像失败: {str(e)}")
+            return None
 
-            if df.empty:
-                return pd.DataFrame()
+    def load_videos(self, columns: List[str], limit: Optional[int] = None, min_view: Optional[int] = None) -> pd.DataFrame:
+        """
+        按采集时间倒序读取视频数据，优先使用内存映射的Arrow镜像，不可用时查询MySQL
 
-            if 'pubdate' in df:
-                df['pubdate'] = pd.to_datetime(df['pubdate'])
+        Args:
+            columns: 需要的列
+            limit: 最多返回的行数
+            min_view: 只返回播放量大于该值的视频
 
-            interaction_cols = ['danmaku', 'reply', 'favorite', 'coin', 'share', 'like']
-            for col in interaction_cols:
-                if col not in df:
-                    df[col] = 0
+        Returns:
+            pd.DataFrame: 视频数据
+        """
+        if self.video_mirror is not None:
+            try:
+                table = self.video_mirror.read_table()
+                if table is None:
+                    self.refresh_video_mirror()
+                    table = self.video_mirror.read_table()
+                if table is not None:
+                    # 镜像已按collected_at倒序排列
+                    if min_view is not None:
+                        table = table.filter(pc.greater(table['view'], min_view))
+                    if limit is not None:
+                        table = table.slice(0, limit)
+                    return table.select(columns).to_pandas(split_blocks=True)
+            except Exception as e:
+                logger.error(f"读取Arrow镜像失败，改为查询数据库: {str(e)}")
+
+        sql = f"SELECT {', '.join(f'`{column}`' for column in columns)} FROM videos"
+        params = {}
+        if min_view is not None:
+            sql += " WHERE view > :min_view"
+            params["min_view"] = min_view
+        sql += " ORDER BY collected_at DESC"
+        if limit is not None:
+            sql += " LIMIT :limit"
+            params["limit"] = limit
+        with read_engine.connect() as conn:
+            return pd.read_sql(text(sql), conn, params=params)
 
-            df['interaction_rate'] = (
-                df['danmaku'] + df['reply'] + df['favorite'] +
-                df['coin'] + df['share'] + df['like']
-            ) / df['view'].clip(lower=1)
+    def load_data_to_dataframe(self) -> pd.DataFrame:
+        """加载视频数据到DataFrame（Arrow镜像优先，回退到MySQL）"""
+        try:
+            df = self.load_videos(ANALYSIS_COLUMNS)
 
-            if 'pubdate' in df:
-                df['pub_hour'] = df['pubdate'].dt.hour
+            if df.empty:
+                return pd.DataFrame()
 
-            return df
+            return add_derived_columns(df)
 
         except Exception as e:
             logger.error(f"加载数据失败: {str(e)}")
             return pd.DataFrame()
 
     def analyze_and_visualize(self, df: pd.DataFrame) -> Optional[Dict[str, Any]]:
-        """数据分析和可视化"""
+        """数据分析，图表提交到后台渲染，不等待绘图完成"""
         if df.empty:
             return None
 
         try:
-            plt.figure(figsize=(18, 15))
-            plt.rcParams['font.sans-serif'] = ['SimHei']
-            plt.rcParams['axes.unicode_minus'] = False
-            plt.style.use('default')
-            plt.rcParams['text.color'] = 'black'
-            plt.rcParams['axes.labelcolor'] = 'black'
-            plt.rcParams['xtick.color'] = 'black'
-            plt.rcParams['ytick.color'] = 'black'
-            plt.rcParams['axes.titlecolor'] = 'black'
-            plt.rcParams['figure.facecolor'] = 'white'
-            plt.rcParams['axes.facecolor'] = 'white'
-
-            plt.subplot(3, 2, 1)
-            sns.histplot(np.log10(df['view'] + 1), bins=30, kde=True, color='skyblue', alpha=0.7)
-            plt.title('热门视频播放量分布', color='black', fontsize=12, fontweight='bold')
-            plt.xlabel('播放量(log10)', color='black')
-            plt.ylabel('视频数量', color='black')
+            analysis_results = dataframe_results(df)
 
-            plt.subplot(3, 2, 2)
-            all_tags = ' '.join(df['tags'].fillna('').astype(str))
+            self.chart_job.submit(self._render_dataframe_chart, df, source="full")
+            return analysis_results
 
-            font_path = get_chinese_font()
-            wordcloud_config = {
-                'background_color': 'white',
-                'width': 800, 
-                'height': 600,
-                'max_words': 100,
-                'collocations': False
-            }
-            if font_path:
-                wordcloud_config['font_path'] = font_path
-
-            if not all_tags.strip():
-                all_titles = ' '.join(df['title'].dropna().astype(str))
-                word_list = jieba.analyse.extract_tags(all_titles, topK=100, withWeight=True)
-                word_dict = {word: weight for word, weight in word_list}
-                wordcloud = WordCloud(**wordcloud_config).generate_from_frequencies(word_dict)
-            else:
-                wordcloud = WordCloud(**wordcloud_config).generate(all_tags)
+        except Exception as e:
+            logger.error(f"数据分析失败: {str(e)}")
+            return None
 
-            plt.imshow(wordcloud, interpolation='bilinear')
-            plt.axis('off')
-            plt.title('热门视频标签词云', color='black', fontsize=12, fontweight='bold')
-
-            plt.subplot(3, 2, 3)
-            if 'tname' in df and not df['tname'].isna().all():
-                category_stats = df['tname'].value_counts().head(10)
-                plt.pie(category_stats.values, labels=category_stats.index, autopct='%1.1f%%', textprops={'color': 'black'})
-                plt.title('热门视频分区分布', color='black', fontsize=12, fontweight='bold')
-            else:
-                plt.text(0.5, 0.5, '暂无分区数据', ha='center', va='center', transform=plt.gca().transAxes, color='black')
-                plt.title('视频分区分布', color='black', fontsize=12, fontweight='bold')
-
-            plt.subplot(3, 2, 4)
-            interaction_df = df[['danmaku', 'reply', 'favorite', 'coin', 'share', 'like']].corr()
-            sns.heatmap(interaction_df, annot=True, cmap='coolwarm', center=0, fmt=".2f", 
-                       annot_kws={'color': 'black'}, cbar_kws={'label': '相关系数'})
-            plt.title('热门视频互动行为相关性', color='black', fontsize=12, fontweight='bold')
-
-            plt.subplot(3, 2, 5)
-            if 'pub_hour' in df and not df['pub_hour'].isna().all():
-                hour_stats = df['pub_hour'].value_counts().sort_index()
-                plt.bar(hour_stats.index, hour_stats.values, color='skyblue', alpha=0.7)
-                plt.title('热门视频发布时间分布', color='black', fontsize=12, fontweight='bold')
-                plt.xlabel('发布时间(小时)', color='black')
-                plt.ylabel('视频数量', color='black')
-                plt.xticks(range(0, 24, 2), color='black')
-                plt.yticks(color='black')
-                plt.grid(True, alpha=0.3)
-            else:
-                plt.text(0.5, 0.5, '暂无时间数据', ha='center', va='center', transform=plt.gca().transAxes, color='black')
-                plt.title('视频发布时间分布', color='black', fontsize=12, fontweight='bold')
+    def _render_dataframe_chart(self, df: pd.DataFrame) -> bytes:
+        """用完整的DataFrame绘制分析图表，返回PNG字节"""
+        self._setup_chart_style()
 
-            plt.subplot(3, 2, 6)
-            corr_cols = ['view', 'danmaku', 'reply', 'favorite', 'coin', 'share', 'like', 'interaction_rate']
-            available_cols = [col for col in corr_cols if col in df]
-            corr_df = df[available_cols].corr()
+        plt.subplot(3, 2, 1)
+        sns.histplot(np.log10(df['view'] + 1), bins=30, kde=True, color='skyblue', alpha=0.7)
+        plt.title('热门视频播放量分布', color='black', fontsize=12, fontweight='bold')
+        plt.xlabel('播放量(log10)', color='black')
+        plt.ylabel('视频数量', color='black')
 
-            sns.heatmap(corr_df[['view']].sort_values('view', ascending=False),
-                        annot=True, cmap='viridis', vmin=-1, vmax=1, fmt=".2f",
-                        annot_kws={'color': 'white'}, cbar_kws={'label': '相关系数'})
-            plt.title('热门视频播放量与互动指标相关性', color='black', fontsize=12, fontweight='bold')
+        plt.subplot(3, 2, 2)
+        all_tags = ' '.join(df['tags'].fillna('').astype(str))
 
-            plt.tight_layout()
+        wordcloud_config = self._wordcloud_config()
 
-            img_buffer = BytesIO()
-            plt.savefig(img_buffer, format='png', dpi=300, bbox_inches='tight')
-            img_buffer.seek(0)
+        if not all_tags.strip():
+            all_titles = ' '.join(df['title'].dropna().astype(str))
+            word_list = jieba.analyse.extract_tags(all_titles, topK=100, withWeight=True)
+            word_dict = {word: weight for word, weight in word_list}
+            wordcloud = WordCloud(**wordcloud_config).generate_from_frequencies(word_dict)
+        else:
+            wordcloud = WordCloud(**wordcloud_config).generate(all_tags)
 
-            plt.savefig('static/bilibili_analysis.png', dpi=300, bbox_inches='tight')
-            plt.close()
+        plt.imshow(wordcloud, interpolation='bilinear')
+        plt.axis('off')
+        plt.title('热门视频标签词云', color='black', fontsize=12, fontweight='bold')
 
-            analysis_results = {
-                "total_videos": len(df),
-                "avg_views": int(df['view'].mean()),
-                "avg_interaction_rate": float(df['interaction_rate'].mean()),
-                "top_tags": self._extract_top_tags(df),
-            }
+        plt.subplot(3, 2, 3)
+        if 'tname' in df and not df['tname'].isna().all():
+            category_stats = df['tname'].value_counts().head(10)
+            plt.pie(category_stats.values, labels=category_stats.index, autopct='%1.1f%%', textprops={'color': 'black'})
+            plt.title('热门视频分区分布', color='black', fontsize=12, fontweight='bold')
+        else:
+            plt.text(0.5, 0.5, '暂无分区数据', ha='center', va='center', transform=plt.gca().transAxes, color='black')
+            plt.title('视频分区分布', color='black', fontsize=12, fontweight='bold')
+
+        plt.subplot(3, 2, 4)
+        interaction_df = df[['danmaku', 'reply', 'favorite', 'coin', 'share', 'like']].corr()
+        sns.heatmap(interaction_df, annot=True, cmap='coolwarm', center=0, fmt=".2f", 
+                   annot_kws={'color': 'black'}, cbar_kws={'label': '相关系数'})
+        plt.title('热门视频互动行为相关性', color='black', fontsize=12, fontweight='bold')
+
+        plt.subplot(3, 2, 5)
+        if 'pub_hour' in df and not df['pub_hour'].isna().all():
+            hour_stats = df['pub_hour'].value_counts().sort_index()
+            plt.bar(hour_stats.index, hour_stats.values, color='skyblue', alpha=0.7)
+            plt.title('热门视频发布时间分布', color='black', fontsize=12, fontweight='bold')
+            plt.xlabel('发布时间(小时)', color='black')
+            plt.ylabel('视频数量', color='black')
+            plt.xticks(range(0, 24, 2), color='black')
+            plt.yticks(color='black')
+            plt.grid(True, alpha=0.3)
+        else:
+            plt.text(0.5, 0.5, '暂无时间数据', ha='center', va='center', transform=plt.gca().transAxes, color='black')
+            plt.title('视频发布时间分布', color='black', fontsize=12, fontweight='bold')
 
-            if 'pub_hour' in df:
-                hour_stats = df.groupby('pub_hour')['view'].agg(['mean', 'count'])
-                hour_stats = hour_stats[hour_stats['count'] > 5]
-                analysis_results["best_publish_hours"] = hour_stats.sort_values('mean', ascending=False).head(3).index.tolist()
+        plt.subplot(3, 2, 6)
+        corr_cols = ['view', 'danmaku', 'reply', 'favorite', 'coin', 'share', 'like', 'interaction_rate']
+        available_cols = [col for col in corr_cols if col in df]
+        corr_df = df[available_cols].corr()
 
-            return analysis_results
+        sns.heatmap(corr_df[['view']].sort_values('view', ascending=False),
+                    annot=True, cmap='viridis', vmin=-1, vmax=1, fmt=".2f",
+                    annot_kws={'color': 'white'}, cbar_kws={'label': '相关系数'})
+        plt.title('热门视频播放量与互动指标相关性', color='black', fontsize=12, fontweight='bold')
+
+        return self._figure_png()
+
+    def analyze_streaming(self, chunksize: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        流式数据分析：分块读取videos表（Arrow镜像优先），内存占用与表大小无关，图表在后台渲染
+
+        Args:
+            chunksize: 每块行数，默认取ANALYSIS_CONFIG['streaming_chunksize']
+
+        Returns:
+            Optional[Dict[str, Any]]: 与analyze_and_visualize相同结构的分析结果，无数据或失败时返回None
+        """
+        chunksize = chunksize or ANALYSIS_CONFIG['streaming_chunksize']
+        try:
+            table = self.video_mirror.read_table() if self.video_mirror is not None else None
+            chunks = iter_arrow_chunks(table, chunksize) if table is not None else iter_video_chunks(read_engine, chunksize)
+            accumulator = accumulate(chunks)
+            if accumulator.count == 0:
+                return None
+
+            self.chart_job.submit(self._render_accumulator_chart, accumulator, source="streaming")
+            return accumulator.results(ANALYSIS_CONFIG['top_tags_count'], ANALYSIS_CONFIG['min_hour_videos'])
 
         except Exception as e:
-            logger.error(f"数据分析失败: {str(e)}")
+            logger.error(f"流式数据分析失败: {str(e)}")
             return None
 
-    def _extract_top_tags(self, df: pd.DataFrame, n: int = 10) -> list:
-        """提取热门标签"""
-        tag_counter = defaultdict(int)
-        for tags in df['tags'].dropna().astype(str):
-            for tag in tags.split(','):
-                if tag.strip():
-                    tag_counter[tag.strip()] += 1
-        return [[tag, count] for tag, count in sorted(tag_counter.items(), key=lambda x: x[1], reverse=True)[:n]]
+    def analyze_with_duckdb(self) -> Optional[Dict[str, Any]]:
+        """在Arrow镜像上用DuckDB聚合出分析统计量（图表在后台渲染），结果结构与analyze_and_visualize相同"""
+        try:
+            accumulator = self.analytics.build_accumulator()
+            if accumulator.count == 0:
+                return None
+
+            self.chart_job.submit(self._render_accumulator_chart, accumulator, source="duckdb")
+            return accumulator.results(ANALYSIS_CONFIG['top_tags_count'], ANALYSIS_CONFIG['min_hour_videos'])
+
+        except Exception as e:
+            logger.error(f"DuckDB数据分析失败: {str(e)}")
+            return None
+
+    def _setup_chart_style(self):
+        """创建分析图表画布并设置中文字体与配色"""
+        plt.figure(figsize=(18, 15))
+        plt.rcParams['font.sans-serif'] = ['SimHei']
+        plt.rcParams['axes.unicode_minus'] = False
+        plt.style.use('default')
+        plt.rcParams['text.color'] = 'black'
+        plt.rcParams['axes.labelcolor'] = 'black'
+        plt.rcParams['xtick.color'] = 'black'
+        plt.rcParams['ytick.color'] = 'black'
+        plt.rcParams['axes.titlecolor'] = 'black'
+        plt.rcParams['figure.facecolor'] = 'white'
+        plt.rcParams['axes.facecolor'] = 'white'
+
+    def _wordcloud_config(self) -> Dict[str, Any]:
+        """词云参数"""
+        font_path = get_chinese_font()
+        wordcloud_config = {
+            'background_color': 'white',
+            'width': 800,
+            'height': 600,
+            'max_words': 100,
+            'collocations': False
+        }
+        if font_path:
+            wordcloud_config['font_path'] = font_path
+        return wordcloud_config
+
+    def _render_accumulator_chart(self, accumulator: VideoAnalysisAccumulator) -> bytes:
+        """用累加器的统计量绘制与全量分析相同布局的图表，返回PNG字节"""
+        self._setup_chart_style()
+
+        plt.subplot(3, 2, 1)
+        edges = VIEW_HISTOGRAM_EDGES
+        plt.bar(edges[:-1], accumulator.view_histogram, width=np.diff(edges), align='edge',
+                color='skyblue', alpha=0.7, edgecolor='white')
+        plt.title('热门视频播放量分布', color='black', fontsize=12, fontweight='bold')
+        plt.xlabel('播放量(log10)', color='black')
+        plt.ylabel('视频数量', color='black')
+
+        plt.subplot(3, 2, 2)
+        frequencies = accumulator.tag_counts or accumulator.title_keywords
+        if frequencies:
+            wordcloud = WordCloud(**self._wordcloud_config()).generate_from_frequencies(
+                dict(frequencies.most_common(1000))
+            )
+            plt.imshow(wordcloud, interpolation='bilinear')
+        plt.axis('off')
+        plt.title('热门视频标签词云', color='black', fontsize=12, fontweight='bold')
+
+        plt.subplot(3, 2, 3)
+        if accumulator.category_counts:
+            labels, values = zip(*accumulator.category_counts.most_common(10))
+            plt.pie(values, labels=labels, autopct='%1.1f%%', textprops={'color': 'black'})
+            plt.title('热门视频分区分布', color='black', fontsize=12, fontweight='bold')
+        else:
+            plt.text(0.5, 0.5, '暂无分区数据', ha='center', va='center', transform=plt.gca().transAxes, color='black')
+            plt.title('视频分区分布', color='black', fontsize=12, fontweight='bold')
+
+        corr_df = accumulator.correlation()
+
+        plt.subplot(3, 2, 4)
+        interaction_cols = ['danmaku', 'reply', 'favorite', 'coin', 'share', 'like']
+        sns.heatmap(corr_df.loc[interaction_cols, interaction_cols], annot=True, cmap='coolwarm', center=0, fmt=".2f",
+                    annot_kws={'color': 'black'}, cbar_kws={'label': '相关系数'})
+        plt.title('热门视频互动行为相关性', color='black', fontsize=12, fontweight='bold')
+
+        plt.subplot(3, 2, 5)
+        if accumulator.hour_counts.any():
+            plt.bar(range(24), accumulator.hour_counts, color='skyblue', alpha=0.7)
+            plt.title('热门视频发布时间分布', color='black', fontsize=12, fontweight='bold')
+            plt.xlabel('发布时间(小时)', color='black')
+            plt.ylabel('视频数量', color='black')
+            plt.xticks(range(0, 24, 2), color='black')
+            plt.yticks(color='black')
+            plt.grid(True, alpha=0.3)
+        else:
+            plt.text(0.5, 0.5, '暂无时间数据', ha='center', va='center', transform=plt.gca().transAxes, color='black')
+            plt.title('视频发布时间分布', color='black', fontsize=12, fontweight='bold')
+
+        plt.subplot(3, 2, 6)
+        sns.heatmap(corr_df[['view']].sort_values('view', ascending=False),
+                    annot=True, cmap='viridis', vmin=-1, vmax=1, fmt=".2f",
+                    annot_kws={'color': 'white'}, cbar_kws={'label': '相关系数'})
+        plt.title('热门视频播放量与互动指标相关性', color='black', fontsize=12, fontweight='bold')
+
+        return self._figure_png()
+
+    def _figure_png(self) -> bytes:
+        """把当前画布编码为PNG并关闭画布"""
+        try:
+            plt.tight_layout()
+            buffer = BytesIO()
+            plt.savefig(buffer, format='png', dpi=ANALYSIS_CONFIG['chart']['dpi'], bbox_inches='tight')
+            return buffer.getvalue()
+        finally:
+            plt.close()
+
+
+FAVORITES_PAGE_SIZE = 20  # 收藏夹接口单页上限
 
 
 class BiliBiliUserCrawler:
-    def __init__(self, cookie: str = DEFAULT_COOKIE):
+    def __init__(self, cookie: str = DEFAULT_COOKIE, throttle: Optional[RequestThrottle] = None):
+        self.throttle = throttle or bilibili_throttle
         self.cookie = self._clean_cookie(cookie.strip() if cookie else DEFAULT_COOKIE)
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:138.0) Gecko/20100101 Firefox/138.0',
@@ -505,6 +774,8 @@ class BiliBiliUserCrawler:
         self.session = requests.Session()
         self.session.headers.update(self.headers)
         self.session.encoding = 'utf-8'
+        # 收藏夹并发抓取共享该会话，连接池大小与并发数一致
+        self.session.mount('https://', HTTPAdapter(pool_maxsize=CRAWLER_CONFIG['favorites_concurrency']))
 
     def _clean_cookie(self, cookie: str) -> str:
         """清理Cookie中的特殊字符"""
@@ -525,101 +796,171 @@ class BiliBiliUserCrawler:
         except:
             return False
 
+    def _get_json(self, url: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """经限速、重试与熔断发起GET请求"""
+        def request():
+            with metrics.track_request(url):
+                response = self.session.get(url, params=params, timeout=CRAWLER_CONFIG['request_timeout'])
+            response.encoding = 'utf-8'
+            return response
+
+        return self.throttle.run(request)
+
     def get_user_info(self):
         """获取B站个人信息"""
         url = 'https://api.bilibili.com/x/space/myinfo'
         try:
-            response = self.session.get(url, timeout=10)
-            response.encoding = 'utf-8'
-
-            if response.status_code == 200:
-                data = response.json()
-                if data.get('code') == 0:
-                    return data['data']
-                elif data.get('code') == -101:
-                    logger.warning("Cookie已过期或账号未登录")
-                    return None
-                else:
-                    logger.error(f"获取个人信息失败: {data.get('message')} (code: {data.get('code')})")
+            data = self._get_json(url)
+            if data.get('code') == 0:
+                return data['data']
+            elif data.get('code') == -101:
+                logger.warning("Cookie已过期或账号未登录")
+                return None
             else:
-                logger.error(f"请求失败，状态码: {response.status_code}")
+                logger.error(f"获取个人信息失败: {data.get('message')} (code: {data.get('code')})")
         except requests.exceptions.JSONDecodeError as e:
             logger.error(f"JSON解析失败: {str(e)}")
         except Exception as e:
             logger.error(f"获取个人信息时出错: {str(e)}")
         return None
 
-    def get_watch_history(self, max_pages=5):
-        """获取观看历史记录"""
+    def get_watch_history(self, max_pages=5, since_view_at=None):
+        """
+        获取观看历史记录（按观看时间倒序）
+
+        Args:
+            max_pages: 最多请求的页数
+            since_view_at: 增量同步游标，只返回观看时间晚于该值的记录，遇到更早的记录即停止翻页
+        """
+        history, _ = self.fetch_watch_history(max_pages, since_view_at)
+        return history
+
+    def fetch_watch_history(self, max_pages=5, since_view_at=None):
+        """
+        获取观看历史记录，并说明是否已经接上游标
+
+        Args:
+            max_pages: 最多请求的页数
+            since_view_at: 增量同步游标，只返回观看时间晚于该值的记录，遇到更早的记录即停止翻页
+
+        Returns:
+            Tuple[List, bool]: (记录列表, 是否完整)。完整指已经翻到不晚于游标的记录或历史记录已经翻完；
+            页数用尽或请求失败时为False，此时游标之后可能还有没取到的记录
+        """
         history = []
         url = 'https://api.bilibili.com/x/web-interface/history/cursor'
         params = {
+            'max': 0,
             'view_at': 0,
-            'business': 'archive'
+            'business': 'archive',
+            'ps': CRAWLER_CONFIG['history_page_size']
         }
 
         for _ in range(max_pages):
             try:
-                response = self.session.get(url, params=params, timeout=10)
-                response.encoding = 'utf-8'
-
-                if response.status_code != 200:
-                    break
-
-                data = response.json()
+                data = self._get_json(url, params)
                 if data.get('code') != 0:
-                    break
-
-                history_data = data.get('data', {})
-                history.extend(history_data.get('list', []))
+                    logger.error(f"获取历史记录失败: {data.get('message')} (code: {data.get('code')})")
+                    return history, False
+
+                history_data = data.get('data') or {}
+                items = history_data.get('list') or []
+                metrics.PAGES_FETCHED.labels(source='watch_history').inc()
+                if since_view_at is not None:
+                    new_items = [item for item in items if item.get('view_at', 0) > since_view_at]
+                    history.extend(new_items)
+                    if len(new_items) < len(items):
+                        return history, True
+                else:
+                    history.extend(items)
 
-                if not history_data.get('cursor', {}).get('max'):
-                    break
+                cursor = history_data.get('cursor') or {}
+                if not items or not cursor.get('max'):
+                    return history, True
 
-                params['view_at'] = history_data['cursor']['max']
-                time.sleep(1)
+                params['max'] = cursor['max']
+                params['view_at'] = cursor['view_at']
 
             except Exception as e:
                 logger.error(f"获取历史记录时出错: {str(e)}")
-                break
+                return history, False
 
-        return history
+        return history, False
+
+    def _fetch_favorite_page(self, media_id: int, pn: int):
+        """获取收藏夹的一页内容，返回(资源列表, 是否还有下一页)"""
+        media_data = self._get_json('https://api.bilibili.com/x/v3/fav/resource/list', {
+            'media_id': media_id,
+            'ps': FAVORITES_PAGE_SIZE,
+            'pn': pn
+        })
+        if media_data.get('code') != 0:
+            raise ValueError(f"{media_data.get('message')} (code: {media_data.get('code')})")
+        data = media_data.get('data') or {}
+        metrics.PAGES_FETCHED.labels(source='favorites').inc()
+        return data.get('medias') or [], bool(data.get('has_more'))
+
+    def iter_favorites(self, mid):
+        """
+        流式获取收藏内容
+
+        各收藏夹按media_count预先规划分页，所有分页在有界线程池中并发请求；
+        若最后一页仍返回has_more则继续翻页。每完成一页即产出(folder, pn, resources)。
+        """
+        folder_data = self._get_json(
+            'https://api.bilibili.com/x/v3/fav/folder/created/list-all',
+            {'up_mid': mid}
+        )
+        if folder_data.get('code') != 0:
+            logger.error(f"获取收藏夹列表失败: {folder_data.get('message')} (code: {folder_data.get('code')})")
+            return
+
+        folders = (folder_data.get('data') or {}).get('list') or []
+        with ThreadPoolExecutor(max_workers=CRAWLER_CONFIG['favorites_concurrency']) as pool:
+            pending = {}
+            last_pages = {}
+            for folder in folders:
+                last_pages[folder['id']] = max(1, -(-folder.get('media_count', 0) // FAVORITES_PAGE_SIZE))
+                for pn in range(1, last_pages[folder['id']] + 1):
+                    pending[pool.submit(self._fetch_favorite_page, folder['id'], pn)] = (folder, pn)
+
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    folder, pn = pending.pop(future)
+                    try:
+                        resources, has_more = future.result()
+                    except Exception as e:
+                        logger.error(f"获取收藏夹{folder['id']}第{pn}页失败: {str(e)}")
+                        folder['incomplete'] = True
+                        continue
+
+                    if has_more and pn == last_pages[folder['id']]:
+                        last_pages[folder['id']] = pn + 1
+                        pending[pool.submit(self._fetch_favorite_page, folder['id'], pn + 1)] = (folder, pn + 1)
+
+                    yield folder, pn, resources
 
     def get_favorites(self, mid):
-        """获取收藏内容"""
-        favorites = []
-        folder_url = 'https://api.bilibili.com/x/v3/fav/folder/created/list-all'
-        folder_params = {'up_mid': mid}
+        """获取收藏内容（包含每个收藏夹的全部分页）"""
+        pages = defaultdict(dict)
+        folders = {}
 
         try:
-            folder_response = self.session.get(folder_url, params=folder_params, timeout=10)
-            folder_response.encoding = 'utf-8'
-
-            if folder_response.status_code == 200:
-                folder_data = folder_response.json()
-                if folder_data.get('code') == 0:
-                    folders = folder_data.get('data', {}).get('list', [])
-
-                    for folder in folders:
-                        media_url = 'https://api.bilibili.com/x/v3/fav/resource/list'
-                        media_params = {
-                            'media_id': folder['id'],
-                            'ps': 20,
-                            'pn': 1
-                        }
-
-                        media_response = self.session.get(media_url, params=media_params, timeout=10)
-                        media_response.encoding = 'utf-8'
-
-                        if media_response.status_code == 200:
-                            media_data = media_response.json()
-                            if media_data.get('code') == 0:
-                                folder['resources'] = media_data.get('data', {}).get('medias', [])
-                                favorites.append(folder)
-                        time.sleep(0.5)
+            for folder, pn, resources in self.iter_favorites(mid):
+                folders[folder['id']] = folder
+                pages[folder['id']][pn] = resources
         except Exception as e:
             logger.error(f"获取收藏内容时出错: {str(e)}")
 
+        favorites = []
+        for folder_id, folder in folders.items():
+            folder['resources'] = [
+                resource
+                for pn in sorted(pages[folder_id])
+                for resource in pages[folder_id][pn]
+            ]
+            favorites.append(folder)
         return favorites
 
     def save_user_data(self, user_mid: str, data_type: str, data_content: dict):
@@ -641,20 +982,76 @@ class BiliBiliUserCrawler:
 
 # 全局实例
 analytics_system = BiliBiliAnalyticsSystem()
+
+async def read_data_version() -> int:
+    """在异步连接上读取数据版本（主库），结果缓存与大屏的版本检查不占用IO线程"""
+    async with async_engine.connect() as conn:
+        return await VideoRollupStore.data_version_async(conn)
+
+# 视频分析结果按数据版本缓存，爬虫写入后版本递增，下一次请求重新计算
+analysis_cache = VersionedResultCache(
+    analytics_system.rollup_store.data_version,
+    redis_client=create_redis_client(REDIS_CONFIG) if RESULT_CACHE_CONFIG['backend'] == 'redis' else None,
+    namespace='analysis',
+    version_ttl=RESULT_CACHE_CONFIG['version_ttl'],
+    result_ttl=RESULT_CACHE_CONFIG['result_ttl'],
+    async_version_source=read_data_version
+)
+analytics_system.ingest_listeners.append(lambda stats: analysis_cache.invalidate_version())
+
+# 数据大屏汇总：所有连接共享一份内存结果，数据版本变化后刷新并通过SSE推送
+dashboard_summary = DashboardSummary(
+    read_engine,
+    analytics_system.rollup_store,
+    recent_limit=DASHBOARD_CONFIG['recent_videos'],
+    top_tags=DASHBOARD_CONFIG['top_tags'],
+    tag_window_hours=DASHBOARD_CONFIG['tag_window_hours']
+)
+dashboard_hub = DashboardHub(heartbeat_seconds=DASHBOARD_CONFIG['heartbeat_seconds'])
+dashboard_task: Optional[asyncio.Task] = None
 scheduler = BackgroundScheduler()
 
 # 创建静态文件目录
 os.makedirs('static', exist_ok=True)
 
+crawl_queue = create_crawl_queue() if CRAWL_QUEUE_CONFIG['enabled'] else None
+
+# 视频列表单页最大条数
+MAX_VIDEO_PAGE_SIZE = 100
+
+partition_manager = PartitionManager(
+    engine, PARTITION_CONFIG['tables'], PARTITION_CONFIG['archive_dir'], PARTITION_CONFIG['future_months']
+)
+
+metrics.register_tag_cache(analytics_system.tag_cache)
+if crawl_queue is not None:
+    metrics.register_crawl_queue(crawl_queue)
+
 def scheduled_crawl():
     """定时爬取任务"""
     logger.info("开始定时爬取热门视频...")
     try:
+        if crawl_queue is not None:
+            enqueue_popular_crawl(crawl_queue, pages=3)
+            return
         analytics_system.crawl_popular_videos(pages=3)
         logger.info("定时爬取完成")
     except Exception as e:
         logger.error(f"定时爬取失败: {str(e)}")
 
+async def watch_dashboard():
+    """定期检查数据版本（包括crawl_worker进程的写入），有新数据时刷新大屏汇总并推送变化"""
+    while True:
+        try:
+            # 版本未变化时只有一次异步查询；变化后才在线程池中重新计算汇总
+            if not dashboard_summary.is_current(await read_data_version()):
+                delta = await run_io(dashboard_summary.refresh_if_changed)
+                if delta is not None and len(dashboard_hub):
+                    dashboard_hub.publish(delta, dashboard_summary.snapshot())
+        except Exception as e:
+            logger.error(f"刷新大屏汇总失败: {str(e)}")
+        await asyncio.sleep(DASHBOARD_CONFIG['poll_seconds'])
+
 @app.on_event("startup")
 async def startup_event():
     """应用启动时的初始化"""
@@ -669,20 +1066,41 @@ async def startup_event():
         hours=2,
         id='crawl_popular_videos'
     )
+    # 每天凌晨创建未来分区并归档过期分区
+    scheduler.add_job(
+        partition_manager.maintain,
+        'cron',
+        hour=3,
+        id='partition_maintenance'
+    )
+    if analytics_system.video_mirror is not None:
+        # 爬取可能在crawl_worker进程中完成，定时增量刷新镜像
+        scheduler.add_job(
+            analytics_system.refresh_video_mirror,
+            'interval',
+            minutes=ARROW_MIRROR_CONFIG['refresh_minutes'],
+            id='refresh_video_mirror'
+        )
     scheduler.start()
+
+    global dashboard_task
+    dashboard_task = asyncio.create_task(watch_dashboard())
     logger.info("✅ 应用启动完成，定时任务已启动")
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """应用关闭时的清理"""
     scheduler.shutdown()
+    if dashboard_task is not None:
+        dashboard_task.cancel()
+    shutdown_executors()
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     """获取当前用户"""
     if not credentials:
         return None
 
-    user = auth_service.get_user_by_token(credentials.credentials)
+    user = await run_io(auth_service.get_user_by_token, credentials.credentials)
     return user
 
 async def require_auth(credentials: HTTPAuthorizationCredentials = Depends(security)):
@@ -690,7 +1108,7 @@ async def require_auth(credentials: HTTPAuthorizationCredentials = Depends(secur
     if not credentials:
         raise HTTPException(status_code=401, detail="需要登录")
 
-    user = auth_service.get_user_by_token(credentials.credentials)
+    user = await run_io(auth_service.get_user_by_token, credentials.credentials)
     if not user:
         raise HTTPException(status_code=401, detail="登录已过期，请重新登录")
 
@@ -704,7 +1122,8 @@ async def root():
 @app.post("/api/auth/register")
 async def register(user_data: UserRegister):
     """用户注册"""
-    result = auth_service.register_user(
+    result = await run_cpu(
+        auth_service.register_user,
         username=user_data.username,
         email=user_data.email,
         password=user_data.password
@@ -726,7 +1145,8 @@ async def register(user_data: UserRegister):
 @app.post("/api/auth/login")
 async def login(user_data: UserLogin):
     """用户登录"""
-    result = auth_service.login_user(
+    result = await run_cpu(
+        auth_service.login_user,
         username=user_data.username,
         password=user_data.password
     )
@@ -749,7 +1169,7 @@ async def login(user_data: UserLogin):
 @app.post("/api/auth/logout")
 async def logout(current_user: dict = Depends(require_auth), credentials: HTTPAuthorizationCredentials = Depends(security)):
     """用户登出"""
-    success = auth_service.logout_user(credentials.credentials)
+    success = await run_io(auth_service.logout_user, credentials.credentials)
     if success:
         return {"message": "登出成功"}
     else:
@@ -771,14 +1191,15 @@ async def update_bilibili_cookie(
     try:
         crawler = BiliBiliUserCrawler(cookie_data.cookie)
 
-        if not crawler.check_cookie_validity():
+        if not await run_io(crawler.check_cookie_validity):
             raise HTTPException(status_code=400, detail="Cookie无效或已过期")
 
-        user_info = crawler.get_user_info()
+        user_info = await run_io(crawler.get_user_info)
         if not user_info:
             raise HTTPException(status_code=400, detail="无法获取B站用户信息")
 
-        success = auth_service.update_bilibili_info(
+        success = await run_io(
+            auth_service.update_bilibili_info,
             user_id=current_user['user_id'],
             cookie=cookie_data.cookie,
             mid=str(user_info['mid']),
@@ -788,7 +1209,7 @@ async def update_bilibili_cookie(
         if not success:
             raise HTTPException(status_code=500, detail="更新失败")
 
-        await sync_user_bilibili_data(current_user['user_id'], cookie_data.cookie)
+        await run_io(sync_user_bilibili_data, current_user['user_id'], cookie_data.cookie)
 
         return {
             "message": "B站信息更新成功",
@@ -806,29 +1227,45 @@ async def update_bilibili_cookie(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"更新失败: {str(e)}")
 
-async def sync_user_bilibili_data(user_id: int, cookie: str):
-    """同步用户的B站数据"""
+def sync_user_bilibili_data(user_id: int, cookie: str, full_backfill: bool = False) -> Dict[str, Any]:
+    """
+    同步用户的B站数据（观看历史默认增量同步，首次同步自动全量回填）
+
+    Returns:
+        Dict: 同步结果，success为False时error说明失败原因
+    """
     try:
         crawler = BiliBiliUserCrawler(cookie)
 
         user_info = crawler.get_user_info()
-        if user_info:
-            with engine.begin() as conn:
-                conn.execute(text("""
-                INSERT INTO user_data (user_mid, data_type, data_content, created_at)
-                VALUES (:user_mid, :data_type, :data_content, :created_at)
-                ON DUPLICATE KEY UPDATE 
-                data_content = VALUES(data_content), created_at = VALUES(created_at)
-                """), {
-                    'user_mid': str(user_id),  # 使用系统用户ID
-                    'data_type': 'user_info',
-                    'data_content': json.dumps(user_info, ensure_ascii=False),
-                    'created_at': datetime.now()
-                })
+        if not user_info:
+            logger.error(f"同步用户 {user_id} 的B站数据失败: 无法获取B站用户信息")
+            return {"success": False, "error": "无法获取B站用户信息，Cookie可能已过期"}
+
+        with engine.begin() as conn:
+            conn.execute(text("""
+            INSERT INTO user_data (user_mid, data_type, data_content, created_at)
+            VALUES (:user_mid, :data_type, :data_content, :created_at)
+            ON DUPLICATE KEY UPDATE 
+            data_content = VALUES(data_content), created_at = VALUES(created_at)
+            """), {
+                'user_mid': str(user_id),  # 使用系统用户ID
+                'data_type': 'user_info',
+                'data_content': json.dumps(user_info, ensure_ascii=False),
+                'created_at': datetime.now()
+            })
         
-        # 获取观看历史
-        watch_history = crawler.get_watch_history(max_pages=10)  # 获取更多页面
-        if watch_history:
+        # 增量同步观看历史
+        history = sync_watch_history(
+            watch_event_store, crawler, sync_cursor_store, str(user_id),
+            full_backfill=full_backfill,
+            backfill_pages=CRAWLER_CONFIG['history_backfill_pages'],
+            incremental_pages=CRAWLER_CONFIG['history_incremental_pages']
+        )
+        
+        # 获取收藏
+        favorites = crawler.get_favorites(user_info['mid'])
+        if favorites:
             with engine.begin() as conn:
                 conn.execute(text("""
                 INSERT INTO user_data (user_mid, data_type, data_content, created_at)
@@ -837,104 +1274,237 @@ async def sync_user_bilibili_data(user_id: int, cookie: str):
                 data_content = VALUES(data_content), created_at = VALUES(created_at)
                 """), {
                     'user_mid': str(user_id),
-                    'data_type': 'watch_history',
-                    'data_content': json.dumps(watch_history, ensure_ascii=False),
+                    'data_type': 'favorites',
+                    'data_content': json.dumps(favorites, ensure_ascii=False),
                     'created_at': datetime.now()
                 })
         
-        # 获取收藏
-        if user_info:
-            favorites = crawler.get_favorites(user_info['mid'])
-            if favorites:
-                with engine.begin() as conn:
-                    conn.execute(text("""
-                    INSERT INTO user_data (user_mid, data_type, data_content, created_at)
-                    VALUES (:user_mid, :data_type, :data_content, :created_at)
-                    ON DUPLICATE KEY UPDATE 
-                    data_content = VALUES(data_content), created_at = VALUES(created_at)
-                    """), {
-                        'user_mid': str(user_id),
-                        'data_type': 'favorites',
-                        'data_content': json.dumps(favorites, ensure_ascii=False),
-                        'created_at': datetime.now()
-                    })
-        
         logger.info(f"用户 {user_id} 的B站数据同步完成")
+        return {"success": True, "history": history}
         
     except Exception as e:
         logger.error(f"同步用户 {user_id} 的B站数据失败: {str(e)}")
+        return {"success": False, "error": str(e)}
+
+@app.post("/api/user/sync")
+async def sync_current_user_data(full_backfill: bool = False, current_user: dict = Depends(require_auth)):
+    """同步当前用户的B站数据，full_backfill=true时重新全量回填观看历史"""
+    if not current_user.get('bilibili_cookie'):
+        raise HTTPException(status_code=400, detail="请先绑定B站Cookie")
+
+    result = await run_io(sync_user_bilibili_data, current_user['user_id'], current_user['bilibili_cookie'], full_backfill)
+    if not result["success"]:
+        raise HTTPException(status_code=500, detail=f"同步失败: {result['error']}")
+    return {"message": "同步完成", "history": result["history"]}
 
 @app.post("/api/crawl/popular")
 async def crawl_popular(background_tasks: BackgroundTasks):
     """手动触发热门视频爬取"""
+    if crawl_queue is not None:
+        result = await run_io(enqueue_popular_crawl, crawl_queue, pages=5)
+        return {"message": "热门视频爬取任务已提交到队列", **result}
+
     background_tasks.add_task(analytics_system.crawl_popular_videos, 5)
     return {"message": "热门视频爬取任务已启动"}
 
-@app.get("/api/analysis/videos")
-async def get_video_analysis():
-    """获取视频分析结果"""
+@app.get("/api/crawl/queue")
+async def get_crawl_queue_stats():
+    """获取分布式爬取队列状态"""
+    if crawl_queue is None:
+        raise HTTPException(status_code=404, detail="未启用分布式爬取队列")
     try:
-        df = analytics_system.load_data_to_dataframe()
-        if df.empty:
-            raise HTTPException(status_code=404, detail="暂无数据")
+        return {
+            "stats": await run_io(crawl_queue.stats),
+            "dead_letters": await run_io(crawl_queue.dead_letters, limit=20)
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
 
-        results = analytics_system.analyze_and_visualize(df)
-        if not results:
-            raise HTTPException(status_code=500, detail="分析失败")
+@app.get("/metrics")
+async def get_metrics():
+    """导出Prometheus格式的爬取流水线指标"""
+    content, content_type = await run_io(metrics.render_latest)
+    return Response(content=content, media_type=content_type)
+
+@app.get("/api/crawl/stats")
+async def get_crawl_stats():
+    """获取爬虫缓存命中统计"""
+    return {
+        "tag_cache": analytics_system.tag_cache.stats(),
+        "known_video_index": {
+            "entries": len(analytics_system.video_index),
+            "hits": analytics_system.video_index.hits,
+            "misses": analytics_system.video_index.misses
+        },
+        "analysis_cache": analysis_cache.stats()
+    }
 
-        return results
+# 视频分析接口支持的模式
+ANALYSIS_MODES = ("auto", "full", "streaming", "duckdb")
+
+def compute_video_analysis(mode: str) -> Optional[Dict[str, Any]]:
+    """
+    按模式计算视频分析结果，图表由后台渲染任务生成
+
+    Args:
+        mode: full、streaming、duckdb或auto
+
+    Returns:
+        Optional[Dict]: 分析结果，没有数据时返回None
+    """
+    if mode == "auto":
+        if analytics_system.analytics is not None and analytics_system.analytics.available():
+            mode = "duckdb"
+        else:
+            total = analytics_system.rollup_store.total_videos()
+            mode = "streaming" if total > ANALYSIS_CONFIG['streaming_threshold'] else "full"
+
+    if mode == "duckdb":
+        if analytics_system.analytics.available():
+            return analytics_system.analyze_with_duckdb()
+        # 镜像尚未生成（由启动与定时任务在后台刷新），先从MySQL分块计算
+        logger.warning("Arrow镜像尚未生成，DuckDB分析改为从MySQL流式计算")
+        mode = "streaming"
+    if mode == "streaming":
+        return analytics_system.analyze_streaming()
+
+    df = analytics_system.load_data_to_dataframe()
+    if df.empty:
+        return None
+    results = analytics_system.analyze_and_visualize(df)
+    if not results:
+        raise HTTPException(status_code=500, detail="分析失败")
+    return results
+
+async def _dashboard_snapshot() -> Dict[str, Any]:
+    summary = dashboard_summary.snapshot()
+    if summary is None:
+        await run_io(dashboard_summary.refresh_if_changed)
+        summary = dashboard_summary.snapshot()
+    return summary
+
+@app.get("/api/dashboard/summary")
+async def get_dashboard_summary():
+    """数据大屏汇总：指标、分区、24小时趋势、热门标签与最新视频，直接返回内存中的结果"""
+    try:
+        return FastJSONResponse(await _dashboard_snapshot())
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/dashboard/stream")
+async def stream_dashboard():
+    """
+    数据大屏的Server-Sent Events流
+
+    连接后先收到summary事件（完整汇总），之后每次有新数据时收到delta事件（只含变化的字段）。
+    """
+    try:
+        summary = await _dashboard_snapshot()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return StreamingResponse(
+        dashboard_hub.stream(summary),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/analysis/videos")
+async def get_video_analysis(mode: str = "auto"):
+    """
+    获取视频分析结果
+
+    mode: full（整表载入内存）、streaming（分块累加）、duckdb（在Arrow镜像上聚合）
+    或auto（启用DuckDB时使用duckdb，否则视频数超过阈值时流式）
+    """
+    if mode not in ANALYSIS_MODES:
+        raise HTTPException(status_code=400, detail=f"不支持的分析模式: {mode}")
+    if mode == "duckdb" and analytics_system.analytics is None:
+        raise HTTPException(status_code=400, detail="DuckDB分析引擎未启用")
+
+    try:
+        # 每种模式只缓存一份结果；DuckDB直接聚合镜像，镜像刷新后也要重新计算
+        key = f"video_analysis:{mode}"
+        mirror_version = None
+        if mode in ("duckdb", "auto") and analytics_system.analytics is not None:
+            version = analytics_system.video_mirror.version()
+            mirror_version = f"{version[0]}-{version[1]}" if version else None
+
+        await analysis_cache.current_version_async()
+        results = analysis_cache.peek(key, mirror_version)
+        if results is None and analysis_cache.redis is not None:
+            results = await run_io(analysis_cache.get, key, mirror_version)
+        if results is None:
+            results = await run_cpu(analysis_cache.compute, key, lambda: compute_video_analysis(mode), mirror_version)
+        if not results:
+            raise HTTPException(status_code=404, detail="暂无数据")
+        # 图表在后台渲染，前端按chart.etag加载，pending时稍后再取
+        return FastJSONResponse({**results, "chart": await run_io(analytics_system.chart_job.status)})
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/analysis/chart")
-async def get_analysis_chart():
-    """获取分析图表"""
-    chart_path = "static/bilibili_analysis.png"
-    if os.path.exists(chart_path):
-        return FileResponse(chart_path)
-    else:
-        raise HTTPException(status_code=404, detail="图表文件不存在")
+async def get_analysis_chart(if_none_match: Optional[str] = Header(None)):
+    """获取最新的分析图表，浏览器携带If-None-Match且图表未变化时返回304"""
+    manifest = analytics_system.chart_job.store.latest()
+    if manifest is None or not os.path.exists(manifest["path"]):
+        raise HTTPException(status_code=404, detail="图表尚未生成")
+
+    # no-cache：浏览器每次都带ETag重新验证，图表未变化时不再重新下载
+    headers = {"ETag": manifest["etag"], "Cache-Control": "no-cache"}
+    if if_none_match and manifest["etag"] in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return FileResponse(manifest["path"], media_type="image/png", headers=headers)
+
+@app.get("/api/analysis/chart/status")
+async def get_analysis_chart_status():
+    """最新图表的ETag与后台渲染状态"""
+    return await run_io(analytics_system.chart_job.status)
 
 @app.get("/api/videos")
-async def get_videos(page: int = 1, page_size: int = 10, limit: int = None):
-    """获取视频列表（支持分页）"""
+async def get_videos(page_size: int = 10, cursor: Optional[str] = None, limit: Optional[int] = None):
+    """
+    获取视频列表
+
+    按采集时间倒序的游标分页：首次请求不带cursor，之后传入上一页返回的nextCursor。
+    传入limit时直接返回最新的limit条（兼容旧调用）。
+    """
     try:
-        with engine.connect() as conn:
+        async with async_engine.connect() as conn:
             if limit is not None:
-                df = pd.read_sql(f"""
-                SELECT bvid, title, author, view, danmaku, reply, 
-                       favorite, coin, share, `like`, pubdate, tname
-                FROM videos 
-                ORDER BY collected_at DESC 
-                LIMIT {limit}
-                """, conn)
-                return df.to_dict('records')
-            
-            # 新的分页逻辑
-            offset = (page - 1) * page_size
-            
-            # 获取总数
-            total_count_result = conn.execute(text("SELECT COUNT(*) as count FROM videos"))
-            total_count = total_count_result.fetchone()[0]
-            
-            # 获取分页数据
-            df = pd.read_sql(f"""
-            SELECT bvid, title, author, view, danmaku, reply, 
-                   favorite, coin, share, `like`, pubdate, tname
-            FROM videos 
-            ORDER BY collected_at DESC 
-            LIMIT {page_size} OFFSET {offset}
-            """, conn)
-            
-            return {
-                "data": df.to_dict('records'),
+                rows, _ = await list_videos_async(conn, max(1, min(limit, MAX_VIDEO_PAGE_SIZE)))
+                return FastJSONResponse(rows)
+
+            page_size = max(1, min(page_size, MAX_VIDEO_PAGE_SIZE))
+            rows, next_cursor = await list_videos_async(conn, page_size, cursor)
+            total_count = await VideoRollupStore.total_videos_async(conn)
+
+            return FastJSONResponse({
+                "data": rows,
                 "pagination": {
-                    "current": page,
                     "pageSize": page_size,
                     "total": total_count,
-                    "totalPages": (total_count + page_size - 1) // page_size
+                    "totalPages": (total_count + page_size - 1) // page_size,
+                    "nextCursor": next_cursor,
+                    "hasMore": next_cursor is not None
                 }
-            }
+            })
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/videos/{bvid}/snapshots")
+async def get_video_snapshots(bvid: str, limit: int = 20):
+    """获取视频最近的统计快照（用于计算增长）"""
+    try:
+        snapshots = await run_io(analytics_system.snapshot_store.latest, bvid, limit=min(max(limit, 1), 500))
+        return FastJSONResponse({
+            "bvid": bvid,
+            "snapshots": snapshots,
+            "total_count": len(snapshots)
+        })
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -947,7 +1517,7 @@ async def get_user_info_with_cookie(cookie_req: CookieRequest = None):
 
         crawler = BiliBiliUserCrawler(cookie)
 
-        user_info = crawler.get_user_info()
+        user_info = await run_io(crawler.get_user_info)
         if not user_info:
             logger.warning("获取用户信息失败")
             if cookie_req and cookie_req.cookie:
@@ -976,16 +1546,17 @@ async def get_user_history(cookie_req: CookieRequest = None):
         cookie = cookie_req.cookie if cookie_req else DEFAULT_COOKIE
         crawler = BiliBiliUserCrawler(cookie)
 
-        if not crawler.check_cookie_validity():
+        if not await run_io(crawler.check_cookie_validity):
             raise HTTPException(status_code=401, detail="Cookie已过期或无效")
 
-        user_info = crawler.get_user_info()
+        user_info = await run_io(crawler.get_user_info)
         if not user_info:
             raise HTTPException(status_code=404, detail="无法获取用户信息")
 
-        history = crawler.get_watch_history()
+        history = await run_io(crawler.get_watch_history)
 
-        crawler.save_user_data(str(user_info['mid']), 'watch_history', history)
+        # 用户分析按B站mid读取观看记录表，这里同时写入
+        await run_io(save_watch_history, watch_event_store, crawler, str(user_info['mid']), history)
 
         return {
             "user_info": user_info,
@@ -1004,16 +1575,16 @@ async def get_user_favorites(cookie_req: CookieRequest = None):
         cookie = cookie_req.cookie if cookie_req else DEFAULT_COOKIE
         crawler = BiliBiliUserCrawler(cookie)
 
-        if not crawler.check_cookie_validity():
+        if not await run_io(crawler.check_cookie_validity):
             raise HTTPException(status_code=401, detail="Cookie已过期或无效")
 
-        user_info = crawler.get_user_info()
+        user_info = await run_io(crawler.get_user_info)
         if not user_info:
             raise HTTPException(status_code=404, detail="无法获取用户信息")
 
-        favorites = crawler.get_favorites(user_info['mid'])
+        favorites = await run_io(crawler.get_favorites, user_info['mid'])
 
-        crawler.save_user_data(str(user_info['mid']), 'favorites', favorites)
+        await run_io(crawler.save_user_data, str(user_info['mid']), 'favorites', favorites)
 
         total_resources = sum(len(folder.get('resources', [])) for folder in favorites)
 
@@ -1032,53 +1603,23 @@ async def get_user_favorites(cookie_req: CookieRequest = None):
 async def get_user_analysis(user_mid: str):
     """获取用户数据分析"""
     try:
-        with engine.connect() as conn:
-            query = text("""
-            SELECT data_content, created_at 
-            FROM user_data 
-            WHERE user_mid = :user_mid AND data_type = 'watch_history'
-            ORDER BY created_at DESC 
-            LIMIT 1
-            """)
-            result = conn.execute(query, {'user_mid': user_mid})
-            rows = result.fetchall()
-            
-            if not rows:
-                raise HTTPException(status_code=404, detail="未找到用户数据")
-            
-            # 解析历史数据
-            history = json.loads(rows[0][0])
-            
-            # 分析观看偏好
-            categories = defaultdict(int)
-            view_times = []
-            
-            for item in history:
-                # 优先使用tag_name，其次使用tname
-                category = item.get('tag_name') or item.get('tname')
-                if category:
-                    categories[category] += 1
-                if 'view_at' in item:
-                    view_times.append(datetime.fromtimestamp(item['view_at']))
-            
-            # 分析观看时间分布
-            hour_distribution = defaultdict(int)
-            for vt in view_times:
-                hour_distribution[vt.hour] += 1
-            
-            # 转换为列表格式，避免tuple序列化问题
-            most_active_hours = sorted(hour_distribution.items(), key=lambda x: x[1], reverse=True)[:3]
-            most_active_hours_list = [{"hour": hour, "count": count} for hour, count in most_active_hours]
-            
-            analysis = {
-                "total_watched": len(history),
-                "category_preferences": dict(sorted(categories.items(), key=lambda x: x[1], reverse=True)[:10]),
-                "watch_time_distribution": dict(hour_distribution),
-                "most_active_hours": most_active_hours_list
-            }
-            
-            return analysis
-            
+        summary = await run_io(watch_event_store.summary, user_mid)
+        if not summary:
+            raise HTTPException(status_code=404, detail="未找到用户数据")
+
+        # 转换为列表格式，避免tuple序列化问题
+        most_active_hours = sorted(summary["hours"].items(), key=lambda x: x[1], reverse=True)[:3]
+        most_active_hours_list = [{"hour": hour, "count": count} for hour, count in most_active_hours]
+
+        analysis = {
+            "total_watched": summary["total"],
+            "category_preferences": summary["categories"],
+            "watch_time_distribution": summary["hours"],
+            "most_active_hours": most_active_hours_list
+        }
+
+        return analysis
+
     except HTTPException:
         raise
     except Exception as e:
@@ -1094,13 +1635,10 @@ async def get_video_recommendations(
 ):
     """获取视频推荐"""
     try:
-        with engine.connect() as conn:
-            videos_df = pd.read_sql("""
-            SELECT bvid, title, view, `like`, coin, share, tname, pubdate, `desc`
-            FROM videos 
-            ORDER BY collected_at DESC 
-            LIMIT 200
-            """, conn)
+        videos_df = await run_io(
+            analytics_system.load_videos,
+            ['bvid', 'title', 'view', 'like', 'coin', 'share', 'tname', 'pubdate', 'desc'], limit=200
+        )
         
         if videos_df.empty:
             raise HTTPException(status_code=404, detail="暂无视频数据")
@@ -1110,37 +1648,30 @@ async def get_video_recommendations(
         
         # 如果用户已登录，获取用户历史
         if current_user:
-            with engine.connect() as conn:
-                query = text("""
-                SELECT data_content 
-                FROM user_data 
-                WHERE user_mid = :user_mid AND data_type = 'watch_history'
-                ORDER BY created_at DESC 
-                LIMIT 1
-                """)
-                result = conn.execute(query, {'user_mid': str(current_user['user_id'])})
-                rows = result.fetchall()
-                
-                if rows:
-                    user_history = json.loads(rows[0][0])
-                    recommendation_type = "collaborative_filtering"
+            user_history = await run_io(
+                watch_event_store.recent,
+                str(current_user['user_id']), limit=CRAWLER_CONFIG['history_max_items']
+            )
+            if user_history:
+                recommendation_type = "collaborative_filtering"
         
         if video_bvid:
             recommendation_type = "content_based"
         
-        recommendations = ml_service.get_video_recommendations(
+        recommendations = await run_cpu(
+            ml_service.get_video_recommendations,
             user_history=user_history,
             video_bvid=video_bvid,
             videos_df=videos_df,
             top_n=limit
         )
         
-        return {
+        return FastJSONResponse({
             "recommendations": recommendations,
             "total_count": len(recommendations),
             "recommendation_type": recommendation_type,
             "user_logged_in": current_user is not None
-        }
+        })
         
     except HTTPException:
         raise
@@ -1151,19 +1682,16 @@ async def get_video_recommendations(
 async def train_prediction_model():
     """训练播放量预测模型"""
     try:
-        with engine.connect() as conn:
-            videos_df = pd.read_sql("""
-            SELECT bvid, title, view, `like`, coin, share, tname, pubdate, duration
-            FROM videos 
-            WHERE view > 0
-            ORDER BY collected_at DESC 
-            LIMIT 1000
-            """, conn)
+        videos_df = await run_io(
+            analytics_system.load_videos,
+            ['bvid', 'title', 'view', 'like', 'coin', 'share', 'tname', 'pubdate', 'duration'],
+            limit=1000, min_view=0
+        )
         
         if len(videos_df) < 50:
             raise HTTPException(status_code=400, detail="数据量不足，至少需要50个视频数据")
         
-        results = ml_service.train_view_prediction_model(videos_df)
+        results = await run_cpu(ml_service.train_view_prediction_model, videos_df)
         
         return {
             "message": "模型训练完成",
@@ -1180,7 +1708,7 @@ async def train_prediction_model():
 async def predict_video_views(video_features: dict):
     """预测视频播放量"""
     try:
-        prediction = ml_service.predict_video_views(video_features)
+        prediction = await run_cpu(ml_service.predict_video_views, video_features)
 
         if prediction is None:
             raise HTTPException(status_code=400, detail="模型未训练或预测失败")
@@ -1195,137 +1723,89 @@ async def predict_video_views(video_features: dict):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def generate_mock_users(videos_df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """用视频数据生成5个偏好不同的模拟用户（真实用户不足时用于聚类演示）"""
+    mock_users = []
+    if videos_df.empty:
+        return mock_users
+
+    # 生成5个模拟用户
+    categories = videos_df['tname'].unique().tolist()
+
+    for i in range(5):
+        user_mid = f"mock_user_{i+1}"
+
+        # 为每个用户生成不同的观看偏好
+        if i == 0:  # 重度用户，喜欢科技
+            preferred_cats = ['科技', '数码']
+            watch_count = random.randint(80, 120)
+        elif i == 1:  # 娱乐用户
+            preferred_cats = ['娱乐', '音乐']
+            watch_count = random.randint(40, 60)
+        elif i == 2:  # 游戏用户
+            preferred_cats = ['游戏', '电竞']
+            watch_count = random.randint(60, 80)
+        elif i == 3:  # 学习用户
+            preferred_cats = ['知识', '教育']
+            watch_count = random.randint(30, 50)
+        else:  # 综合用户
+            preferred_cats = categories[:3]
+            watch_count = random.randint(20, 40)
+
+        # 生成观看历史
+        watch_history = []
+        for _ in range(watch_count):
+            # 70%概率选择偏好分区的视频
+            if random.random() < 0.7 and preferred_cats:
+                cat_videos = videos_df[videos_df['tname'].isin(preferred_cats)]
+                if not cat_videos.empty:
+                    video = cat_videos.sample(1).iloc[0]
+                else:
+                    video = videos_df.sample(1).iloc[0]
+            else:
+                video = videos_df.sample(1).iloc[0]
+
+            watch_history.append({
+                'bvid': video['bvid'],
+                'title': video['title'],
+                'tname': video['tname'],
+                'duration': video.get('duration', 300),
+                'view_at': int(time.time()) - random.randint(0, 30*24*3600),  # 最近30天
+                'like': random.randint(0, int(video.get('like', 0) * 0.1)),
+                'coin': random.randint(0, int(video.get('coin', 0) * 0.1)),
+                'share': random.randint(0, int(video.get('share', 0) * 0.1))
+            })
+
+        mock_users.append({
+            'user_mid': user_mid,
+            'user_info': {'mid': user_mid},
+            'watch_history': watch_history
+        })
+
+    return mock_users
+
+
 @app.get("/api/ml/user-clustering")
 async def analyze_user_clustering():
     """用户聚类分析"""
     try:
-        real_users = []
-
-        with engine.connect() as conn:
-            users_query = text("""
-            SELECT DISTINCT u.id, u.username, u.bilibili_mid, u.bilibili_name
-            FROM users u
-            WHERE u.bilibili_mid IS NOT NULL
-            """)
-            users_result = conn.execute(users_query)
-            users = users_result.fetchall()
-            
-            for user in users:
-                user_id, username, bilibili_mid, bilibili_name = user
-                
-                # 获取用户的观看历史
-                history_query = text("""
-                SELECT data_content 
-                FROM user_data 
-                WHERE user_mid = :user_mid AND data_type = 'watch_history'
-                ORDER BY created_at DESC 
-                LIMIT 1
-                """)
-                history_result = conn.execute(history_query, {'user_mid': str(user_id)})
-                history_rows = history_result.fetchall()
-                
-                watch_history = []
-                if history_rows:
-                    watch_history = json.loads(history_rows[0][0])
-                
-                # 获取用户基本信息
-                info_query = text("""
-                SELECT data_content 
-                FROM user_data 
-                WHERE user_mid = :user_mid AND data_type = 'user_info'
-                ORDER BY created_at DESC 
-                LIMIT 1
-                """)
-                info_result = conn.execute(info_query, {'user_mid': str(user_id)})
-                info_rows = info_result.fetchall()
-                
-                user_info = {}
-                if info_rows:
-                    user_info = json.loads(info_rows[0][0])
-                
-                real_users.append({
-                    'user_info': {
-                        'user_id': user_id,
-                        'username': username,
-                        'bilibili_mid': bilibili_mid,
-                        'bilibili_name': bilibili_name,
-                        **user_info
-                    },
-                    'watch_history': watch_history
-                })
-        
-        users_data = real_users
+        real_users = await run_io(user_history_repository.load_users, include_info=True)
+
+        users_data = list(real_users)
         
         # 如果用户数据不足，生成模拟数据
         if len(users_data) < 5:
             # 获取一些视频数据用于生成模拟历史
-            with engine.connect() as conn:
-                videos_df = pd.read_sql("""
-                SELECT bvid, title, tname, view, `like`, coin, share, duration
-                FROM videos 
-                ORDER BY collected_at DESC 
-                LIMIT 50
-                """, conn)
-            
-            if not videos_df.empty:
-                # 生成5个模拟用户
-                import random
-                categories = videos_df['tname'].unique().tolist()
-                
-                for i in range(5):
-                    user_mid = f"mock_user_{i+1}"
-                    
-                    # 为每个用户生成不同的观看偏好
-                    if i == 0:  # 重度用户，喜欢科技
-                        preferred_cats = ['科技', '数码']
-                        watch_count = random.randint(80, 120)
-                    elif i == 1:  # 娱乐用户
-                        preferred_cats = ['娱乐', '音乐']
-                        watch_count = random.randint(40, 60)
-                    elif i == 2:  # 游戏用户
-                        preferred_cats = ['游戏', '电竞']
-                        watch_count = random.randint(60, 80)
-                    elif i == 3:  # 学习用户
-                        preferred_cats = ['知识', '教育']
-                        watch_count = random.randint(30, 50)
-                    else:  # 综合用户
-                        preferred_cats = categories[:3]
-                        watch_count = random.randint(20, 40)
-                    
-                    # 生成观看历史
-                    watch_history = []
-                    for _ in range(watch_count):
-                        # 70%概率选择偏好分区的视频
-                        if random.random() < 0.7 and preferred_cats:
-                            cat_videos = videos_df[videos_df['tname'].isin(preferred_cats)]
-                            if not cat_videos.empty:
-                                video = cat_videos.sample(1).iloc[0]
-                            else:
-                                video = videos_df.sample(1).iloc[0]
-                        else:
-                            video = videos_df.sample(1).iloc[0]
-                        
-                        watch_history.append({
-                            'bvid': video['bvid'],
-                            'title': video['title'],
-                            'tname': video['tname'],
-                            'duration': video.get('duration', 300),
-                            'view_at': int(time.time()) - random.randint(0, 30*24*3600),  # 最近30天
-                            'like': random.randint(0, int(video.get('like', 0) * 0.1)),
-                            'coin': random.randint(0, int(video.get('coin', 0) * 0.1)),
-                            'share': random.randint(0, int(video.get('share', 0) * 0.1))
-                        })
-                    
-                    users_data.append({
-                        'user_mid': user_mid,
-                        'user_info': {'mid': user_mid},
-                        'watch_history': watch_history
-                    })
+            videos_df = await run_io(
+                analytics_system.load_videos,
+                ['bvid', 'title', 'tname', 'view', 'like', 'coin', 'share', 'duration'], limit=50
+            )
+            users_data.extend(await run_cpu(generate_mock_users, videos_df))
         
         if len(users_data) < 5:
             raise HTTPException(status_code=400, detail="无法生成足够的用户数据进行聚类分析")
         
-        cluster_analysis = ml_service.analyze_user_clusters(users_data)
+        cluster_analysis = await run_cpu(ml_service.analyze_user_clusters, users_data)
         
         # 计算真实用户数量
         real_users_count = len(real_users)
@@ -1336,13 +1816,13 @@ async def analyze_user_clustering():
         else:
             note = f"基于 {real_users_count} 个真实用户的聚类分析"
         
-        return {
+        return FastJSONResponse({
             "cluster_analysis": cluster_analysis,
             "total_users": len(users_data),
             "real_users_count": real_users_count,
             "simulated_users_count": simulated_users_count,
             "note": note
-        }
+        })
         
     except HTTPException:
         raise
@@ -1356,7 +1836,7 @@ async def analyze_sentiment(texts: List[str]):
         if not texts:
             raise HTTPException(status_code=400, detail="文本列表不能为空")
 
-        sentiment_analysis = ml_service.analyze_sentiment(texts)
+        sentiment_analysis = await run_cpu(ml_service.analyze_sentiment, texts)
 
         return {
             "sentiment_analysis": sentiment_analysis,
@@ -1375,7 +1855,7 @@ async def predict_trends(time_series_data: List[dict], periods: int = 7):
         if not time_series_data:
             raise HTTPException(status_code=400, detail="时间序列数据不能为空")
 
-        predictions = ml_service.predict_trends(time_series_data, periods)
+        predictions = await run_cpu(ml_service.predict_trends, time_series_data, periods)
 
         return {
             "predictions": predictions,
@@ -1424,45 +1904,8 @@ async def get_model_status():
 async def find_similar_users(current_user: dict = Depends(require_auth)):
     """找到相似用户"""
     try:
-        users_data = []
-
-        with engine.connect() as conn:
-            users_query = text("""
-            SELECT DISTINCT u.id, u.username, u.bilibili_mid, u.bilibili_name
-            FROM users u
-            WHERE u.bilibili_mid IS NOT NULL
-            """)
-            users_result = conn.execute(users_query)
-            users = users_result.fetchall()
-            
-            for user in users:
-                user_id, username, bilibili_mid, bilibili_name = user
-                
-                # 获取用户的观看历史
-                history_query = text("""
-                SELECT data_content 
-                FROM user_data 
-                WHERE user_mid = :user_mid AND data_type = 'watch_history'
-                ORDER BY created_at DESC 
-                LIMIT 1
-                """)
-                history_result = conn.execute(history_query, {'user_mid': str(user_id)})
-                history_rows = history_result.fetchall()
-                
-                watch_history = []
-                if history_rows:
-                    watch_history = json.loads(history_rows[0][0])
-                
-                users_data.append({
-                    'user_info': {
-                        'user_id': user_id,
-                        'username': username,
-                        'bilibili_mid': bilibili_mid,
-                        'bilibili_name': bilibili_name
-                    },
-                    'watch_history': watch_history
-                })
-        
+        users_data = await run_io(user_history_repository.load_users)
+
         if len(users_data) < 2:
             return {
                 "similar_users": [],
@@ -1470,7 +1913,8 @@ async def find_similar_users(current_user: dict = Depends(require_auth)):
             }
         
         # 找到相似用户
-        similar_users = ml_service.find_similar_users(
+        similar_users = await run_cpu(
+            ml_service.find_similar_users,
             target_user_id=current_user['user_id'],
             users_data=users_data,
             top_n=5
@@ -1494,84 +1938,45 @@ async def get_user_based_recommendations(
 ):
     """基于相似用户的推荐"""
     try:
-        with engine.connect() as conn:
-            videos_df = pd.read_sql("""
-            SELECT bvid, title, view, `like`, coin, share, tname, pubdate, `desc`
-            FROM videos 
-            ORDER BY collected_at DESC 
-            LIMIT 500
-            """, conn)
+        videos_df = await run_io(
+            analytics_system.load_videos,
+            ['bvid', 'title', 'view', 'like', 'coin', 'share', 'tname', 'pubdate', 'desc'], limit=500
+        )
         
         if videos_df.empty:
             raise HTTPException(status_code=404, detail="暂无视频数据")
         
-        # 获取所有用户数据
-        users_data = []
-        
-        with engine.connect() as conn:
-            # 获取所有有B站数据的用户
-            users_query = text("""
-            SELECT DISTINCT u.id, u.username, u.bilibili_mid, u.bilibili_name
-            FROM users u
-            WHERE u.bilibili_mid IS NOT NULL
-            """)
-            users_result = conn.execute(users_query)
-            users = users_result.fetchall()
-            
-            for user in users:
-                user_id, username, bilibili_mid, bilibili_name = user
-                
-                # 获取用户的观看历史
-                history_query = text("""
-                SELECT data_content 
-                FROM user_data 
-                WHERE user_mid = :user_mid AND data_type = 'watch_history'
-                ORDER BY created_at DESC 
-                LIMIT 1
-                """)
-                history_result = conn.execute(history_query, {'user_mid': str(user_id)})
-                history_rows = history_result.fetchall()
-                
-                watch_history = []
-                if history_rows:
-                    watch_history = json.loads(history_rows[0][0])
-                
-                users_data.append({
-                    'user_info': {
-                        'user_id': user_id,
-                        'username': username,
-                        'bilibili_mid': bilibili_mid,
-                        'bilibili_name': bilibili_name
-                    },
-                    'watch_history': watch_history
-                })
-        
+        # 一次性加载所有用户的观看记录
+        users_data = await run_io(user_history_repository.load_users)
+
         if len(users_data) < 2:
             # 如果用户数据不足，回退到普通推荐
-            recommendations = ml_service.get_video_recommendations(
+            recommendations = await run_cpu(
+                ml_service.get_video_recommendations,
                 videos_df=videos_df,
                 top_n=limit
             )
-            return {
+            return FastJSONResponse({
                 "recommendations": recommendations,
                 "recommendation_type": "popular",
                 "message": "用户数据不足，显示热门推荐"
-            }
+            })
         
         # 基于用户相似度的推荐
-        recommendations = ml_service.get_user_based_recommendations(
+        recommendations = await run_cpu(
+            ml_service.get_user_based_recommendations,
             target_user_id=current_user['user_id'],
             users_data=users_data,
             videos_df=videos_df,
             top_n=limit
         )
         
-        return {
+        return FastJSONResponse({
             "recommendations": recommendations,
             "recommendation_type": "user_collaborative_filtering",
             "total_users": len(users_data),
             "current_user_id": current_user['user_id']
-        }
+        })
         
     except HTTPException:
         raise
@@ -1592,7 +1997,8 @@ async def ai_chat(request: AIQueryRequest):
         AIQueryResponse: AI回答结果
     """
     try:
-        result = await ai_service.chat(
+        result = await run_io(
+            run_coroutine_sync, ai_service.chat,
             user_query=request.query,
             conversation_history=request.conversation_history
         )
@@ -1650,7 +2056,8 @@ async def ai_analyze_trend(metric: str = "view", time_range: str = "7d"):
         Dict: 趋势分析结果
     """
     try:
-        result = await ai_service.analyze_data_trend(
+        result = await run_io(
+            run_coroutine_sync, ai_service.analyze_data_trend,
             metric=metric,
             time_range=time_range
         )
@@ -1671,7 +2078,7 @@ async def get_ai_status():
     """
     try:
         test_query = "测试连接"
-        test_result = await ai_service.chat(test_query, [])
+        test_result = await run_io(run_coroutine_sync, ai_service.chat, test_query, [])
 
         status = {
             "service_available": test_result.get("success", False),
@@ -1703,21 +2110,19 @@ async def generate_daily_report(request: DailyReportRequest):
         if request.target_date:
             target_date = datetime.fromisoformat(request.target_date)
 
-        report = await report_service.generate_daily_report(target_date)
+        report = await run_render(run_coroutine_sync, report_service.generate_daily_report, target_date)
 
         if report["success"]:
-            file_path = report_service.save_report(report)
+            file_path = await run_io(report_service.save_report, report)
             report["file_path"] = file_path
 
-            clean_report = report_service._clean_data_for_json(report)
-
-            return JSONResponse(content={
+            return FastJSONResponse(content={
                 "success": True,
                 "message": "日报生成成功",
-                "report": clean_report
+                "report": report
             })
         else:
-            return JSONResponse(
+            return FastJSONResponse(
                 status_code=500,
                 content={
                     "success": False,
@@ -1727,7 +2132,7 @@ async def generate_daily_report(request: DailyReportRequest):
 
     except Exception as e:
         logger.error(f"生成日报API失败: {str(e)}")
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=500,
             content={
                 "success": False,
@@ -1748,42 +2153,23 @@ async def generate_weekly_report(request: WeeklyReportRequest):
             logger.info(f"解析后的week_start: {week_start}")
 
         logger.info("开始生成周报...")
-        report = await report_service.generate_weekly_report(week_start)
+        report = await run_render(run_coroutine_sync, report_service.generate_weekly_report, week_start)
         logger.info(f"周报生成结果: success={report.get('success')}")
 
         if report["success"]:
             logger.info("保存报告...")
-            file_path = report_service.save_report(report)
+            file_path = await run_io(report_service.save_report, report)
             report["file_path"] = file_path
             logger.info(f"报告保存完成: {file_path}")
 
-            logger.info("清理数据进行JSON序列化...")
-            try:
-                clean_report = report_service._clean_data_for_json(report)
-                logger.info("数据清理完成")
-            except Exception as clean_error:
-                logger.error(f"数据清理失败: {str(clean_error)}")
-                raise clean_error
-
-            logger.info("构建响应...")
-            response_data = {
+            return FastJSONResponse(content={
                 "success": True,
                 "message": "周报生成成功",
-                "report": clean_report
-            }
-
-            try:
-                import json
-                json.dumps(response_data)
-                logger.info("JSON序列化测试成功")
-            except Exception as json_error:
-                logger.error(f"JSON序列化测试失败: {str(json_error)}")
-                raise json_error
-
-            return JSONResponse(content=response_data)
+                "report": report
+            })
         else:
             logger.error(f"周报生成失败: {report.get('error', '未知错误')}")
-            return JSONResponse(
+            return FastJSONResponse(
                 status_code=500,
                 content={
                     "success": False,
@@ -1796,7 +2182,7 @@ async def generate_weekly_report(request: WeeklyReportRequest):
         logger.error(f"错误类型: {type(e).__name__}")
         import traceback
         logger.error(f"错误堆栈: {traceback.format_exc()}")
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=500,
             content={
                 "success": False,
@@ -1813,7 +2199,7 @@ async def list_reports():
 
         reports_dir = Path("reports")
         if not reports_dir.exists():
-            return JSONResponse(content={
+            return FastJSONResponse(content={
                 "success": True,
                 "reports": []
             })
@@ -1831,14 +2217,14 @@ async def list_reports():
 
         reports.sort(key=lambda x: x["modified_at"], reverse=True)
 
-        return JSONResponse(content={
+        return FastJSONResponse(content={
             "success": True,
             "reports": reports
         })
 
     except Exception as e:
         logger.error(f"获取报告列表失败: {str(e)}")
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=500,
             content={
                 "success": False,
@@ -1855,7 +2241,7 @@ async def download_report(filename: str):
         file_path = Path("reports") / filename
 
         if not file_path.exists():
-            return JSONResponse(
+            return FastJSONResponse(
                 status_code=404,
                 content={
                     "success": False,
@@ -1871,7 +2257,7 @@ async def download_report(filename: str):
 
     except Exception as e:
         logger.error(f"下载报告失败: {str(e)}")
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=500,
             content={
                 "success": False,
@@ -1888,7 +2274,7 @@ async def view_report(filename: str):
         file_path = Path("reports") / filename
 
         if not file_path.exists():
-            return JSONResponse(
+            return FastJSONResponse(
                 status_code=404,
                 content={
                     "success": False,
@@ -1899,7 +2285,7 @@ async def view_report(filename: str):
         with open(file_path, 'r', encoding='utf-8') as f:
             content = f.read()
 
-        return JSONResponse(content={
+        return FastJSONResponse(content={
             "success": True,
             "filename": filename,
             "content": content
@@ -1907,7 +2293,7 @@ async def view_report(filename: str):
 
     except Exception as e:
         logger.error(f"查看报告失败: {str(e)}")
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=500,
             content={
                 "success": False,
@@ -1924,7 +2310,7 @@ async def delete_report(filename: str):
         file_path = Path("reports") / filename
 
         if not file_path.exists():
-            return JSONResponse(
+            return FastJSONResponse(
                 status_code=404,
                 content={
                     "success": False,
@@ -1934,14 +2320,14 @@ async def delete_report(filename: str):
 
         file_path.unlink()
 
-        return JSONResponse(content={
+        return FastJSONResponse(content={
             "success": True,
             "message": "报告删除成功"
         })
 
     except Exception as e:
         logger.error(f"删除报告失败: {str(e)}")
-        return JSONResponse(
+        return FastJSONResponse(
             status_code=500,
             content={
                 "success": False,
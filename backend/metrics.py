@@ -0,0 +1,166 @@
+"""
+监控指标模块
+爬取流水线的Prometheus指标定义与记录辅助函数，由/metrics接口导出
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Optional
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+
+# B站接口路径到指标标签的映射，未知路径统一记为other，避免标签基数膨胀
+ENDPOINTS: Dict[str, str] = {
+    '/x/web-interface/popular': 'popular',
+    '/x/web-interface/view': 'video_detail',
+    '/x/tag/archive/tags': 'video_tags',
+    '/x/space/myinfo': 'user_info',
+    '/x/web-interface/history/cursor': 'watch_history',
+    '/x/v3/fav/folder/created/list-all': 'favorite_folders',
+    '/x/v3/fav/resource/list': 'favorite_resources',
+}
+
+PAGES_FETCHED = Counter(
+    'bilibili_crawl_pages_fetched_total',
+    '成功获取的列表分页数',
+    ['source']
+)
+VIDEOS_PROCESSED = Counter(
+    'bilibili_crawl_videos_processed_total',
+    '处理的视频数；result为detail(请求了详情)、cached(命中索引或标签缓存)或failed',
+    ['result']
+)
+API_REQUESTS = Counter(
+    'bilibili_api_requests_total',
+    '发往B站接口的HTTP请求数（含重试）',
+    ['endpoint']
+)
+DB_UPSERTED_ROWS = Counter(
+    'bilibili_crawl_db_upserted_rows_total',
+    '写入videos表的行数'
+)
+DB_UPSERT_FAILED_ROWS = Counter(
+    'bilibili_crawl_db_upsert_failed_rows_total',
+    '写入失败的视频行数'
+)
+ERRORS = Counter(
+    'bilibili_crawl_errors_total',
+    '爬取过程中的错误数',
+    ['type']
+)
+REQUEST_LATENCY = Histogram(
+    'bilibili_api_request_seconds',
+    '单次B站接口请求耗时',
+    ['endpoint'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+VIDEO_PROCESSING = Histogram(
+    'bilibili_crawl_video_processing_seconds',
+    '单个视频从列表项到写入缓冲区的端到端耗时',
+    buckets=(0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    'bilibili_api_requests_in_flight',
+    '正在进行的B站接口请求数'
+)
+# 以下两个指标的部分样本在抓取时读取外部状态，由_StatsCollector统一导出，不直接注册
+QUEUE_DEPTH = Gauge(
+    'bilibili_crawl_queue_depth',
+    '队列深度；queue为sink_buffer(待批量写入的视频)或分布式队列的pending/leased/dead',
+    ['queue'],
+    registry=None
+)
+TAG_CACHE = Gauge(
+    'bilibili_tag_cache',
+    '标签缓存统计(启动以来的累计值)',
+    ['stat'],
+    registry=None
+)
+
+
+class _StatsCollector:
+    """
+    导出一个带单个标签的Gauge，并在每次抓取时调用一次stats()补充样本
+
+    set_function为每个标签各调用一次stats()，分布式队列每个标签都是一轮Redis请求；
+    这里每次抓取只读取一次。stats()失败时只导出已有样本。
+    """
+
+    def __init__(self, gauge: Gauge, label: str, keys: Iterable[str]):
+        self.gauge = gauge
+        self.label = label
+        self.keys = tuple(keys)
+        self.stats: Optional[Callable[[], Dict]] = None
+
+    def describe(self):
+        return [GaugeMetricFamily(self.gauge._name, self.gauge._documentation, labels=[self.label])]
+
+    def collect(self):
+        family = GaugeMetricFamily(self.gauge._name, self.gauge._documentation, labels=[self.label])
+        for metric in self.gauge.collect():
+            for sample in metric.samples:
+                family.add_metric([sample.labels[self.label]], sample.value)
+        if self.stats is not None:
+            try:
+                stats = self.stats()
+            except Exception:
+                ERRORS.labels(type='metrics_collect').inc()
+            else:
+                for key in self.keys:
+                    family.add_metric([key], stats[key])
+        yield family
+
+
+_QUEUE_COLLECTOR = _StatsCollector(QUEUE_DEPTH, 'queue', ('pending', 'leased', 'dead'))
+_TAG_CACHE_COLLECTOR = _StatsCollector(TAG_CACHE, 'stat', ('memory_hits', 'db_hits', 'misses', 'hit_rate'))
+REGISTRY.register(_QUEUE_COLLECTOR)
+REGISTRY.register(_TAG_CACHE_COLLECTOR)
+
+# 预先绑定标签，热路径上只做一次字典查找
+_REQUEST_COUNTERS = {name: API_REQUESTS.labels(endpoint=name) for name in list(ENDPOINTS.values()) + ['other']}
+_REQUEST_TIMERS = {name: REQUEST_LATENCY.labels(endpoint=name) for name in _REQUEST_COUNTERS}
+SINK_BUFFER_DEPTH = QUEUE_DEPTH.labels(queue='sink_buffer')
+VIDEOS_DETAIL = VIDEOS_PROCESSED.labels(result='detail')
+VIDEOS_CACHED = VIDEOS_PROCESSED.labels(result='cached')
+VIDEOS_FAILED = VIDEOS_PROCESSED.labels(result='failed')
+
+
+def endpoint_name(url: str) -> str:
+    """将完整URL或相对路径映射为指标标签"""
+    path = url.split('bilibili.com', 1)[-1].split('?', 1)[0]
+    return ENDPOINTS.get(path, 'other')
+
+
+@contextmanager
+def track_request(url: str):
+    """记录一次HTTP请求的次数、耗时与并发数"""
+    endpoint = endpoint_name(url)
+    _REQUEST_COUNTERS[endpoint].inc()
+    REQUESTS_IN_FLIGHT.inc()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _REQUEST_TIMERS[endpoint].observe(time.perf_counter() - start)
+        REQUESTS_IN_FLIGHT.dec()
+
+
+def record_error(error: BaseException):
+    """按异常类型记录错误"""
+    ERRORS.labels(type=type(error).__name__).inc()
+
+
+def register_tag_cache(tag_cache):
+    """抓取时从TagCache读取命中统计"""
+    _TAG_CACHE_COLLECTOR.stats = tag_cache.stats
+
+
+def register_crawl_queue(crawl_queue):
+    """抓取时从分布式爬取队列读取深度"""
+    _QUEUE_COLLECTOR.stats = crawl_queue.stats
+
+
+def render_latest():
+    """导出当前指标，返回(内容, Content-Type)"""
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -18,6 +18,9 @@ from datetime import datetime, timedelta
 import warnings
 warnings.filterwarnings('ignore')
 
+# 视频推荐结果的基础列；各推荐路径都返回DataFrame，没有结果时返回带这些列的空表
+RECOMMENDATION_COLUMNS = ['bvid', 'title', 'view', 'like', 'coin', 'share']
+
 class VideoRecommendationSystem:
     """视频推荐系统"""
 
@@ -39,14 +42,15 @@ class VideoRecommendationSystem:
         tfidf_matrix = self.tfidf_vectorizer.fit_transform(videos_df['content_seg'])
 
         self.content_similarity_matrix = cosine_similarity(tfidf_matrix)
-        self.video_features = videos_df[['bvid', 'title', 'view', 'like', 'coin', 'share']].copy()
+        self.video_features = videos_df[RECOMMENDATION_COLUMNS].copy()
 
         return self.content_similarity_matrix
 
     def get_content_based_recommendations(self, video_bvid, top_n=10):
         """基于内容的推荐"""
+        empty = pd.DataFrame(columns=RECOMMENDATION_COLUMNS + ['similarity_score'])
         if self.content_similarity_matrix is None:
-            return []
+            return empty
 
         try:
             video_idx = self.video_features[self.video_features['bvid'] == video_bvid].index[0]
@@ -56,14 +60,12 @@ class VideoRecommendationSystem:
             similar_videos = sim_scores[1:top_n+1]
             recommended_indices = [i[0] for i in similar_videos]
 
-            recommendations = self.video_features.iloc[recommended_indices].to_dict('records')
-
-            for i, rec in enumerate(recommendations):
-                rec['similarity_score'] = similar_videos[i][1]
+            recommendations = self.video_features.iloc[recommended_indices].copy()
+            recommendations['similarity_score'] = [score for _, score in similar_videos]
 
             return recommendations
         except:
-            return []
+            return empty
 
     def get_popular_recommendations(self, all_videos, top_n=10):
         """热门视频推荐"""
@@ -87,7 +89,7 @@ class VideoRecommendationSystem:
             time_factor = np.exp(-days_ago / 30)
             recommendations['popularity_score'] *= time_factor
 
-        return recommendations.nlargest(top_n, 'popularity_score').to_dict('records')
+        return recommendations.nlargest(top_n, 'popularity_score')
 
     def get_collaborative_filtering_recommendations(self, user_history, all_videos, top_n=10):
         """协同过滤推荐（简化版）"""
@@ -123,7 +125,7 @@ class VideoRecommendationSystem:
             recommendations['share'] * 0.2
         ) * recommendations['category_score']
 
-        return recommendations.nlargest(top_n, 'recommendation_score').to_dict('records')
+        return recommendations.nlargest(top_n, 'recommendation_score')
 
     def prepare_user_features(self, users_data):
         """准备用户特征矩阵"""
@@ -697,7 +699,7 @@ class MLService:
     def get_video_recommendations(self, user_history=None, video_bvid=None, videos_df=None, top_n=10):
         """获取视频推荐"""
         if videos_df is None or len(videos_df) == 0:
-            return []
+            return pd.DataFrame(columns=RECOMMENDATION_COLUMNS)
 
         self.recommendation_system.prepare_content_features(videos_df)
 
@@ -0,0 +1,379 @@
+"""
+分区与归档模块
+按月RANGE分区管理随时间无限增长的表：提前创建未来月份的分区，把超过保留期的冷分区
+导出为压缩的Parquet文件后删除，需要时可将归档重新载入独立的表做临时分析
+
+用法:
+    python partitions.py setup [--table video_stat_snapshots]     # 将已有表转换为按月分区（会重建表）
+    python partitions.py maintain                                 # 创建未来分区并归档过期分区
+    python partitions.py list
+    python partitions.py reattach user_data p202401               # 载入为表user_data_p202401
+    python partitions.py detach user_data p202401
+"""
+
+import argparse
+import logging
+import os
+import re
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# 兜底分区：承接最后一个按月分区之后的数据，新增月份时从中拆分
+FUTURE_PARTITION = 'pfuture'
+
+PARTITION_NAME_PATTERN = re.compile(r'^p(\d{4})(\d{2})$')
+
+# 维护任务的MySQL命名锁，避免多个worker同时执行ALTER
+MAINTENANCE_LOCK = 'partition_maintenance'
+
+
+def month_start(value: date) -> date:
+    """所在月份的第一天"""
+    return date(value.year, value.month, 1)
+
+
+def add_months(month: date, months: int) -> date:
+    """月份加减"""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    """月份对应的分区名，分区pYYYYMM存放该月（及更早未归档）的数据"""
+    return f"p{month:%Y%m}"
+
+
+def partition_month(name: str) -> Optional[date]:
+    """从分区名解析月份，兜底分区等其它名称返回None"""
+    match = PARTITION_NAME_PATTERN.match(name or '')
+    if not match:
+        return None
+    return date(int(match.group(1)), int(match.group(2)), 1)
+
+
+class PartitionManager:
+    """按月分区的创建、维护、归档与重新载入"""
+
+    def __init__(self, engine, tables: Dict[str, Dict[str, Any]], archive_dir: str,
+                 future_months: int = 3, chunksize: int = 50000):
+        """
+        初始化分区管理器
+
+        Args:
+            engine: SQLAlchemy数据库引擎
+            tables: 表名 -> 分区配置（column、kind、retention_months、primary_key、column_definition）
+            archive_dir: 归档文件目录
+            future_months: 提前创建的未来月份数
+            chunksize: 导出与载入归档时每批的行数
+        """
+        self.engine = engine
+        self.tables = tables
+        self.archive_dir = archive_dir
+        self.future_months = future_months
+        self.chunksize = chunksize
+        self._init_tables()
+
+    def _init_tables(self):
+        """初始化归档记录表"""
+        with self.engine.begin() as conn:
+            conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS partition_archives (
+                table_name VARCHAR(64) NOT NULL,
+                partition_name VARCHAR(64) NOT NULL,
+                path VARCHAR(255) NOT NULL,
+                row_count BIGINT NOT NULL DEFAULT 0,
+                archived_at DATETIME NOT NULL,
+                PRIMARY KEY (table_name, partition_name)
+            )
+            """))
+
+    def _bound(self, table: str, month: date) -> str:
+        """分区上界的SQL字面量：DATETIME列用日期字符串，秒级时间戳列用本地时间的月初时间戳"""
+        if self.tables[table].get('kind') == 'epoch':
+            return str(int(datetime(month.year, month.month, 1).timestamp()))
+        return f"'{month:%Y-%m-%d}'"
+
+    def _partition_clause(self, table: str, month: date) -> str:
+        """分区month的定义：存放小于下个月初的数据"""
+        return f"PARTITION {partition_name(month)} VALUES LESS THAN ({self._bound(table, add_months(month, 1))})"
+
+    def list_partitions(self, conn, table: str) -> List[Dict[str, Any]]:
+        """表的分区列表（按顺序），未分区时返回空列表"""
+        rows = conn.execute(text("""
+        SELECT partition_name, partition_description, table_rows
+        FROM information_schema.partitions
+        WHERE table_schema = DATABASE() AND table_name = :table AND partition_name IS NOT NULL
+        ORDER BY partition_ordinal_position
+        """), {"table": table}).fetchall()
+        return [
+            {"name": row.partition_name, "bound": row.partition_description, "rows": row.table_rows}
+            for row in rows
+        ]
+
+    def setup(self, table: str) -> bool:
+        """
+        将未分区的表转换为按月分区，已分区时不做任何操作
+
+        ALTER会重建整张表，大表应在低峰期执行并预留磁盘空间。
+
+        Args:
+            table: 表名
+
+        Returns:
+            bool: 是否执行了转换
+        """
+        config = self.tables[table]
+        column = config['column']
+
+        with self.engine.begin() as conn:
+            if self.list_partitions(conn, table):
+                return False
+
+            # 分区列必须包含在主键中，且主键列不能为NULL
+            if config.get('primary_key'):
+                conn.execute(text(f"UPDATE {table} SET {column} = NOW() WHERE {column} IS NULL"))
+                conn.execute(text(f"""
+                ALTER TABLE {table}
+                    MODIFY {column} {config['column_definition']},
+                    DROP PRIMARY KEY,
+                    ADD PRIMARY KEY ({', '.join(config['primary_key'])})
+                """))
+
+            oldest = conn.execute(text(f"SELECT MIN({column}) FROM {table}")).scalar()
+            if oldest is None:
+                first = month_start(date.today())
+            elif config.get('kind') == 'epoch':
+                first = month_start(datetime.fromtimestamp(oldest).date())
+            else:
+                first = month_start(oldest)
+
+            last = add_months(month_start(date.today()), self.future_months)
+            clauses = []
+            month = first
+            while month <= last:
+                clauses.append(self._partition_clause(table, month))
+                month = add_months(month, 1)
+            clauses.append(f"PARTITION {FUTURE_PARTITION} VALUES LESS THAN (MAXVALUE)")
+
+            partition_by = f"RANGE ({column})" if config.get('kind') == 'epoch' else f"RANGE COLUMNS ({column})"
+            conn.execute(text(f"ALTER TABLE {table} PARTITION BY {partition_by} ({', '.join(clauses)})"))
+
+        logger.info(f"{table}已按月分区: {partition_name(first)} ~ {partition_name(last)}")
+        return True
+
+    def ensure_future_partitions(self, table: str) -> List[str]:
+        """从兜底分区拆分出未来future_months个月的分区，返回新建的分区名"""
+        with self.engine.begin() as conn:
+            partitions = self.list_partitions(conn, table)
+            months = [partition_month(p['name']) for p in partitions]
+            months = [month for month in months if month is not None]
+            if not months:
+                return []
+
+            last = add_months(month_start(date.today()), self.future_months)
+            month = add_months(max(months), 1)
+            created = []
+            clauses = []
+            while month <= last:
+                clauses.append(self._partition_clause(table, month))
+                created.append(partition_name(month))
+                month = add_months(month, 1)
+
+            if clauses:
+                clauses.append(f"PARTITION {FUTURE_PARTITION} VALUES LESS THAN (MAXVALUE)")
+                conn.execute(text(
+                    f"ALTER TABLE {table} REORGANIZE PARTITION {FUTURE_PARTITION} INTO ({', '.join(clauses)})"
+                ))
+                logger.info(f"{table}新增分区: {created}")
+            return created
+
+    def archive_path(self, table: str, partition: str) -> str:
+        return os.path.join(self.archive_dir, table, f"{partition}.parquet")
+
+    def archive_partition(self, table: str, partition: str) -> int:
+        """
+        将一个分区导出为zstd压缩的Parquet文件，校验行数后删除该分区
+
+        Args:
+            table: 表名
+            partition: 分区名
+
+        Returns:
+            int: 归档的行数
+        """
+        path = self.archive_path(table, partition)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+
+        written = 0
+        writer = None
+        schema = None
+        try:
+            with self.engine.connect() as conn:
+                conn = conn.execution_options(stream_results=True, yield_per=self.chunksize)
+                chunks = pd.read_sql(text(f"SELECT * FROM {table} PARTITION ({partition})"), conn,
+                                     chunksize=self.chunksize)
+                for chunk in chunks:
+                    if schema is None:
+                        # 首批某列全为NULL时按字符串列处理，避免后续批次类型不一致
+                        inferred = pa.Schema.from_pandas(chunk, preserve_index=False)
+                        schema = pa.schema([
+                            field.with_type(pa.string()) if pa.types.is_null(field.type) else field
+                            for field in inferred
+                        ])
+                        writer = pq.ParquetWriter(tmp_path, schema, compression='zstd')
+                    writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False, safe=False))
+                    written += len(chunk)
+        finally:
+            if writer is not None:
+                writer.close()
+
+        with self.engine.begin() as conn:
+            count = conn.execute(text(f"SELECT COUNT(*) FROM {table} PARTITION ({partition})")).scalar()
+            if count != written:
+                raise RuntimeError(f"{table}.{partition}导出{written}行，当前{count}行，放弃删除分区")
+
+            if written:
+                os.replace(tmp_path, path)
+            elif os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            conn.execute(text("""
+            REPLACE INTO partition_archives (table_name, partition_name, path, row_count, archived_at)
+            VALUES (:table, :partition, :path, :rows, :now)
+            """), {"table": table, "partition": partition, "path": path if written else '',
+                   "rows": written, "now": datetime.now()})
+            conn.execute(text(f"ALTER TABLE {table} DROP PARTITION {partition}"))
+
+        logger.info(f"{table}.{partition}已归档{written}行到{path if written else '(空分区)'}")
+        return written
+
+    def archive_expired(self, table: str) -> Dict[str, int]:
+        """归档超过保留期的分区，返回分区名 -> 归档行数"""
+        retention = self.tables[table].get('retention_months')
+        if not retention:
+            return {}
+
+        cutoff = add_months(month_start(date.today()), -retention)
+        with self.engine.connect() as conn:
+            partitions = self.list_partitions(conn, table)
+
+        expired = [p['name'] for p in partitions
+                   if partition_month(p['name']) is not None and partition_month(p['name']) < cutoff]
+        # 至少保留一个按月分区，兜底分区之前必须有分区承接旧数据
+        monthly = [p['name'] for p in partitions if partition_month(p['name']) is not None]
+        if len(expired) >= len(monthly):
+            expired = expired[:-1]
+
+        stats = {}
+        for partition in expired:
+            stats[partition] = self.archive_partition(table, partition)
+        return stats
+
+    def maintain(self) -> Dict[str, Any]:
+        """定时任务：为所有已分区的表创建未来分区并归档过期分区"""
+        stats: Dict[str, Any] = {}
+        with self.engine.connect() as lock_conn:
+            if not lock_conn.execute(text("SELECT GET_LOCK(:name, 0)"), {"name": MAINTENANCE_LOCK}).scalar():
+                logger.info("分区维护正在其它进程中执行，跳过")
+                return stats
+            try:
+                for table in self.tables:
+                    try:
+                        with self.engine.connect() as conn:
+                            if not self.list_partitions(conn, table):
+                                logger.warning(f"{table}尚未分区，请执行 python partitions.py setup --table {table}")
+                                continue
+                        stats[table] = {
+                            "created": self.ensure_future_partitions(table),
+                            "archived": self.archive_expired(table)
+                        }
+                    except Exception as e:
+                        logger.error(f"{table}分区维护失败: {str(e)}")
+            finally:
+                lock_conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": MAINTENANCE_LOCK})
+
+        logger.info(f"分区维护完成: {stats}")
+        return stats
+
+    def reattach(self, table: str, partition: str) -> str:
+        """
+        将归档的分区载入独立的未分区表{table}_{partition}供临时分析，不影响原表
+
+        Returns:
+            str: 载入后的表名
+        """
+        path = self.archive_path(table, partition)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"归档文件不存在: {path}")
+
+        target = f"{table}_{partition}"
+        with self.engine.begin() as conn:
+            conn.execute(text(f"DROP TABLE IF EXISTS {target}"))
+            conn.execute(text(f"CREATE TABLE {target} LIKE {table}"))
+            if self.list_partitions(conn, target):
+                conn.execute(text(f"ALTER TABLE {target} REMOVE PARTITIONING"))
+
+            loaded = 0
+            for batch in pq.ParquetFile(path).iter_batches(batch_size=self.chunksize):
+                df = batch.to_pandas()
+                df.to_sql(target, conn, if_exists='append', index=False)
+                loaded += len(df)
+
+        logger.info(f"{path}已载入{target}: {loaded}行")
+        return target
+
+    def detach(self, table: str, partition: str):
+        """删除reattach创建的临时表"""
+        with self.engine.begin() as conn:
+            conn.execute(text(f"DROP TABLE IF EXISTS {table}_{partition}"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="按月分区与归档维护")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    setup_parser = subparsers.add_parser("setup", help="将已有表转换为按月分区")
+    setup_parser.add_argument("--table", help="只转换指定的表，默认全部")
+
+    subparsers.add_parser("maintain", help="创建未来分区并归档过期分区")
+    subparsers.add_parser("list", help="列出各表的分区")
+
+    for name, help_text in (("reattach", "将归档载入临时表"), ("detach", "删除载入的临时表")):
+        sub = subparsers.add_parser(name, help=help_text)
+        sub.add_argument("table")
+        sub.add_argument("partition")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    from config import PARTITION_CONFIG
+    from database import engine
+
+    manager = PartitionManager(
+        engine, PARTITION_CONFIG['tables'], PARTITION_CONFIG['archive_dir'], PARTITION_CONFIG['future_months']
+    )
+
+    if args.command == "setup":
+        for table in ([args.table] if args.table else PARTITION_CONFIG['tables']):
+            print(table, "converted" if manager.setup(table) else "already partitioned")
+    elif args.command == "maintain":
+        print(manager.maintain())
+    elif args.command == "list":
+        with engine.connect() as conn:
+            for table in PARTITION_CONFIG['tables']:
+                print(table, [(p['name'], p['rows']) for p in manager.list_partitions(conn, table)])
+    elif args.command == "reattach":
+        print(manager.reattach(args.table, args.partition))
+    elif args.command == "detach":
+        manager.detach(args.table, args.partition)
+
+
+if __name__ == "__main__":
+    main()
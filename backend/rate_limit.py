@@ -0,0 +1,270 @@
+"""
+请求限速与重试模块
+自适应令牌桶限速、指数退避重试与熔断器，供B站爬虫共享使用
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+import httpx
+import requests
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# B站风控响应：HTTP 412，或业务码-412(请求被拦截)/-799(请求过于频繁)
+RISK_CONTROL_STATUS = 412
+RISK_CONTROL_CODES = (-412, -799)
+
+RETRYABLE_EXCEPTIONS = (
+    requests.exceptions.RequestException,
+    httpx.TransportError,
+    httpx.HTTPStatusError,
+    ValueError
+)
+
+
+class RiskControlError(Exception):
+    """触发B站风控"""
+
+
+class CircuitOpenError(Exception):
+    """熔断器打开，暂停请求"""
+
+
+class AdaptiveRateLimiter:
+    """自适应令牌桶：成功时加性提速，触发风控时乘性降速"""
+
+    def __init__(self, rate: float, burst: float, min_rate: float, max_rate: float,
+                 increase_step: float = 0.05, decrease_factor: float = 0.5):
+        """
+        初始化限速器
+
+        Args:
+            rate: 初始速率(请求/秒)
+            burst: 令牌桶容量
+            min_rate: 速率下限
+            max_rate: 速率上限
+            increase_step: 每次成功请求增加的速率
+            decrease_factor: 触发风控时速率乘以该系数
+        """
+        self.rate = rate
+        self.burst = burst
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase_step = increase_step
+        self.decrease_factor = decrease_factor
+        self._tokens = burst
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """预占一个令牌，返回需要等待的秒数"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+    def acquire(self):
+        """同步获取令牌"""
+        wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """异步获取令牌"""
+        wait = self._reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def on_success(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase_step)
+
+    def on_throttled(self):
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+            # 清空已积累的令牌，避免降速后立即突发
+            self._tokens = min(self._tokens, 0)
+        logger.warning(f"触发风控，请求速率降至 {self.rate:.2f}/s")
+
+
+class CircuitBreaker:
+    """
+    熔断器：连续失败达到阈值后打开，冷却后放行一次试探请求
+
+    试探请求超过reset_timeout仍未返回结果（被取消或挂起）时视为丢失，再放行一次新的试探。
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 60):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_started_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            if self.state == "open":
+                if now - self._opened_at < self.reset_timeout:
+                    return False
+                self.state = "half_open"
+                self._probe_started_at = now
+                return True
+            if self.state == "half_open":
+                # 试探请求未返回前不放行其他请求
+                if now - self._probe_started_at < self.reset_timeout:
+                    return False
+                self._probe_started_at = now
+                return True
+            return True
+
+    def release_probe(self):
+        """试探请求被取消、没有得到结果时调用，下一次请求立即重新试探"""
+        with self._lock:
+            if self.state == "half_open":
+                self.state = "open"
+                self._opened_at = time.monotonic() - self.reset_timeout
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self._failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == "half_open" or self._failures >= self.failure_threshold:
+                if self.state != "open":
+                    logger.warning(f"连续失败{self._failures}次，熔断{self.reset_timeout}秒")
+                self.state = "open"
+                self._opened_at = time.monotonic()
+
+
+class RetryPolicy:
+    """指数退避重试策略（full jitter）"""
+
+    def __init__(self, max_retries: int = 3, base_delay: float = 1.0, max_delay: float = 60.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+class RequestThrottle:
+    """组合限速、重试与熔断，包装单次HTTP请求并返回解析后的JSON"""
+
+    def __init__(self, limiter: AdaptiveRateLimiter, retry_policy: RetryPolicy, breaker: CircuitBreaker):
+        self.limiter = limiter
+        self.retry_policy = retry_policy
+        self.breaker = breaker
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "RequestThrottle":
+        """根据CRAWLER_CONFIG创建"""
+        rate_config = config['rate_limit']
+        return cls(
+            limiter=AdaptiveRateLimiter(
+                rate=rate_config['rate'],
+                burst=rate_config['burst'],
+                min_rate=rate_config['min_rate'],
+                max_rate=rate_config['max_rate']
+            ),
+            retry_policy=RetryPolicy(
+                max_retries=config['max_retries'],
+                base_delay=config['backoff_base'],
+                max_delay=config['backoff_max']
+            ),
+            breaker=CircuitBreaker(
+                failure_threshold=config['circuit_failure_threshold'],
+                reset_timeout=config['circuit_reset_timeout']
+            )
+        )
+
+    def _handle_response(self, response) -> Dict[str, Any]:
+        """检查响应；风控抛出RiskControlError，服务端错误抛出异常以便重试"""
+        if response.status_code == RISK_CONTROL_STATUS:
+            raise RiskControlError(f"HTTP {response.status_code}")
+        response.raise_for_status()
+        payload = response.json()
+        if payload.get("code") in RISK_CONTROL_CODES:
+            raise RiskControlError(f"code {payload.get('code')}: {payload.get('message')}")
+        return payload
+
+    def _is_retryable(self, error: Exception) -> bool:
+        if isinstance(error, (RiskControlError,) + RETRYABLE_EXCEPTIONS):
+            status = getattr(getattr(error, "response", None), "status_code", None)
+            # 4xx(风控除外)属于请求本身的问题，重试无意义
+            return status is None or status >= 500
+        return False
+
+    def _on_error(self, error: Exception):
+        metrics.record_error(error)
+        if isinstance(error, RiskControlError):
+            self.limiter.on_throttled()
+        if self._is_retryable(error):
+            self.breaker.record_failure()
+        else:
+            # 非重试类错误说明服务端可达，不计入熔断
+            self.breaker.record_success()
+
+    def run(self, request_fn: Callable[[], Any]) -> Dict[str, Any]:
+        """同步执行请求"""
+        for attempt in range(self.retry_policy.max_retries + 1):
+            if not self.breaker.allow():
+                metrics.ERRORS.labels(type="CircuitOpenError").inc()
+                raise CircuitOpenError("B站请求熔断中")
+            try:
+                self.limiter.acquire()
+                payload = self._handle_response(request_fn())
+            except Exception as e:
+                self._on_error(e)
+                if not self._is_retryable(e) or attempt == self.retry_policy.max_retries:
+                    raise
+                time.sleep(self.retry_policy.delay(attempt))
+                continue
+            except BaseException:
+                self.breaker.release_probe()
+                raise
+
+            self.limiter.on_success()
+            self.breaker.record_success()
+            return payload
+
+    async def run_async(self, request_fn: Callable[[], Awaitable[Any]]) -> Dict[str, Any]:
+        """异步执行请求"""
+        for attempt in range(self.retry_policy.max_retries + 1):
+            if not self.breaker.allow():
+                metrics.ERRORS.labels(type="CircuitOpenError").inc()
+                raise CircuitOpenError("B站请求熔断中")
+            try:
+                await self.limiter.acquire_async()
+                payload = self._handle_response(await request_fn())
+            except Exception as e:
+                self._on_error(e)
+                if not self._is_retryable(e) or attempt == self.retry_policy.max_retries:
+                    raise
+                await asyncio.sleep(self.retry_policy.delay(attempt))
+                continue
+            except BaseException:
+                # 取消（CancelledError不是Exception）时试探请求没有结果，不能让熔断器停在half_open
+                self.breaker.release_probe()
+                raise
+
+            self.limiter.on_success()
+            self.breaker.record_success()
+            return payload
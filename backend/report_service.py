@@ -26,14 +26,16 @@ plt.rcParams['axes.unicode_minus'] = False
 class ReportService:
     """自动化报告生成服务"""
 
-    def __init__(self, engine=None):
+    def __init__(self, engine=None, analytics=None):
         """
         初始化报告服务
 
         Args:
             engine: SQLAlchemy数据库引擎
+            analytics: 可选的DuckDB分析引擎，配置后明细视频的聚合在Arrow镜像上执行（镜像尚未生成时仍查询MySQL）
         """
         self.engine = engine
+        self.analytics = analytics
         self.report_templates = self._load_templates()
         self.jinja_env = self._setup_jinja_environment()
 
@@ -151,19 +153,17 @@ class ReportService:
         except (ValueError, TypeError):
             return 0
 
-    def _clean_data_for_json(self, data):
-        """递归清理数据中的Decimal类型，确保JSON序列化兼容"""
-        if isinstance(data, dict):
-            return {key: self._clean_data_for_json(value) for key, value in data.items()}
-        elif isinstance(data, list):
-            return [self._clean_data_for_json(item) for item in data]
-        elif isinstance(data, Decimal):
-            if data % 1 == 0:
-                return int(data)
-            else:
-                return float(data)
-        else:
-            return data
+    def _day_range(self, target_date: datetime) -> Dict[str, datetime]:
+        """某一天的采集时间范围[day_start, day_end)，可走collected_at索引"""
+        day_start = datetime.combine(target_date.date(), datetime.min.time())
+        return {"day_start": day_start, "day_end": day_start + timedelta(days=1)}
+
+    def _week_range(self, week_start: datetime, week_end: datetime) -> Dict[str, datetime]:
+        """周报的采集时间范围[range_start, range_end)，包含week_end当天"""
+        return {
+            "range_start": datetime.combine(week_start.date(), datetime.min.time()),
+            "range_end": datetime.combine(week_end.date(), datetime.min.time()) + timedelta(days=1)
+        }
 
     async def generate_daily_report(self, target_date: datetime = None) -> Dict[str, Any]:
         """
@@ -209,7 +209,7 @@ class ReportService:
                 "charts": await self._generate_daily_charts(target_date)
             }
 
-            return self._clean_data_for_json(result)
+            return result
 
         except Exception as e:
             logger.error(f"生成日报失败: {str(e)}")
@@ -273,7 +273,7 @@ class ReportService:
                 "stats": stats
             }
 
-            return self._clean_data_for_json(result)
+            return result
 
         except Exception as e:
             logger.error(f"生成周报失败: {str(e)}")
@@ -290,14 +290,14 @@ class ReportService:
         with self.engine.connect() as conn:
             result = conn.execute(text("""
                 SELECT 
-                    COUNT(*) as total_videos,
-                    SUM(view) as total_views,
-                    AVG(view) as avg_views,
-                    SUM(`like`) as total_likes,
-                    SUM(coin) as total_coins,
-                    SUM(share) as total_shares
-                FROM videos 
-                WHERE DATE(collected_at) = DATE(:target_date)
+                    SUM(video_count) as total_videos,
+                    SUM(total_view) as total_views,
+                    SUM(total_view) / NULLIF(SUM(video_count), 0) as avg_views,
+                    SUM(total_like) as total_likes,
+                    SUM(total_coin) as total_coins,
+                    SUM(total_share) as total_shares
+                FROM video_rollup_daily 
+                WHERE day = DATE(:target_date)
             """), {"target_date": target_date}).fetchone()
             
             if result:
@@ -320,12 +320,11 @@ class ReportService:
             result = conn.execute(text("""
                 SELECT 
                     tname as name,
-                    COUNT(*) as video_count,
-                    AVG(view) as avg_views,
-                    SUM(view) as total_views
-                FROM videos 
-                WHERE DATE(collected_at) = DATE(:target_date) AND tname IS NOT NULL
-                GROUP BY tname
+                    video_count,
+                    total_view / NULLIF(video_count, 0) as avg_views,
+                    total_view as total_views
+                FROM video_rollup_daily 
+                WHERE day = DATE(:target_date) AND tname <> ''
                 ORDER BY video_count DESC, avg_views DESC
                 LIMIT :limit
             """), {"target_date": target_date, "limit": limit}).fetchall()
@@ -345,28 +344,37 @@ class ReportService:
         if not self.engine:
             return []
 
-        with self.engine.connect() as conn:
-            result = conn.execute(text("""
-                SELECT 
-                    title, author, view, `like`, coin, share, bvid
-                FROM videos 
-                WHERE DATE(collected_at) = DATE(:target_date)
+        if self.analytics is not None and self.analytics.available():
+            result = self.analytics.query(f"""
+                SELECT title, author, view, "like", coin, share, bvid
+                FROM videos
+                WHERE collected_at >= $day_start AND collected_at < $day_end
                 ORDER BY view DESC
-                LIMIT :limit
-            """), {"target_date": target_date, "limit": limit}).fetchall()
-            
-            return [
-                {
-                    "title": row.title[:50] + "..." if len(row.title) > 50 else row.title,
-                    "author": row.author,
-                    "view": self._safe_int(row.view),
-                    "like": self._safe_int(row.like),
-                    "coin": self._safe_int(row.coin),
-                    "share": self._safe_int(row.share),
-                    "url": f"https://www.bilibili.com/video/{row.bvid}" if row.bvid else "#"
-                }
-                for row in result
-            ]
+                LIMIT {int(limit)}
+            """, self._day_range(target_date))
+        else:
+            with self.engine.connect() as conn:
+                result = conn.execute(text("""
+                    SELECT 
+                        title, author, view, `like`, coin, share, bvid
+                    FROM videos 
+                    WHERE collected_at >= :day_start AND collected_at < :day_end
+                    ORDER BY view DESC
+                    LIMIT :limit
+                """), {**self._day_range(target_date), "limit": limit}).fetchall()
+
+        return [
+            {
+                "title": row.title[:50] + "..." if len(row.title) > 50 else row.title,
+                "author": row.author,
+                "view": self._safe_int(row.view),
+                "like": self._safe_int(row.like),
+                "coin": self._safe_int(row.coin),
+                "share": self._safe_int(row.share),
+                "url": f"https://www.bilibili.com/video/{row.bvid}" if row.bvid else "#"
+            }
+            for row in result
+        ]
     
     async def _analyze_daily_trend(self, target_date: datetime) -> str:
         """分析日度趋势"""
@@ -377,13 +385,13 @@ class ReportService:
             with self.engine.connect() as conn:
                 result = conn.execute(text("""
                     SELECT 
-                        DATE(collected_at) as date,
-                        COUNT(*) as video_count,
-                        AVG(view) as avg_views
-                    FROM videos 
-                    WHERE DATE(collected_at) >= DATE_SUB(DATE(:target_date), INTERVAL 7 DAY)
-                        AND DATE(collected_at) <= DATE(:target_date)
-                    GROUP BY DATE(collected_at)
+                        day as date,
+                        SUM(video_count) as video_count,
+                        SUM(total_view) / NULLIF(SUM(video_count), 0) as avg_views
+                    FROM video_rollup_daily 
+                    WHERE day >= DATE_SUB(DATE(:target_date), INTERVAL 7 DAY)
+                        AND day <= DATE(:target_date)
+                    GROUP BY day
                     ORDER BY date
                 """), {"target_date": target_date}).fetchall()
                 
@@ -439,10 +447,9 @@ class ReportService:
 
             with self.engine.connect() as conn:
                 result = conn.execute(text("""
-                    SELECT tname, COUNT(*) as count
-                    FROM videos 
-                    WHERE DATE(collected_at) = DATE(:target_date) AND tname IS NOT NULL
-                    GROUP BY tname
+                    SELECT tname, video_count as count
+                    FROM video_rollup_daily 
+                    WHERE day = DATE(:target_date) AND tname <> ''
                     ORDER BY count DESC
                     LIMIT 8
                 """), {"target_date": target_date}).fetchall()
@@ -476,11 +483,11 @@ class ReportService:
         with self.engine.connect() as conn:
             current_result = conn.execute(text("""
                 SELECT 
-                    COUNT(*) as total_videos,
-                    SUM(view) as total_views,
-                    AVG(view) as avg_views
-                FROM videos 
-                WHERE DATE(collected_at) BETWEEN DATE(:week_start) AND DATE(:week_end)
+                    SUM(video_count) as total_videos,
+                    SUM(total_view) as total_views,
+                    SUM(total_view) / NULLIF(SUM(video_count), 0) as avg_views
+                FROM video_rollup_daily 
+                WHERE day BETWEEN DATE(:week_start) AND DATE(:week_end)
             """), {"week_start": week_start, "week_end": week_end}).fetchone()
             
             # 上周统计（用于计算增长率）
@@ -489,9 +496,9 @@ class ReportService:
             
             prev_result = conn.execute(text("""
                 SELECT 
-                    SUM(view) as total_views
-                FROM videos 
-                WHERE DATE(collected_at) BETWEEN DATE(:prev_week_start) AND DATE(:prev_week_end)
+                    SUM(total_view) as total_views
+                FROM video_rollup_daily 
+                WHERE day BETWEEN DATE(:prev_week_start) AND DATE(:prev_week_end)
             """), {"prev_week_start": prev_week_start, "prev_week_end": prev_week_end}).fetchone()
             
             if current_result:
@@ -520,12 +527,12 @@ class ReportService:
             result = conn.execute(text("""
                 SELECT 
                     tname as name,
-                    COUNT(*) as video_count,
-                    AVG(view) as avg_views,
-                    SUM(view) as total_views
-                FROM videos 
-                WHERE DATE(collected_at) BETWEEN DATE(:week_start) AND DATE(:week_end) 
-                    AND tname IS NOT NULL
+                    SUM(video_count) as video_count,
+                    SUM(total_view) / NULLIF(SUM(video_count), 0) as avg_views,
+                    SUM(total_view) as total_views
+                FROM video_rollup_daily 
+                WHERE day BETWEEN DATE(:week_start) AND DATE(:week_end) 
+                    AND tname <> ''
                 GROUP BY tname
                 ORDER BY total_views DESC
                 LIMIT 10
@@ -556,22 +563,32 @@ class ReportService:
                 "url": "#"
             }
 
-        with self.engine.connect() as conn:
-            result = conn.execute(text("""
+        if self.analytics is not None and self.analytics.available():
+            rows = self.analytics.query("""
                 SELECT title, author, view, bvid
-                FROM videos 
-                WHERE DATE(collected_at) BETWEEN DATE(:week_start) AND DATE(:week_end)
+                FROM videos
+                WHERE collected_at >= $range_start AND collected_at < $range_end
                 ORDER BY view DESC
                 LIMIT 1
-            """), {"week_start": week_start, "week_end": week_end}).fetchone()
-            
-            if result:
-                return {
-                    "title": result.title or "未知标题",
-                    "author": result.author or "未知UP主",
-                    "view": self._safe_int(result.view),
-                    "url": f"https://www.bilibili.com/video/{result.bvid}" if result.bvid else "#"
-                }
+            """, self._week_range(week_start, week_end))
+            result = rows[0] if rows else None
+        else:
+            with self.engine.connect() as conn:
+                result = conn.execute(text("""
+                    SELECT title, author, view, bvid
+                    FROM videos 
+                    WHERE collected_at >= :range_start AND collected_at < :range_end
+                    ORDER BY view DESC
+                    LIMIT 1
+                """), self._week_range(week_start, week_end)).fetchone()
+
+        if result:
+            return {
+                "title": result.title or "未知标题",
+                "author": result.author or "未知UP主",
+                "view": self._safe_int(result.view),
+                "url": f"https://www.bilibili.com/video/{result.bvid}" if result.bvid else "#"
+            }
         
         return {
             "title": "暂无数据",
@@ -588,22 +605,34 @@ class ReportService:
                 "video_count": 0
             }
 
-        with self.engine.connect() as conn:
-            result = conn.execute(text("""
-                SELECT author as name, COUNT(*) as video_count
-                FROM videos 
-                WHERE DATE(collected_at) BETWEEN DATE(:week_start) AND DATE(:week_end)
+        if self.analytics is not None and self.analytics.available():
+            rows = self.analytics.query("""
+                SELECT author AS name, COUNT(*) AS video_count
+                FROM videos
+                WHERE collected_at >= $range_start AND collected_at < $range_end
                     AND author IS NOT NULL
                 GROUP BY author
                 ORDER BY video_count DESC
                 LIMIT 1
-            """), {"week_start": week_start, "week_end": week_end}).fetchone()
-            
-            if result:
-                return {
-                    "name": result.name or "未知UP主",
-                    "video_count": self._safe_int(result.video_count)
-                }
+            """, self._week_range(week_start, week_end))
+            result = rows[0] if rows else None
+        else:
+            with self.engine.connect() as conn:
+                result = conn.execute(text("""
+                    SELECT author as name, COUNT(*) as video_count
+                    FROM videos 
+                    WHERE collected_at >= :range_start AND collected_at < :range_end
+                        AND author IS NOT NULL
+                    GROUP BY author
+                    ORDER BY video_count DESC
+                    LIMIT 1
+                """), self._week_range(week_start, week_end)).fetchone()
+
+        if result:
+            return {
+                "name": result.name or "未知UP主",
+                "video_count": self._safe_int(result.video_count)
+            }
         
         return {
             "name": "暂无数据",
@@ -620,10 +649,10 @@ class ReportService:
 
         with self.engine.connect() as conn:
             result = conn.execute(text("""
-                SELECT tname as name, SUM(view) as total_views
-                FROM videos 
-                WHERE DATE(collected_at) BETWEEN DATE(:week_start) AND DATE(:week_end)
-                    AND tname IS NOT NULL
+                SELECT tname as name, SUM(total_view) as total_views
+                FROM video_rollup_daily 
+                WHERE day BETWEEN DATE(:week_start) AND DATE(:week_end)
+                    AND tname <> ''
                 GROUP BY tname
                 ORDER BY total_views DESC
                 LIMIT 1
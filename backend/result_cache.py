@@ -0,0 +1,165 @@
+"""
+按数据版本失效的结果缓存
+每个键只保存一份结果并记录计算时的数据版本，爬虫写入新数据后版本递增，旧结果在下次计算时被替换；
+结果保存在进程内存中，配置Redis后在多个worker之间共享
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+from json_response import dumps
+
+logger = logging.getLogger(__name__)
+
+
+class VersionedResultCache:
+    """数据版本未变化时直接返回上次的计算结果"""
+
+    def __init__(self, version_source: Callable[[], int], redis_client=None, namespace: str = "results",
+                 version_ttl: float = 2.0, result_ttl: int = 24 * 3600,
+                 async_version_source: Optional[Callable[[], Awaitable[int]]] = None):
+        """
+        初始化缓存
+
+        Args:
+            version_source: 读取当前数据版本的函数
+            redis_client: 可选的Redis客户端，用于在多个进程间共享结果
+            namespace: Redis键前缀
+            version_ttl: 数据版本在进程内的缓存秒数，期间命中不访问数据库
+            result_ttl: Redis中结果的过期秒数
+            async_version_source: 可选的协程函数，在事件循环上直接读取数据版本（异步数据库连接）
+        """
+        self.version_source = version_source
+        self.async_version_source = async_version_source
+        self.redis = redis_client
+        self.namespace = namespace
+        self.version_ttl = version_ttl
+        self.result_ttl = result_ttl
+        self.hits = 0
+        self.misses = 0
+        self._version: Optional[int] = None
+        self._version_checked_at = 0.0
+        # 键 -> (数据版本, 附加版本, 结果)
+        self._entries: Dict[str, Tuple[int, Optional[Hashable], Any]] = {}
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+
+    def current_version(self) -> int:
+        """当前数据版本，version_ttl内复用上次读取的值"""
+        now = time.monotonic()
+        if self._version is None or now - self._version_checked_at >= self.version_ttl:
+            version = self.version_source()
+            with self._lock:
+                self._version = version
+                self._version_checked_at = now
+        return self._version
+
+    async def current_version_async(self) -> int:
+        """
+        在事件循环上读取当前数据版本，version_ttl内复用上次读取的值；未配置async_version_source时
+        在线程中调用version_source。读取后peek即可按新版本命中
+        """
+        now = time.monotonic()
+        if self._version is not None and now - self._version_checked_at < self.version_ttl:
+            return self._version
+        if self.async_version_source is not None:
+            version = await self.async_version_source()
+        else:
+            version = await asyncio.to_thread(self.version_source)
+        with self._lock:
+            self._version = version
+            self._version_checked_at = now
+        return version
+
+    def invalidate_version(self):
+        """本进程写入了新数据，下次访问时立即重新读取版本"""
+        with self._lock:
+            self._version = None
+
+    def peek(self, key: str, tag: Optional[Hashable] = None) -> Optional[Any]:
+        """
+        只查进程内存，不做任何IO；数据版本需要重新读取或未命中时返回None
+
+        可在事件循环上直接调用。
+
+        Args:
+            key: 缓存键
+            tag: 附加版本（如Arrow镜像的文件版本），与缓存时不同视为未命中
+        """
+        with self._lock:
+            if self._version is None or time.monotonic() - self._version_checked_at >= self.version_ttl:
+                return None
+            entry = self._entries.get(key)
+            if entry is None or entry[:2] != (self._version, tag):
+                return None
+            self.hits += 1
+            return entry[2]
+
+    def _redis_key(self, key: str, version: int, tag: Optional[Hashable]) -> str:
+        return f"{self.namespace}:{key}:{version}" if tag is None else f"{self.namespace}:{key}:{version}:{tag}"
+
+    def get(self, key: str, tag: Optional[Hashable] = None) -> Optional[Any]:
+        """按当前版本查进程内存与Redis，未命中返回None"""
+        version = self.current_version()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[:2] == (version, tag):
+                self.hits += 1
+                return entry[2]
+
+        if self.redis is not None:
+            try:
+                raw = self.redis.get(self._redis_key(key, version, tag))
+            except Exception as e:
+                logger.error(f"读取结果缓存失败: {str(e)}")
+                raw = None
+            if raw is not None:
+                value = json.loads(raw)
+                with self._lock:
+                    self._entries[key] = (version, tag, value)
+                    self.hits += 1
+                return value
+        return None
+
+    def compute(self, key: str, func: Callable[[], Any], tag: Optional[Hashable] = None) -> Any:
+        """
+        计算并缓存结果；同一个键同时只有一个线程计算，其余线程等待后直接复用
+
+        每个键只保留最新的一份结果，版本或tag变化后重新计算的结果替换旧结果。结果为None时不缓存。
+        """
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            cached = self.get(key, tag)
+            if cached is not None:
+                return cached
+
+            # 先取版本再计算：计算期间写入的新数据会使版本递增，不会被当作已包含
+            version = self.current_version()
+            value = func()
+            if value is None:
+                return None
+
+            with self._lock:
+                self._entries[key] = (version, tag, value)
+                self.misses += 1
+            if self.redis is not None:
+                try:
+                    self.redis.setex(self._redis_key(key, version, tag), self.result_ttl, dumps(value))
+                except Exception as e:
+                    logger.error(f"写入结果缓存失败: {str(e)}")
+            return value
+
+    def stats(self) -> Dict[str, Any]:
+        """命中统计"""
+        return {
+            "version": self._version,
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses
+        }
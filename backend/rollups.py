@@ -0,0 +1,277 @@
+"""
+视频汇总表模块
+按天/小时 × 分区维护预聚合统计与视频总数计数器，在写入时增量更新，供日报、周报、AI上下文与视频列表查询
+
+用法（首次上线或数据修复时全量重建）:
+    python rollups.py backfill [--start 2024-01-01] [--end 2024-02-01]
+"""
+
+import argparse
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import bindparam, text
+
+logger = logging.getLogger(__name__)
+
+# 汇总的统计字段：每个字段维护总和与最大值
+ROLLUP_METRICS = ('view', 'like', 'coin', 'share')
+
+# 表名 -> (时间粒度列, 从collected_at计算粒度的SQL表达式)
+ROLLUP_TABLES = {
+    'video_rollup_daily': ('day', "DATE(collected_at)"),
+    'video_rollup_hourly': ('hour', "DATE_FORMAT(collected_at, '%Y-%m-%d %H:00:00')"),
+}
+
+
+COUNTER_SQL = text("SELECT value FROM video_counters WHERE name = :name")
+
+
+def _bucket_keys(collected_at: datetime) -> Dict[str, Any]:
+    """计算一行视频数据所属的天与小时"""
+    return {
+        'day': collected_at.date(),
+        'hour': collected_at.replace(minute=0, second=0, microsecond=0)
+    }
+
+
+class VideoRollupStore:
+    """视频汇总表：按采集时间(天/小时)与分区预聚合视频数及播放、点赞、投币、分享的总和与最大值"""
+
+    def __init__(self, engine):
+        """
+        初始化汇总表
+
+        Args:
+            engine: SQLAlchemy数据库引擎
+        """
+        self.engine = engine
+        self._init_tables()
+
+    def _init_tables(self):
+        """初始化汇总表"""
+        metric_columns = ",\n".join(
+            f"total_{metric} BIGINT NOT NULL DEFAULT 0,\n"
+            f"max_{metric} BIGINT UNSIGNED NOT NULL DEFAULT 0"
+            for metric in ROLLUP_METRICS
+        )
+        with self.engine.begin() as conn:
+            conn.execute(text(f"""
+            CREATE TABLE IF NOT EXISTS video_rollup_daily (
+                day DATE NOT NULL,
+                tname VARCHAR(50) NOT NULL DEFAULT '',
+                video_count INT UNSIGNED NOT NULL DEFAULT 0,
+                {metric_columns},
+                PRIMARY KEY (day, tname)
+            )
+            """))
+            conn.execute(text(f"""
+            CREATE TABLE IF NOT EXISTS video_rollup_hourly (
+                hour DATETIME NOT NULL,
+                tname VARCHAR(50) NOT NULL DEFAULT '',
+                video_count INT UNSIGNED NOT NULL DEFAULT 0,
+                {metric_columns},
+                PRIMARY KEY (hour, tname)
+            )
+            """))
+
+            # 计数器：视频总数在写入时增量维护，列表接口无需COUNT(*)
+            conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS video_counters (
+                name VARCHAR(50) PRIMARY KEY,
+                value BIGINT NOT NULL DEFAULT 0,
+                updated_at DATETIME NOT NULL
+            )
+            """))
+            seeded = conn.execute(text("SELECT 1 FROM video_counters WHERE name = 'videos'")).fetchone()
+            if not seeded:
+                conn.execute(text("""
+                INSERT IGNORE INTO video_counters (name, value, updated_at)
+                SELECT 'videos', COUNT(*), NOW() FROM videos
+                """))
+
+            # 数据版本：每批写入加一，分析结果缓存以此判断是否有新数据
+            conn.execute(text("""
+            INSERT IGNORE INTO video_counters (name, value, updated_at) VALUES ('data_version', 0, NOW())
+            """))
+
+    def apply(self, conn, rows: List[Dict[str, Any]]):
+        """
+        将一批即将upsert的视频数据计入汇总表
+
+        必须在upsert之前、同一事务中调用：先锁定并读取这些视频的旧统计，新视频计入
+        当前时段，已有视频按新旧差值更新其首次采集时段（upsert不修改collected_at与tname）。
+        可直接作为BufferedVideoSink的写入前钩子。
+
+        事务应使用READ COMMITTED：REPEATABLE READ下对不存在的bvid执行FOR UPDATE会加间隙锁，
+        两个批次在同一间隙插入新视频时互相等待而死锁。READ COMMITTED只锁已有的行，
+        已有视频的统计仍按行串行更新；两个批次同时首次写入同一新视频时，该视频会被重复计入汇总，
+        可由backfill校正。
+        """
+        if not rows:
+            return
+
+        existing = {
+            row.bvid: row
+            for row in conn.execute(
+                text("""
+                SELECT bvid, collected_at, tname, view, `like`, coin, share
+                FROM videos
+                WHERE bvid IN :bvids
+                FOR UPDATE
+                """).bindparams(bindparam("bvids", expanding=True)),
+                {"bvids": [row["bvid"] for row in rows]}
+            )
+        }
+
+        deltas: Dict[tuple, Dict[str, int]] = {}
+        for row in rows:
+            old = existing.get(row["bvid"])
+            if old is not None:
+                collected_at, tname = old.collected_at, old.tname or ''
+                old_values = {metric: getattr(old, metric) or 0 for metric in ROLLUP_METRICS}
+            else:
+                collected_at, tname = row["collected_at"], row.get("tname") or ''
+                old_values = None
+
+            keys = _bucket_keys(collected_at)
+            delta = deltas.setdefault((keys['day'], keys['hour'], tname), {
+                'video_count': 0,
+                **{f"total_{metric}": 0 for metric in ROLLUP_METRICS},
+                **{f"max_{metric}": 0 for metric in ROLLUP_METRICS}
+            })
+            if old_values is None:
+                delta['video_count'] += 1
+            for metric in ROLLUP_METRICS:
+                value = row.get(metric) or 0
+                delta[f"total_{metric}"] += value - (old_values[metric] if old_values else 0)
+                delta[f"max_{metric}"] = max(delta[f"max_{metric}"], value)
+
+        params = [
+            {'day': day, 'hour': hour, 'tname': tname, **delta}
+            for (day, hour, tname), delta in deltas.items()
+        ]
+        for table, (bucket, _) in ROLLUP_TABLES.items():
+            conn.execute(self._upsert_statement(table, bucket), params)
+
+        new_videos = len(rows) - len(existing)
+        if new_videos:
+            conn.execute(text("""
+            UPDATE video_counters SET value = value + :delta, updated_at = NOW() WHERE name = 'videos'
+            """), {"delta": new_videos})
+        conn.execute(text("""
+        UPDATE video_counters SET value = value + 1, updated_at = NOW() WHERE name = 'data_version'
+        """))
+
+    def total_videos(self, conn=None) -> int:
+        """视频总数（读取计数器）"""
+        if conn is None:
+            with self.engine.connect() as conn:
+                return self.total_videos(conn)
+        return int(conn.execute(COUNTER_SQL, {"name": "videos"}).scalar() or 0)
+
+    def data_version(self, conn=None) -> int:
+        """数据版本号：videos表每写入一批递增"""
+        if conn is None:
+            with self.engine.connect() as conn:
+                return self.data_version(conn)
+        return int(conn.execute(COUNTER_SQL, {"name": "data_version"}).scalar() or 0)
+
+    @staticmethod
+    async def total_videos_async(conn) -> int:
+        """在异步连接上读取视频总数，不占用IO线程"""
+        return int((await conn.execute(COUNTER_SQL, {"name": "videos"})).scalar() or 0)
+
+    @staticmethod
+    async def data_version_async(conn) -> int:
+        """在异步连接上读取数据版本号"""
+        return int((await conn.execute(COUNTER_SQL, {"name": "data_version"})).scalar() or 0)
+
+    @staticmethod
+    def _upsert_statement(table: str, bucket: str):
+        columns = ['video_count'] + [f"{kind}_{metric}" for metric in ROLLUP_METRICS for kind in ('total', 'max')]
+        updates = ", ".join(
+            f"{column} = GREATEST({column}, VALUES({column}))" if column.startswith('max_')
+            else f"{column} = {column} + VALUES({column})"
+            for column in columns
+        )
+        return text(f"""
+        INSERT INTO {table} ({bucket}, tname, {', '.join(columns)})
+        VALUES (:{bucket}, :tname, {', '.join(':' + column for column in columns)})
+        ON DUPLICATE KEY UPDATE {updates}
+        """)
+
+    def backfill(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        从videos表重建[start, end)时间范围内的汇总数据，默认全部重建（同时校正视频总数计数器）
+
+        重建期间应暂停爬取，否则并发写入的增量可能被覆盖。
+        """
+        conditions = []
+        params = {}
+        if start is not None:
+            conditions.append("collected_at >= :start")
+            params["start"] = start
+        if end is not None:
+            conditions.append("collected_at < :end")
+            params["end"] = end
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        aggregates = ", ".join(
+            f"SUM(`{metric}`), MAX(`{metric}`)" for metric in ROLLUP_METRICS
+        )
+        columns = ", ".join(f"total_{metric}, max_{metric}" for metric in ROLLUP_METRICS)
+
+        stats = {}
+        with self.engine.begin() as conn:
+            for table, (bucket, expression) in ROLLUP_TABLES.items():
+                bucket_conditions = []
+                if start is not None:
+                    bucket_conditions.append(f"{bucket} >= {expression.replace('collected_at', ':start')}")
+                if end is not None:
+                    bucket_conditions.append(f"{bucket} < {expression.replace('collected_at', ':end')}")
+                delete_where = f"WHERE {' AND '.join(bucket_conditions)}" if bucket_conditions else ""
+                conn.execute(text(f"DELETE FROM {table} {delete_where}"), params)
+
+                result = conn.execute(text(f"""
+                INSERT INTO {table} ({bucket}, tname, video_count, {columns})
+                SELECT {expression}, COALESCE(tname, ''), COUNT(*), {aggregates}
+                FROM videos
+                {where}
+                GROUP BY {expression}, COALESCE(tname, '')
+                """), params)
+                stats[table] = result.rowcount
+
+            if start is None and end is None:
+                conn.execute(text("""
+                UPDATE video_counters
+                SET value = (SELECT COUNT(*) FROM videos), updated_at = NOW()
+                WHERE name = 'videos'
+                """))
+
+        logger.info(f"汇总表重建完成: {stats}")
+        return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="视频汇总表维护")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    backfill_parser = subparsers.add_parser("backfill", help="从videos表重建汇总数据")
+    backfill_parser.add_argument("--start", type=lambda value: datetime.strptime(value, "%Y-%m-%d"),
+                                 help="开始日期(含)，格式YYYY-MM-DD")
+    backfill_parser.add_argument("--end", type=lambda value: datetime.strptime(value, "%Y-%m-%d"),
+                                 help="结束日期(不含)，格式YYYY-MM-DD")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    from database import engine
+
+    if args.command == "backfill":
+        print(VideoRollupStore(engine).backfill(args.start, args.end))
+
+
+if __name__ == "__main__":
+    main()
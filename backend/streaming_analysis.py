@@ -0,0 +1,245 @@
+"""
+流式视频分析模块
+分块读取videos表，把每块折叠进可合并的累加器（计数、总和、Welford协方差、播放量直方图、
+标签/分区计数、发布时段统计），内存占用与表大小无关，产出与全量分析相同的analysis_results
+"""
+
+import logging
+from collections import Counter
+from typing import Any, Dict, Iterator, List, Optional
+
+import jieba.analyse
+import numpy as np
+import pandas as pd
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+INTERACTION_COLUMNS = ['danmaku', 'reply', 'favorite', 'coin', 'share', 'like']
+
+# 参与相关性计算的列（与全量分析的热力图一致）
+MOMENT_COLUMNS = ['view'] + INTERACTION_COLUMNS + ['interaction_rate']
+
+ANALYSIS_COLUMNS = [
+    'bvid', 'title', 'author', 'view', 'danmaku', 'reply',
+    'favorite', 'coin', 'share', 'like', 'duration',
+    'pubdate', 'tname', 'tags', 'desc'
+]
+
+# log10(播放量+1)的固定分箱，分块之间可直接相加
+VIEW_HISTOGRAM_EDGES = np.arange(0, 10.25, 0.25)
+
+
+def add_derived_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """补齐互动列并计算互动率与发布小时"""
+    if 'pubdate' in df:
+        df['pubdate'] = pd.to_datetime(df['pubdate'])
+
+    for col in INTERACTION_COLUMNS:
+        if col not in df:
+            df[col] = 0
+
+    df['interaction_rate'] = (
+        df['danmaku'] + df['reply'] + df['favorite'] +
+        df['coin'] + df['share'] + df['like']
+    ) / df['view'].clip(lower=1)
+
+    if 'pubdate' in df:
+        df['pub_hour'] = df['pubdate'].dt.hour
+
+    return df
+
+
+def iter_video_chunks(engine, chunksize: int) -> Iterator[pd.DataFrame]:
+    """通过服务端游标分块读取videos表"""
+    columns = ", ".join(f"`{column}`" for column in ANALYSIS_COLUMNS)
+    with engine.connect() as conn:
+        conn = conn.execution_options(stream_results=True, yield_per=chunksize)
+        for chunk in pd.read_sql(text(f"SELECT {columns} FROM videos"), conn, chunksize=chunksize):
+            yield chunk
+
+
+def iter_arrow_chunks(table, chunksize: int) -> Iterator[pd.DataFrame]:
+    """按批次读取Arrow镜像"""
+    table = table.select(ANALYSIS_COLUMNS)
+    for batch in table.to_batches(max_chunksize=chunksize):
+        yield batch.to_pandas()
+
+
+class VideoAnalysisAccumulator:
+    """可合并的视频分析累加器：各分块（或各进程）分别累加后merge得到全表结果"""
+
+    def __init__(self, columns: Optional[List[str]] = None):
+        """
+        初始化累加器
+
+        Args:
+            columns: 参与均值与相关性计算的列
+        """
+        self.columns = list(columns or MOMENT_COLUMNS)
+        k = len(self.columns)
+
+        self.count = 0
+        self.view_count = 0
+        self.view_sum = 0.0
+        self.interaction_rate_count = 0
+        self.interaction_rate_sum = 0.0
+
+        # Welford：完整行数、均值向量与离差积矩阵
+        self.moment_count = 0
+        self.mean = np.zeros(k)
+        self.comoment = np.zeros((k, k))
+
+        self.view_histogram = np.zeros(len(VIEW_HISTOGRAM_EDGES) - 1, dtype=np.int64)
+        self.tag_counts: Counter = Counter()
+        self.category_counts: Counter = Counter()
+        self.title_keywords: Counter = Counter()
+        self.hour_counts = np.zeros(24, dtype=np.int64)
+        self.hour_view_sums = np.zeros(24)
+
+    def update(self, df: pd.DataFrame):
+        """把一块已计算派生列的数据折叠进累加器"""
+        if df.empty:
+            return
+
+        self.count += len(df)
+
+        views = df['view'].dropna()
+        self.view_count += len(views)
+        self.view_sum += float(views.sum())
+        rates = df['interaction_rate'].dropna()
+        self.interaction_rate_count += len(rates)
+        self.interaction_rate_sum += float(rates.sum())
+
+        values = df[self.columns].dropna().to_numpy(dtype=float)
+        if len(values):
+            chunk_mean = values.mean(axis=0)
+            centered = values - chunk_mean
+            self._merge_moments(len(values), chunk_mean, centered.T @ centered)
+
+        log_views = np.clip(np.log10(views.to_numpy(dtype=float) + 1), 0, VIEW_HISTOGRAM_EDGES[-1])
+        self.view_histogram += np.histogram(log_views, bins=VIEW_HISTOGRAM_EDGES)[0]
+
+        has_tags = False
+        for tags in df['tags'].dropna().astype(str):
+            for tag in tags.split(','):
+                if tag.strip():
+                    self.tag_counts[tag.strip()] += 1
+                    has_tags = True
+
+        # 没有标签时与全量分析一样改用标题关键词生成词云，按块内行数加权
+        if not has_tags and 'title' in df:
+            self.add_title_keywords(df['title'].dropna().astype(str), len(df))
+
+        if 'tname' in df:
+            self.category_counts.update(df['tname'].dropna().tolist())
+
+        if 'pub_hour' in df:
+            hours = df[['pub_hour', 'view']].dropna(subset=['pub_hour'])
+            hour_index = hours['pub_hour'].to_numpy(dtype=int)
+            self.hour_counts += np.bincount(hour_index, minlength=24)
+            self.hour_view_sums += np.bincount(hour_index, weights=hours['view'].fillna(0).to_numpy(dtype=float),
+                                               minlength=24)
+
+    def add_title_keywords(self, titles, rows: int):
+        """提取一块数据标题中的关键词，权重乘以块内行数"""
+        for word, weight in jieba.analyse.extract_tags(' '.join(titles), topK=100, withWeight=True):
+            self.title_keywords[word] += weight * rows
+
+    def _merge_moments(self, count: int, mean: np.ndarray, comoment: np.ndarray):
+        """Chan等人的并行合并公式"""
+        if count == 0:
+            return
+        total = self.moment_count + count
+        delta = mean - self.mean
+        self.mean = self.mean + delta * (count / total)
+        self.comoment = self.comoment + comoment + np.outer(delta, delta) * (self.moment_count * count / total)
+        self.moment_count = total
+
+    def merge(self, other: 'VideoAnalysisAccumulator') -> 'VideoAnalysisAccumulator':
+        """合并另一个累加器（列需一致）"""
+        self.count += other.count
+        self.view_count += other.view_count
+        self.view_sum += other.view_sum
+        self.interaction_rate_count += other.interaction_rate_count
+        self.interaction_rate_sum += other.interaction_rate_sum
+        self._merge_moments(other.moment_count, other.mean, other.comoment)
+        self.view_histogram += other.view_histogram
+        self.tag_counts.update(other.tag_counts)
+        self.category_counts.update(other.category_counts)
+        self.title_keywords.update(other.title_keywords)
+        self.hour_counts += other.hour_counts
+        self.hour_view_sums += other.hour_view_sums
+        return self
+
+    def correlation(self) -> pd.DataFrame:
+        """相关系数矩阵"""
+        with np.errstate(divide='ignore', invalid='ignore'):
+            scale = np.sqrt(np.diag(self.comoment))
+            corr = self.comoment / np.outer(scale, scale)
+        return pd.DataFrame(corr, index=self.columns, columns=self.columns)
+
+    def top_tags(self, n: int = 10) -> list:
+        """出现次数最多的标签"""
+        return [[tag, count] for tag, count in self.tag_counts.most_common(n)]
+
+    def best_publish_hours(self, min_videos: int = 5, n: int = 3) -> list:
+        """平均播放量最高的发布小时（视频数需超过min_videos），平均播放量相同时较早的小时在前"""
+        hours = [
+            (-(self.hour_view_sums[hour] / self.hour_counts[hour]), hour)
+            for hour in range(24)
+            if self.hour_counts[hour] > min_videos
+        ]
+        return [hour for _, hour in sorted(hours)[:n]]
+
+    def results(self, top_tags_count: int = 10, min_hour_videos: int = 5) -> Dict[str, Any]:
+        """生成与全量分析相同结构的analysis_results"""
+        return {
+            "total_videos": self.count,
+            "avg_views": int(self.view_sum / self.view_count) if self.view_count else 0,
+            "avg_interaction_rate": self.interaction_rate_sum / self.interaction_rate_count
+            if self.interaction_rate_count else 0.0,
+            "top_tags": self.top_tags(top_tags_count),
+            "best_publish_hours": self.best_publish_hours(min_hour_videos)
+        }
+
+
+def dataframe_results(df: pd.DataFrame, top_tags_count: int = 10, min_hour_videos: int = 5) -> Dict[str, Any]:
+    """
+    全量分析：在完整的DataFrame（已计算派生列）上生成analysis_results，与累加器的results一致
+
+    Args:
+        df: 视频数据
+        top_tags_count: 热门标签个数
+        min_hour_videos: 参与最佳发布时段排名的小时至少需要超过的视频数
+    """
+    tag_counts: Counter = Counter()
+    for tags in df['tags'].dropna().astype(str):
+        for tag in tags.split(','):
+            if tag.strip():
+                tag_counts[tag.strip()] += 1
+
+    results = {
+        "total_videos": len(df),
+        "avg_views": int(df['view'].mean()),
+        "avg_interaction_rate": float(df['interaction_rate'].mean()),
+        "top_tags": [[tag, count] for tag, count in tag_counts.most_common(top_tags_count)],
+    }
+
+    if 'pub_hour' in df:
+        hour_stats = df.groupby('pub_hour')['view'].agg(['mean', 'count'])
+        hour_stats = hour_stats[hour_stats['count'] > min_hour_videos]
+        # 稳定排序：平均播放量相同时按小时升序
+        results["best_publish_hours"] = hour_stats.sort_values(
+            'mean', ascending=False, kind='stable').head(3).index.tolist()
+
+    return results
+
+
+def accumulate(chunks: Iterator[pd.DataFrame]) -> VideoAnalysisAccumulator:
+    """把分块数据依次折叠进一个累加器"""
+    accumulator = VideoAnalysisAccumulator()
+    for chunk in chunks:
+        accumulator.update(add_derived_columns(chunk))
+    logger.info(f"流式分析完成: {accumulator.count}个视频")
+    return accumulator
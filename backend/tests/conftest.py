@@ -0,0 +1,9 @@
+"""
+测试公共配置
+后端模块按脚本方式从backend目录导入，测试时把该目录加入导入路径
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
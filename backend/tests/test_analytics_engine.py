@@ -0,0 +1,94 @@
+"""DuckDB分析与流式分析一致性测试：同一份Arrow镜像上两种方式得到相同的统计量"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("duckdb")
+pytest.importorskip("pyarrow")
+pytest.importorskip("pandas")
+pytest.importorskip("jieba")
+
+import numpy as np  # noqa: E402
+import pyarrow as pa  # noqa: E402
+
+from analytics_engine import DuckDBAnalytics, MirrorUnavailable  # noqa: E402
+from arrow_mirror import VIDEO_SCHEMA, VideoArrowMirror  # noqa: E402
+from streaming_analysis import accumulate, iter_arrow_chunks  # noqa: E402
+
+CHUNKSIZE = 40
+TITLES = ["原神新版本实况解说", "美食探店vlog", "编程入门教程Python", "猫咪日常搞笑合集", "钢琴演奏名曲"]
+
+
+def _videos(count: int, with_tags: bool):
+    rng = np.random.default_rng(7)
+    start = datetime(2024, 3, 1)
+    rows = []
+    for i in range(count):
+        view = int(rng.integers(0, 2_000_000))
+        rows.append({
+            "bvid": f"BV{i:06d}",
+            "title": TITLES[i % len(TITLES)] if i % 11 else None,
+            # 播放量为NULL与为0的行：互动率分别为NULL与按1计算
+            "view": None if i % 17 == 0 else (0 if i % 13 == 0 else view),
+            "danmaku": int(rng.integers(0, 500)),
+            "reply": int(rng.integers(0, 500)),
+            "favorite": None if i % 19 == 0 else int(rng.integers(0, 5000)),
+            "coin": int(rng.integers(0, 3000)),
+            "share": int(rng.integers(0, 1000)),
+            "like": int(rng.integers(0, 20000)),
+            "pubdate": None if i % 23 == 0 else start + timedelta(hours=int(rng.integers(0, 24 * 30))),
+            "tname": ["游戏", "美食", "知识", None][i % 4],
+            "tags": (",".join(["游戏", "攻略", " 原神 "][: i % 3 + 1]) if i % 5 else None) if with_tags else None,
+            "collected_at": start,
+            "updated_at": start,
+        })
+    return pa.Table.from_pylist(rows, schema=VIDEO_SCHEMA)
+
+
+@pytest.fixture
+def mirror(tmp_path):
+    return VideoArrowMirror(None, str(tmp_path / "videos.arrow"))
+
+
+def _assert_same(duck, stream):
+    assert duck.count == stream.count
+    assert duck.view_count == stream.view_count
+    assert duck.view_sum == pytest.approx(stream.view_sum)
+    assert duck.interaction_rate_count == stream.interaction_rate_count
+    assert duck.interaction_rate_sum == pytest.approx(stream.interaction_rate_sum)
+    assert duck.moment_count == stream.moment_count
+    np.testing.assert_allclose(duck.mean, stream.mean, rtol=1e-9)
+    np.testing.assert_allclose(duck.comoment, stream.comoment, rtol=1e-6)
+    np.testing.assert_array_equal(duck.view_histogram, stream.view_histogram)
+    assert duck.tag_counts == stream.tag_counts
+    assert duck.category_counts == stream.category_counts
+    np.testing.assert_array_equal(duck.hour_counts, stream.hour_counts)
+    np.testing.assert_allclose(duck.hour_view_sums, stream.hour_view_sums)
+    duck_results, stream_results = duck.results(min_hour_videos=1), stream.results(min_hour_videos=1)
+    assert duck_results.pop("avg_interaction_rate") == pytest.approx(stream_results.pop("avg_interaction_rate"))
+    assert duck_results == stream_results
+
+
+@pytest.mark.parametrize("with_tags", [True, False])
+def test_duckdb_matches_streaming(mirror, with_tags):
+    mirror._write_atomic(_videos(200, with_tags))
+    table = mirror.read_table()
+
+    duck = DuckDBAnalytics(mirror, threads=1, chunksize=CHUNKSIZE).build_accumulator()
+    stream = accumulate(iter_arrow_chunks(table, CHUNKSIZE))
+
+    _assert_same(duck, stream)
+    assert set(duck.title_keywords) == set(stream.title_keywords)
+    for word, weight in stream.title_keywords.items():
+        assert duck.title_keywords[word] == pytest.approx(weight)
+    if not with_tags:
+        assert duck.title_keywords
+
+
+def test_missing_mirror_is_unavailable(mirror):
+    analytics = DuckDBAnalytics(mirror, threads=1)
+
+    assert not analytics.available()
+    with pytest.raises(MirrorUnavailable):
+        analytics.build_accumulator()
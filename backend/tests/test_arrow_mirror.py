@@ -0,0 +1,76 @@
+"""Arrow镜像刷新测试（SQLite内存库）：增量刷新读取updated_at为NULL的行，全量重建去掉已删除的行"""
+
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("pyarrow")
+pytest.importorskip("pandas")
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import create_engine, text  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+
+from arrow_mirror import VideoArrowMirror  # noqa: E402
+
+START = datetime(2024, 3, 1)
+
+
+@pytest.fixture
+def engine():
+    # 同一个内存库在多次连接间共享；TIMESTAMP列由sqlite3解析为datetime
+    engine = create_engine("sqlite://", poolclass=StaticPool,
+                           connect_args={"detect_types": sqlite3.PARSE_DECLTYPES, "check_same_thread": False})
+    with engine.begin() as conn:
+        conn.execute(text("""
+        CREATE TABLE videos (
+            bvid TEXT PRIMARY KEY, title TEXT, aid TEXT, author TEXT, mid TEXT,
+            view INT, danmaku INT, reply INT, favorite INT, coin INT, share INT, `like` INT,
+            duration INT, pubdate TIMESTAMP, tid INT, tname TEXT, copyright INT, tags TEXT, `desc` TEXT,
+            ctime TIMESTAMP, collected_at TIMESTAMP, updated_at TIMESTAMP
+        )
+        """))
+        _insert(conn, [(f"BV{i}", START + timedelta(minutes=i)) for i in range(5)])
+    return engine
+
+
+def _insert(conn, rows):
+    conn.execute(text("""
+    INSERT INTO videos (bvid, title, view, collected_at, updated_at)
+    VALUES (:bvid, :bvid, 1, :collected_at, :updated_at)
+    """), [{"bvid": bvid, "collected_at": START, "updated_at": updated_at} for bvid, updated_at in rows])
+
+
+def _bvids(mirror):
+    return sorted(mirror.read_table()["bvid"].to_pylist())
+
+
+def test_incremental_refresh_picks_up_null_updated_at(engine, tmp_path):
+    mirror = VideoArrowMirror(engine, str(tmp_path / "videos.arrow"), overlap_seconds=0)
+    assert mirror.refresh()["mode"] == "full"
+
+    with engine.begin() as conn:
+        _insert(conn, [("BVnull", None)])
+
+    stats = mirror.refresh()
+    assert stats["mode"] == "incremental"
+    assert "BVnull" in _bvids(mirror)
+    assert len(_bvids(mirror)) == 6
+
+
+def test_deleted_rows_removed_by_periodic_full_rebuild(engine, tmp_path):
+    mirror = VideoArrowMirror(engine, str(tmp_path / "videos.arrow"), overlap_seconds=0, full_rebuild_hours=24)
+    mirror.refresh()
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM videos WHERE bvid = 'BV0'"))
+
+    # 增量刷新看不到删除
+    assert mirror.refresh()["mode"] == "incremental"
+    assert "BV0" in _bvids(mirror)
+
+    # 上次全量重建已超过full_rebuild_hours
+    mirror.full_rebuild_hours = 1e-9
+    assert mirror.refresh()["mode"] == "full"
+    assert "BV0" not in _bvids(mirror)
+    assert mirror.full_rebuilt_at() is not None
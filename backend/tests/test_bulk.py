@@ -0,0 +1,164 @@
+"""
+批量导出/导入测试：Parquet schema按表结构生成，videos覆盖已有行时保留采集时间与分区，
+NDJSON导出再导入时时间列还原为datetime，汇总表钩子能按采集时间分桶
+"""
+
+from contextlib import contextmanager
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+pytest.importorskip("pyarrow")
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("tqdm")
+
+import pyarrow as pa  # noqa: E402
+
+from bulk import (  # noqa: E402
+    BULK_KEEP_COLUMNS, BULK_TABLES, _upsert_statement, arrow_schema, export_table, import_table
+)
+from rollups import VideoRollupStore  # noqa: E402
+
+
+def _column(name, data_type, column_type=None, precision=None, scale=None):
+    return {
+        "column_name": name, "data_type": data_type, "column_type": column_type or data_type,
+        "numeric_precision": precision, "numeric_scale": scale
+    }
+
+
+def test_schema_follows_table_types_not_first_batch():
+    schema = arrow_schema([
+        _column("id", "int"),
+        _column("value", "bigint", "bigint unsigned"),
+        _column("score", "decimal", "decimal(10,2)", 10, 2),
+        _column("data_content", "json"),
+        _column("created_at", "datetime"),
+        _column("title", "text"),
+    ])
+
+    assert schema.field("id").type == pa.int64()
+    assert schema.field("value").type == pa.uint64()
+    assert schema.field("score").type == pa.decimal128(10, 2)
+    assert schema.field("data_content").type == pa.string()
+    assert schema.field("created_at").type == pa.timestamp("us")
+
+    # 首批某列全为NULL、后续批次才出现值时类型仍然一致
+    first = pa.Table.from_pylist([{"id": 1, "value": None, "score": None, "data_content": None,
+                                   "created_at": None, "title": None}], schema=schema)
+    later = pa.Table.from_pylist([{"id": 2, "value": 2 ** 63, "score": Decimal("1.50"), "data_content": "{}",
+                                   "created_at": datetime(2024, 3, 1), "title": "标题"}], schema=schema)
+    assert first.schema == later.schema
+
+
+def test_videos_upsert_keeps_collected_at_and_tname():
+    columns = ["bvid", "title", "view", "tname", "collected_at", "updated_at"]
+    sql = str(_upsert_statement("videos", columns, BULK_TABLES["videos"], BULK_KEEP_COLUMNS["videos"]))
+    updates = sql.split("ON DUPLICATE KEY UPDATE", 1)[1]
+
+    assert "`view` = VALUES(`view`)" in updates
+    assert "`updated_at` = VALUES(`updated_at`)" in updates
+    assert "collected_at" not in updates
+    assert "tname" not in updates
+    assert "bvid" not in updates
+
+
+VIDEO_COLUMNS = [
+    ("bvid", "varchar"), ("title", "varchar"), ("view", "bigint"), ("tname", "varchar"),
+    ("pubdate", "datetime"), ("collected_at", "datetime"), ("updated_at", "timestamp"), ("day", "date"),
+]
+
+
+class FakeResult:
+    def __init__(self, rows=(), scalar=None):
+        self.rows = list(rows)
+        self._scalar = scalar
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def scalar(self):
+        return self._scalar
+
+    def first(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+    def mappings(self):
+        return self
+
+    def partitions(self, size):
+        for start in range(0, len(self.rows), size):
+            yield self.rows[start:start + size]
+
+
+class FakeConnection:
+    """按SQL文本返回结果的MySQL连接替身：videos表为空，其余语句记录下来"""
+
+    def __init__(self, table_rows):
+        self.table_rows = table_rows
+        self.executed = []
+
+    def execution_options(self, **options):
+        return self
+
+    def execute(self, statement, params=None):
+        sql = str(statement)
+        if "information_schema.tables" in sql:
+            return FakeResult(scalar=len(self.table_rows))
+        if "information_schema.columns" in sql:
+            return FakeResult([(name, data_type, data_type, None, None) for name, data_type in VIDEO_COLUMNS])
+        if "SELECT *" in sql:
+            return FakeResult(self.table_rows)
+        if "SELECT 1" in sql or "FOR UPDATE" in sql:
+            return FakeResult()
+        self.executed.append((sql, params))
+        return FakeResult()
+
+    def commit(self):
+        pass
+
+    @contextmanager
+    def begin(self):
+        yield self
+
+
+class FakeEngine:
+    def __init__(self, table_rows=()):
+        self.conn = FakeConnection(list(table_rows))
+
+    @contextmanager
+    def connect(self):
+        yield self.conn
+
+
+def test_ndjson_round_trip_restores_datetimes_for_rollup_hook(tmp_path):
+    collected_at = datetime(2024, 3, 1, 10, 30, 15)
+    source = FakeEngine([{
+        "bvid": "BV1", "title": "标题", "view": 100, "tname": "游戏", "pubdate": datetime(2024, 2, 1, 8, 0),
+        "collected_at": collected_at, "updated_at": collected_at, "day": date(2024, 3, 1)
+    }])
+    assert export_table(source, "videos", str(tmp_path), "ndjson", batch_size=10) == 1
+
+    target = FakeEngine()
+    store = VideoRollupStore.__new__(VideoRollupStore)
+    seen = []
+
+    def hook(conn, rows):
+        seen.extend(rows)
+        store.apply(conn, rows)
+
+    assert import_table(target, "videos", str(tmp_path / "videos.ndjson.zst"), batch_size=10, pre_hook=hook) == 1
+
+    row = seen[0]
+    assert row["collected_at"] == collected_at
+    assert row["pubdate"] == datetime(2024, 2, 1, 8, 0)
+    assert row["day"] == date(2024, 3, 1)
+    rollup_params = [params for sql, params in target.conn.executed if "video_rollup_hourly" in sql][0]
+    assert rollup_params[0]["hour"] == datetime(2024, 3, 1, 10)
+    assert rollup_params[0]["day"] == date(2024, 3, 1)
+    upsert_params = [params for sql, params in target.conn.executed if "INSERT INTO `videos`" in sql][0]
+    assert upsert_params[0]["collected_at"] == collected_at
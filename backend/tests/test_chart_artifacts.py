@@ -0,0 +1,67 @@
+"""后台图表渲染测试：失败记录在状态中，之后查询状态时重新提交"""
+
+from chart_artifacts import ChartArtifactStore, ChartRenderJob
+
+
+class InlineExecutor:
+    """在提交线程中直接执行，便于断言"""
+
+    def submit(self, fn, *args):
+        fn(*args)
+
+
+def test_failed_render_reported_and_resubmitted(tmp_path):
+    job = ChartRenderJob(ChartArtifactStore(str(tmp_path)), InlineExecutor(), retry_interval=0)
+    attempts = []
+
+    def flaky_render(value):
+        attempts.append(value)
+        if len(attempts) == 1:
+            raise RuntimeError("font missing")
+        return b"png-bytes"
+
+    job.submit(flaky_render, 1, source="duckdb")
+    assert attempts == [1]
+    assert job.store.latest() is None
+
+    # 查询状态时重新提交失败的渲染（同步执行器中立即完成）
+    status = job.status()
+    assert attempts == [1, 1]
+    assert status["etag"] is not None
+    assert status["last_error"] is None
+
+
+def test_retry_waits_for_interval(tmp_path):
+    job = ChartRenderJob(ChartArtifactStore(str(tmp_path)), InlineExecutor(), retry_interval=3600)
+
+    def broken_render():
+        raise RuntimeError("font missing")
+
+    job.submit(broken_render)
+
+    status = job.status()
+    assert status["last_error"] == "font missing"
+    assert status["etag"] is None
+    assert job.retry_failed() is False
+
+
+class RejectingExecutor(InlineExecutor):
+    """第一次提交时拒绝（如执行器已关闭），之后正常执行"""
+
+    def __init__(self):
+        self.rejected = False
+
+    def submit(self, fn, *args):
+        if not self.rejected:
+            self.rejected = True
+            raise RuntimeError("cannot schedule new futures after shutdown")
+        super().submit(fn, *args)
+
+
+def test_rejected_submit_does_not_stay_running(tmp_path):
+    job = ChartRenderJob(ChartArtifactStore(str(tmp_path)), RejectingExecutor(), retry_interval=0)
+
+    job.submit(lambda: b"png-bytes")
+    assert job.pending is False
+    assert job.status()["etag"] is not None
+    assert job.status()["last_error"] is None
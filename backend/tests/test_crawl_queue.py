@@ -0,0 +1,171 @@
+"""爬取任务队列测试（fakeredis）"""
+
+import asyncio
+
+import fakeredis
+import pytest
+
+from crawl_engine import AsyncCrawlEngine, BilibiliAPIError
+from crawl_queue import CrawlQueue, create_redis_client, enqueue_popular_crawl
+from crawl_worker import process_batch
+
+
+@pytest.fixture
+def queue():
+    return CrawlQueue(fakeredis.FakeRedis(decode_responses=True), namespace="test",
+                      lease_seconds=60, max_attempts=3)
+
+
+def test_memory_backend_uses_fakeredis():
+    client = create_redis_client({'backend': 'memory'})
+    assert client.ping()
+
+
+def test_enqueue_dedupe(queue):
+    first = queue.enqueue("video", {"bvid": "BV1"}, dedupe_key="video:BV1")
+    second = queue.enqueue("video", {"bvid": "BV1"}, dedupe_key="video:BV1")
+    other = queue.enqueue("video", {"bvid": "BV2"}, dedupe_key="video:BV2")
+
+    assert first is not None
+    assert second is None
+    assert other is not None
+    assert queue.stats()["pending"] == 2
+
+
+def test_enqueue_popular_crawl_dedupes_pages(queue, monkeypatch):
+    monkeypatch.setattr("crawl_queue.time.strftime", lambda fmt: "20240101000000")
+    assert enqueue_popular_crawl(queue, pages=3)["pages"] == 3
+    assert enqueue_popular_crawl(queue, pages=3)["pages"] == 0
+
+
+def test_lease_and_ack(queue):
+    job_id = queue.enqueue("video", {"bvid": "BV1"})
+
+    jobs = queue.lease("worker-a", count=5)
+    assert [job["id"] for job in jobs] == [job_id]
+    assert queue.stats() == {"pending": 0, "leased": 1, "dead": 0}
+    # 已被租用的任务不会再分给其他worker
+    assert queue.lease("worker-b") == []
+
+    assert not queue.ack(jobs[0], "worker-b")
+    assert queue.ack(jobs[0], "worker-a")
+    assert queue.stats() == {"pending": 0, "leased": 0, "dead": 0}
+
+
+def test_lease_is_fifo(queue):
+    ids = [queue.enqueue("popular_page", {"page": page}) for page in range(3)]
+    assert [job["id"] for job in queue.lease("worker-a", count=3)] == ids
+
+
+def test_nack_retries_until_dead_letter(queue):
+    job_id = queue.enqueue("video", {"bvid": "BV1"})
+
+    for attempt in range(queue.max_attempts - 1):
+        job = queue.lease("worker-a")[0]
+        assert job["attempts"] == attempt
+        assert not queue.nack(job, "worker-b", "boom")
+        assert queue.nack(job, "worker-a", "boom")
+        assert queue.stats() == {"pending": 1, "leased": 0, "dead": 0}
+
+    job = queue.lease("worker-a")[0]
+    assert queue.nack(job, "worker-a", "boom")
+
+    assert queue.stats() == {"pending": 0, "leased": 0, "dead": 1}
+    dead = queue.dead_letters()
+    assert [job["id"] for job in dead] == [job_id]
+    assert dead[0]["attempts"] == queue.max_attempts
+    assert dead[0]["last_error"] == "boom"
+
+
+def test_reap_expired_leases(queue, monkeypatch):
+    queue.enqueue("video", {"bvid": "BV1"})
+    queue.enqueue("video", {"bvid": "BV2"})
+    now = 1_000_000.0
+    monkeypatch.setattr("crawl_queue.time.time", lambda: now)
+    renewed, stale = queue.lease("worker-a", count=2)
+
+    # 只有第一个任务续租，第二个任务租约到期
+    now += queue.lease_seconds / 2
+    assert queue.renew(renewed, "worker-a")
+    assert not queue.renew(renewed, "worker-b")
+    now += queue.lease_seconds / 2 + 1
+
+    assert queue.reap_expired() == 1
+    assert queue.stats() == {"pending": 1, "leased": 1, "dead": 0}
+    # 被回收的任务重新分配后，原worker不能再确认
+    assert not queue.ack(stale, "worker-a")
+    retried = queue.lease("worker-b")[0]
+    assert retried["id"] == stale["id"]
+    assert retried["attempts"] == 1
+    assert retried["last_error"] == "租约超时"
+    assert queue.ack(retried, "worker-b")
+    assert queue.ack(renewed, "worker-a")
+    assert queue.reap_expired() == 0
+
+
+def test_requeue_dead(queue):
+    queue.max_attempts = 1
+    job_id = queue.enqueue("video", {"bvid": "BV1"})
+    queue.nack(queue.lease("worker-a")[0], "worker-a", "boom")
+    assert queue.stats()["dead"] == 1
+
+    assert queue.requeue_dead() == 1
+    assert queue.stats() == {"pending": 1, "leased": 0, "dead": 0}
+    job = queue.lease("worker-a")[0]
+    assert job["id"] == job_id
+    assert job["attempts"] == 0
+    assert queue.ack(job, "worker-a")
+    assert queue.requeue_dead() == 0
+
+
+class FakeSink:
+    total_failed = 0
+
+    def close(self):
+        pass
+
+
+class FakeAnalyticsSystem:
+    def create_video_sink(self, batch_size):
+        return FakeSink()
+
+
+def _popular_crawler(payload):
+    """真实的fetch_popular_page，接口响应固定为payload"""
+    crawler = AsyncCrawlEngine.__new__(AsyncCrawlEngine)
+
+    async def get_json(path, params=None):
+        return payload
+
+    crawler.get_json = get_json
+    return crawler
+
+
+def _process(queue, crawler):
+    jobs = queue.lease("worker-a")
+    asyncio.run(process_batch(FakeAnalyticsSystem(), crawler, queue, "worker-a", jobs))
+
+
+def test_popular_page_api_error_is_retried_then_dead_lettered(queue):
+    job_id = queue.enqueue("popular_page", {"page": 1, "round_id": "r1"})
+    crawler = _popular_crawler({"code": -352, "message": "风控校验失败"})
+
+    with pytest.raises(BilibiliAPIError):
+        asyncio.run(crawler.fetch_popular_page(1))
+
+    # 业务码非0时任务不会被确认丢弃，而是重试，超过次数后进入死信
+    for attempt in range(queue.max_attempts - 1):
+        _process(queue, crawler)
+        assert queue.stats() == {"pending": 1, "leased": 0, "dead": 0}
+    _process(queue, crawler)
+    assert queue.stats() == {"pending": 0, "leased": 0, "dead": 1}
+    assert [job["id"] for job in queue.dead_letters()] == [job_id]
+
+
+def test_popular_page_success_enqueues_videos(queue):
+    queue.enqueue("popular_page", {"page": 1, "round_id": "r1"})
+    crawler = _popular_crawler({"code": 0, "data": {"list": [{"bvid": "BV1"}, {"bvid": "BV2"}]}})
+
+    _process(queue, crawler)
+
+    assert queue.stats() == {"pending": 2, "leased": 0, "dead": 0}
@@ -0,0 +1,102 @@
+"""大屏汇总测试：按数据版本增量刷新、推送变化字段，积压满的订阅者改为收到一份完整汇总"""
+
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("orjson", minversion="3.9")
+
+from dashboard import DashboardHub, DashboardSummary  # noqa: E402
+
+
+class FakeRollupStore:
+    def __init__(self):
+        self.version = 1
+
+    def data_version(self):
+        return self.version
+
+
+class StubSummary(DashboardSummary):
+    """_compute返回预设的指标，不访问数据库"""
+
+    def __init__(self, rollup_store):
+        super().__init__(engine=None, rollup_store=rollup_store)
+        self.metrics = {"total_videos": 10}
+        self.computed = 0
+
+    def _compute(self, version):
+        self.computed += 1
+        return {
+            "version": version, "updated_at": f"t{self.computed}",
+            "metrics": dict(self.metrics), "top_tags": [["游戏", 3]], "trend": []
+        }
+
+
+def test_refresh_only_when_version_changes():
+    store = FakeRollupStore()
+    summary = StubSummary(store)
+
+    first = summary.refresh_if_changed()
+    assert first == summary.snapshot()
+    assert summary.is_current(1)
+
+    # 版本未变化：不重新计算
+    assert summary.refresh_if_changed() is None
+    assert summary.computed == 1
+
+    store.version = 2
+    summary.metrics["total_videos"] = 12
+    delta = summary.refresh_if_changed()
+    assert delta == {"version": 2, "updated_at": "t2", "metrics": {"total_videos": 12}}
+    assert summary.snapshot()["top_tags"] == [["游戏", 3]]
+
+    # 版本变化但数据相同：只推送version与updated_at
+    store.version = 3
+    assert summary.refresh_if_changed() == {"version": 3, "updated_at": "t3"}
+
+
+def _events(queue):
+    messages = []
+    while not queue.empty():
+        messages.append(queue.get_nowait())
+    return [message.split("\n", 1)[0] for message in messages], messages
+
+
+def test_full_queue_resyncs_with_single_summary():
+    async def run():
+        hub = DashboardHub(heartbeat_seconds=60, queue_size=2)
+        stream = hub.stream(initial={"version": 0})
+        await stream.__anext__()
+        (queue,) = hub._subscribers
+
+        # 订阅者没有读取，积压超过队列长度
+        for version in range(1, 6):
+            hub.publish({"version": version}, {"version": version, "metrics": {}})
+        events, messages = _events(queue)
+        await stream.aclose()
+        return events, messages
+
+    events, messages = asyncio.run(run())
+    # 队列满时丢弃积压的变化，只留一份最新的完整汇总，客户端据此重新同步
+    assert events == ["event: summary"]
+    assert json.loads(messages[0].split("data: ", 1)[1]) == {"version": 5, "metrics": {}}
+
+
+def test_stream_unsubscribes_on_close():
+    async def run():
+        hub = DashboardHub(heartbeat_seconds=60)
+        stream = hub.stream(initial={"version": 1})
+        assert (await stream.__anext__()).startswith("event: summary")
+        assert len(hub) == 1
+
+        hub.publish({"version": 2}, {"version": 2})
+        assert (await stream.__anext__()).startswith("event: delta")
+
+        # 客户端断开：生成器关闭时执行finally，移除订阅
+        await stream.aclose()
+        return len(hub)
+
+    assert asyncio.run(run()) == 0
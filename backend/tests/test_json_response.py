@@ -0,0 +1,61 @@
+"""JSON响应序列化测试：DataFrame/Series、Decimal、numpy、NaT/Timestamp与集合的输出与标准JSON一致"""
+
+import json
+from decimal import Decimal
+
+import pytest
+
+pytest.importorskip("orjson", minversion="3.9")
+pytest.importorskip("fastapi")
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from json_response import FastJSONResponse, dumps  # noqa: E402
+
+
+def _loads(content):
+    return json.loads(dumps(content))
+
+
+def test_dataframe_and_series_match_records():
+    df = pd.DataFrame({
+        "bvid": ["BV1", "BV2"],
+        "view": [10, 20],
+        "score": [0.5, np.nan],
+        "pubdate": pd.to_datetime(["2024-03-01 10:00:00", None]),
+    })
+
+    assert _loads({"rows": df}) == {"rows": [
+        {"bvid": "BV1", "view": 10, "score": 0.5, "pubdate": "2024-03-01T10:00:00.000"},
+        {"bvid": "BV2", "view": 20, "score": None, "pubdate": None},
+    ]}
+    assert _loads(df["view"]) == [10, 20]
+    assert _loads(pd.DataFrame(columns=["bvid", "view"])) == []
+
+
+def test_scalars_and_containers():
+    assert _loads({
+        "int": Decimal("12"), "float": Decimal("1.25"),
+        "np_int": np.int64(3), "np_float": np.float32(0.5), "np_bool": np.bool_(True),
+        "array": np.arange(3), "strided": np.arange(6)[::2], "objects": np.array(["a", None], dtype=object),
+        "nat": pd.NaT, "timestamp": pd.Timestamp("2024-03-01 10:00:00"),
+        "set": {"tag"},
+    }) == {
+        "int": 12, "float": 1.25,
+        "np_int": 3, "np_float": 0.5, "np_bool": True,
+        "array": [0, 1, 2], "strided": [0, 2, 4], "objects": ["a", None],
+        "nat": None, "timestamp": "2024-03-01T10:00:00",
+        "set": ["tag"],
+    }
+
+
+def test_non_string_keys_and_unknown_types():
+    assert _loads({9: 1, pd.Timestamp("2024-03-01").date(): 2}) == {"9": 1, "2024-03-01": 2}
+    with pytest.raises(TypeError):
+        dumps({"value": object()})
+
+
+def test_response_renders_dataframe():
+    response = FastJSONResponse({"data": pd.DataFrame({"view": [1]})})
+    assert json.loads(response.body) == {"data": [{"view": 1}]}
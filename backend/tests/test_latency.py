@@ -0,0 +1,103 @@
+"""
+事件循环延迟测试：慢的分析请求在执行器中运行时，并发的轻量请求的p95延迟保持在上限内
+
+第一个测试用仓库的执行器与结果缓存搭建最小应用，不需要数据库；第二个测试直接请求main.app，
+需要TEST_MYSQL_URL，且DB_HOST等环境变量指向同一个测试库（main导入时会连接数据库）。
+"""
+
+import asyncio
+import os
+import time
+
+import pytest
+
+pytest.importorskip("fastapi")
+httpx = pytest.importorskip("httpx")
+
+from fastapi import FastAPI  # noqa: E402
+
+from executors import run_cpu, run_io  # noqa: E402
+from result_cache import VersionedResultCache  # noqa: E402
+
+LIGHT_REQUESTS = 200
+SLOW_SECONDS = 1.5
+P95_BOUND = 0.25
+
+
+def _busy(seconds: float) -> int:
+    """持有GIL的纯Python计算，模拟pandas/sklearn分析"""
+    deadline = time.perf_counter() + seconds
+    count = 0
+    while time.perf_counter() < deadline:
+        count += sum(range(1000))
+    return count
+
+
+def _p95(latencies):
+    ordered = sorted(latencies)
+    return ordered[int(len(ordered) * 0.95) - 1]
+
+
+LIGHT_INTERVAL = 0.005
+
+
+async def _timed(client, path: str, delay: float = 0.0) -> float:
+    """delay秒后发出请求，耗时从计划发出的时刻算起，事件循环被阻塞的时间也计入"""
+    scheduled = time.perf_counter() + delay
+    await asyncio.sleep(delay)
+    response = await client.get(path)
+    assert response.status_code == 200, path
+    return time.perf_counter() - scheduled
+
+
+async def _measure(app, slow_path: str, light_paths):
+    """慢请求开始后按固定间隔发出轻量请求，返回轻量请求的耗时与慢请求耗时"""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=60) as client:
+        slow = asyncio.create_task(_timed(client, slow_path))
+        light = await asyncio.gather(*(
+            _timed(client, light_paths[i % len(light_paths)], 0.05 + i * LIGHT_INTERVAL)
+            for i in range(LIGHT_REQUESTS)
+        ))
+        return light, await slow
+
+
+def test_light_requests_not_blocked_by_slow_analysis():
+    async def read_version():
+        # 模拟异步连接上的计数器查询
+        await asyncio.sleep(0.001)
+        return 1
+
+    cache = VersionedResultCache(lambda: 1, version_ttl=0.0, async_version_source=read_version)
+    app = FastAPI()
+
+    @app.get("/slow")
+    async def slow():
+        return {"count": await run_cpu(cache.compute, "analysis", lambda: _busy(SLOW_SECONDS))}
+
+    @app.get("/version")
+    async def version():
+        return {"version": await cache.current_version_async(), "cached": cache.peek("analysis")}
+
+    @app.get("/metrics")
+    async def metrics():
+        return {"content": await run_io(lambda: b"# HELP\n")}
+
+    light, slow_elapsed = asyncio.run(_measure(app, "/slow", ["/version", "/metrics"]))
+    assert slow_elapsed >= SLOW_SECONDS
+    assert _p95(light) < P95_BOUND
+
+
+@pytest.mark.skipif(not os.getenv("TEST_MYSQL_URL"), reason="未设置TEST_MYSQL_URL")
+def test_main_app_light_requests_during_analysis(monkeypatch):
+    main = pytest.importorskip("main")
+    # 分析计算替换为固定耗时的计算，并丢弃full模式已缓存的结果，保证慢请求真正执行计算
+    monkeypatch.setattr(main, "compute_video_analysis", lambda mode: {"busy": _busy(SLOW_SECONDS)})
+    main.analysis_cache._entries.pop("video_analysis:full", None)
+
+    light, slow_elapsed = asyncio.run(_measure(
+        main.app, "/api/analysis/videos?mode=full",
+        ["/api/videos?page_size=20", "/metrics", "/api/dashboard/summary", "/api/analysis/chart/status"]
+    ))
+    assert slow_elapsed >= SLOW_SECONDS
+    assert _p95(light) < P95_BOUND
@@ -0,0 +1,47 @@
+"""监控指标测试：分布式队列深度每次抓取只读取一次队列状态"""
+
+import pytest
+
+pytest.importorskip("prometheus_client")
+
+import metrics  # noqa: E402
+
+
+class CountingQueue:
+    def __init__(self):
+        self.calls = 0
+
+    def stats(self):
+        self.calls += 1
+        return {"pending": 3, "leased": 2, "dead": 1}
+
+
+def test_queue_depth_reads_stats_once_per_scrape():
+    queue = CountingQueue()
+    metrics.register_crawl_queue(queue)
+    metrics.SINK_BUFFER_DEPTH.set(7)
+
+    body, _ = metrics.render_latest()
+    text = body.decode("utf-8")
+
+    assert queue.calls == 1
+    assert 'bilibili_crawl_queue_depth{queue="pending"} 3.0' in text
+    assert 'bilibili_crawl_queue_depth{queue="leased"} 2.0' in text
+    assert 'bilibili_crawl_queue_depth{queue="dead"} 1.0' in text
+    assert 'bilibili_crawl_queue_depth{queue="sink_buffer"} 7.0' in text
+    # 同一指标只导出一次HELP
+    assert text.count("# HELP bilibili_crawl_queue_depth ") == 1
+
+
+def test_failed_stats_keep_other_samples():
+    class BrokenQueue:
+        def stats(self):
+            raise ConnectionError("redis down")
+
+    metrics.register_crawl_queue(BrokenQueue())
+    metrics.SINK_BUFFER_DEPTH.set(0)
+
+    text = metrics.render_latest()[0].decode("utf-8")
+
+    assert 'bilibili_crawl_queue_depth{queue="sink_buffer"} 0.0' in text
+    assert 'queue="pending"' not in text
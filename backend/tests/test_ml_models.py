@@ -0,0 +1,37 @@
+"""视频推荐测试：各推荐路径都返回DataFrame，没有结果时为带相同列的空表"""
+
+import pytest
+
+for module in ("sklearn", "xgboost", "lightgbm", "textblob", "snownlp", "jieba"):
+    pytest.importorskip(module)
+
+import pandas as pd  # noqa: E402
+
+from ml_models import RECOMMENDATION_COLUMNS, MLService  # noqa: E402
+
+
+def _videos():
+    return pd.DataFrame({
+        "bvid": ["BV1", "BV2", "BV3"],
+        "title": ["游戏实况", "游戏攻略", "音乐现场"],
+        "desc": ["", "", ""],
+        "view": [100, 200, 300], "like": [1, 2, 3], "coin": [1, 1, 1], "share": [0, 1, 2],
+        "tname": ["游戏", "游戏", "音乐"],
+    })
+
+
+def test_empty_input_returns_empty_dataframe():
+    result = MLService().get_video_recommendations(videos_df=pd.DataFrame())
+    assert isinstance(result, pd.DataFrame)
+    assert result.empty
+    assert list(result.columns) == RECOMMENDATION_COLUMNS
+
+
+def test_content_based_unknown_video_returns_empty_dataframe():
+    service = MLService()
+    found = service.get_video_recommendations(video_bvid="BV1", videos_df=_videos(), top_n=2)
+    missing = service.get_video_recommendations(video_bvid="BV404", videos_df=_videos(), top_n=2)
+
+    assert isinstance(missing, pd.DataFrame)
+    assert missing.empty
+    assert list(missing.columns) == list(found.columns) == RECOMMENDATION_COLUMNS + ["similarity_score"]
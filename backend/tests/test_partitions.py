@@ -0,0 +1,139 @@
+"""分区维护测试：月份计算、分区上界、过期分区的截止月份与归档前的行数校验"""
+
+from contextlib import contextmanager
+from datetime import date, datetime
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("pyarrow")
+
+import pandas as pd  # noqa: E402
+
+import partitions  # noqa: E402
+from partitions import PartitionManager, add_months, partition_month, partition_name  # noqa: E402
+
+TABLES = {
+    "user_data": {"column": "created_at", "kind": "datetime", "retention_months": 3},
+    "user_watch_events": {"column": "view_at", "kind": "epoch", "retention_months": 3},
+}
+
+
+class FakeResult:
+    def __init__(self, scalar=None):
+        self._scalar = scalar
+
+    def scalar(self):
+        return self._scalar
+
+
+class FakeConnection:
+    def __init__(self, count):
+        self.count = count
+        self.executed = []
+
+    def execution_options(self, **options):
+        return self
+
+    def execute(self, statement, params=None):
+        sql = str(statement)
+        self.executed.append(sql)
+        if "COUNT(*)" in sql:
+            return FakeResult(self.count)
+        return FakeResult()
+
+
+class FakeEngine:
+    """只记录语句的引擎，COUNT(*)返回固定行数"""
+
+    def __init__(self, count=0):
+        self.conn = FakeConnection(count)
+
+    @contextmanager
+    def connect(self):
+        yield self.conn
+
+    @contextmanager
+    def begin(self):
+        yield self.conn
+
+
+class FixedDate(date):
+    @classmethod
+    def today(cls):
+        return cls(2024, 6, 15)
+
+
+def _manager(tmp_path, engine=None):
+    return PartitionManager(engine or FakeEngine(), TABLES, str(tmp_path))
+
+
+def test_add_months_crosses_years():
+    assert add_months(date(2024, 12, 1), 1) == date(2025, 1, 1)
+    assert add_months(date(2024, 1, 1), -1) == date(2023, 12, 1)
+    assert add_months(date(2024, 3, 1), -15) == date(2022, 12, 1)
+    assert add_months(date(2024, 3, 1), 0) == date(2024, 3, 1)
+
+
+def test_partition_month_round_trip():
+    assert partition_month(partition_name(date(2024, 1, 1))) == date(2024, 1, 1)
+    assert partition_month("pfuture") is None
+    assert partition_month("p2024013") is None
+    assert partition_month(None) is None
+
+
+def test_bound_epoch_vs_datetime(tmp_path):
+    manager = _manager(tmp_path)
+    assert manager._bound("user_data", date(2024, 3, 1)) == "'2024-03-01'"
+    # 秒级时间戳列按本地时间的月初
+    assert manager._bound("user_watch_events", date(2024, 3, 1)) == str(int(datetime(2024, 3, 1).timestamp()))
+    assert "VALUES LESS THAN ('2024-04-01')" in manager._partition_clause("user_data", date(2024, 3, 1))
+
+
+def _archive_expired(tmp_path, monkeypatch, names):
+    monkeypatch.setattr(partitions, "date", FixedDate)
+    manager = _manager(tmp_path)
+    archived = []
+    monkeypatch.setattr(manager, "list_partitions", lambda conn, table: [{"name": name} for name in names])
+    monkeypatch.setattr(manager, "archive_partition", lambda table, name: archived.append(name) or 0)
+    manager.archive_expired("user_data")
+    return archived
+
+
+def test_archive_expired_cutoff(tmp_path, monkeypatch):
+    # 今天2024-06-15，保留3个月：2024-03之前的分区过期
+    archived = _archive_expired(tmp_path, monkeypatch, ["p202401", "p202402", "p202403", "p202406", "pfuture"])
+    assert archived == ["p202401", "p202402"]
+
+
+def test_archive_expired_keeps_one_monthly_partition(tmp_path, monkeypatch):
+    archived = _archive_expired(tmp_path, monkeypatch, ["p202312", "p202401", "p202402", "pfuture"])
+    assert archived == ["p202312", "p202401"]
+
+
+def _archive(tmp_path, monkeypatch, count):
+    engine = FakeEngine(count)
+    manager = _manager(tmp_path, engine)
+    chunk = pd.DataFrame({"id": [1, 2], "created_at": pd.to_datetime(["2024-01-01", "2024-01-02"])})
+    monkeypatch.setattr(partitions.pd, "read_sql", lambda *args, **kwargs: iter([chunk]))
+    return manager, engine
+
+
+def test_archive_partition_refuses_to_drop_when_counts_differ(tmp_path, monkeypatch):
+    manager, engine = _archive(tmp_path, monkeypatch, count=3)
+
+    with pytest.raises(RuntimeError):
+        manager.archive_partition("user_data", "p202401")
+
+    assert not any("DROP PARTITION" in sql for sql in engine.conn.executed)
+    assert not any("partition_archives (" in sql and "REPLACE" in sql for sql in engine.conn.executed)
+    assert not (tmp_path / "user_data" / "p202401.parquet").exists()
+
+
+def test_archive_partition_drops_after_matching_count(tmp_path, monkeypatch):
+    manager, engine = _archive(tmp_path, monkeypatch, count=2)
+
+    assert manager.archive_partition("user_data", "p202401") == 2
+
+    assert engine.conn.executed[-1].strip() == "ALTER TABLE user_data DROP PARTITION p202401"
+    assert (tmp_path / "user_data" / "p202401.parquet").exists()
@@ -0,0 +1,70 @@
+"""熔断器测试：试探请求被取消或一直没有结果时，熔断器不能永久停在half_open"""
+
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("httpx")
+pytest.importorskip("requests")
+pytest.importorskip("prometheus_client")
+
+from rate_limit import AdaptiveRateLimiter, CircuitBreaker, RequestThrottle, RetryPolicy  # noqa: E402
+
+RESET_TIMEOUT = 0.05
+
+
+class FakeResponse:
+    status_code = 200
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {"code": 0}
+
+
+def _open_breaker() -> CircuitBreaker:
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=RESET_TIMEOUT)
+    breaker.record_failure()
+    assert breaker.state == "open"
+    time.sleep(RESET_TIMEOUT)
+    return breaker
+
+
+def test_cancelled_probe_releases_half_open():
+    breaker = _open_breaker()
+    throttle = RequestThrottle(AdaptiveRateLimiter(100, 10, 1, 100), RetryPolicy(max_retries=0), breaker)
+
+    async def hang():
+        await asyncio.sleep(3600)
+
+    async def success():
+        return FakeResponse()
+
+    async def run():
+        probe = asyncio.create_task(throttle.run_async(hang))
+        await asyncio.sleep(0.01)
+        assert breaker.state == "half_open"
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+        # 被取消的试探不占住half_open，下一次请求立即重新试探
+        return await throttle.run_async(success)
+
+    assert asyncio.run(run()) == {"code": 0}
+    assert breaker.state == "closed"
+
+
+def test_lost_probe_expires_after_reset_timeout():
+    breaker = _open_breaker()
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    # 试探请求未返回，其他请求被拒绝
+    assert not breaker.allow()
+
+    time.sleep(RESET_TIMEOUT)
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
@@ -0,0 +1,65 @@
+"""结果缓存测试：每个键只保留一份结果，数据版本或附加版本变化后替换"""
+
+import pytest
+
+pytest.importorskip("orjson")
+pytest.importorskip("fastapi")
+pytest.importorskip("pandas")
+
+from result_cache import VersionedResultCache  # noqa: E402
+
+
+class Version:
+    def __init__(self):
+        self.value = 1
+
+    def __call__(self):
+        return self.value
+
+
+@pytest.fixture
+def version():
+    return Version()
+
+
+def test_entry_replaced_when_version_changes(version):
+    cache = VersionedResultCache(version, version_ttl=0)
+    calls = []
+
+    def compute():
+        calls.append(version.value)
+        return {"version": version.value}
+
+    assert cache.compute("analysis:auto", compute) == {"version": 1}
+    assert cache.compute("analysis:auto", compute) == {"version": 1}
+    version.value = 2
+    assert cache.compute("analysis:auto", compute) == {"version": 2}
+
+    assert calls == [1, 2]
+    assert cache.stats()["entries"] == 1
+
+
+def test_tag_mismatch_recomputes_and_replaces(version):
+    cache = VersionedResultCache(version, version_ttl=60)
+
+    assert cache.compute("analysis:duckdb", lambda: "a", tag="mirror-1") == "a"
+    assert cache.peek("analysis:duckdb", "mirror-1") == "a"
+    assert cache.peek("analysis:duckdb", "mirror-2") is None
+    assert cache.get("analysis:duckdb", "mirror-2") is None
+
+    assert cache.compute("analysis:duckdb", lambda: "b", tag="mirror-2") == "b"
+    assert cache.peek("analysis:duckdb", "mirror-1") is None
+    assert cache.stats()["entries"] == 1
+    assert len(cache._key_locks) == 1
+
+
+def test_results_shared_through_redis(version):
+    fakeredis = pytest.importorskip("fakeredis")
+    redis_client = fakeredis.FakeRedis()
+    writer = VersionedResultCache(version, redis_client=redis_client)
+    reader = VersionedResultCache(version, redis_client=redis_client)
+
+    writer.compute("analysis:duckdb", lambda: {"total_videos": 3}, tag="mirror-1")
+
+    assert reader.get("analysis:duckdb", "mirror-1") == {"total_videos": 3}
+    assert reader.get("analysis:duckdb", "mirror-2") is None
@@ -0,0 +1,65 @@
+"""流式分析与全量分析一致性测试：分块累加得到的analysis_results与在完整DataFrame上计算的相同"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("pandas")
+pytest.importorskip("jieba")
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from streaming_analysis import ANALYSIS_COLUMNS, accumulate, add_derived_columns, dataframe_results  # noqa: E402
+
+TAGS = ["游戏", "音乐", "美食", "科技", "动画", "生活"]
+
+
+def _videos(count: int) -> pd.DataFrame:
+    rng = np.random.default_rng(11)
+    rows = []
+    for i in range(count):
+        rows.append({
+            "bvid": f"BV{i:06d}", "title": f"视频{i}", "author": "up",
+            "view": int(rng.integers(0, 500_000)), "danmaku": int(rng.integers(0, 500)),
+            "reply": int(rng.integers(0, 500)), "favorite": int(rng.integers(0, 500)),
+            "coin": int(rng.integers(0, 500)), "share": int(rng.integers(0, 100)), "like": int(rng.integers(0, 5000)),
+            "duration": 60, "pubdate": datetime(2024, 3, 1) + timedelta(hours=int(rng.integers(0, 24 * 30))),
+            "tname": TAGS[i % 3], "tags": ",".join(TAGS[j] for j in range(i % 4)), "desc": "",
+        })
+    return pd.DataFrame(rows, columns=ANALYSIS_COLUMNS)
+
+
+def _chunks(df: pd.DataFrame, size: int):
+    for start in range(0, len(df), size):
+        yield df.iloc[start:start + size].copy()
+
+
+def _assert_same(streamed, full):
+    assert streamed.pop("avg_interaction_rate") == pytest.approx(full.pop("avg_interaction_rate"))
+    assert streamed == full
+
+
+@pytest.mark.parametrize("chunksize", [7, 50, 1000])
+def test_accumulate_matches_full_table(chunksize):
+    df = _videos(300)
+
+    streamed = accumulate(_chunks(df, chunksize)).results()
+    full = dataframe_results(add_derived_columns(df.copy()))
+
+    _assert_same(streamed, full)
+
+
+def test_best_publish_hours_ties_keep_earlier_hour():
+    # 3点与20点平均播放量相同，10点次之；2点视频数不超过5，不参与排名
+    hours = [3] * 6 + [20] * 6 + [10] * 6 + [12] * 6 + [2] * 5
+    views = [1000] * 12 + [500] * 6 + [100] * 6 + [10 ** 6] * 5
+    df = _videos(len(hours))
+    df["pubdate"] = [datetime(2024, 3, 1, hour) for hour in hours]
+    df["view"] = views
+
+    streamed = accumulate(_chunks(df, 4)).results()
+    full = dataframe_results(add_derived_columns(df.copy()))
+
+    assert full["best_publish_hours"] == [3, 20, 10]
+    _assert_same(streamed, full)
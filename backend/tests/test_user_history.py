@@ -0,0 +1,176 @@
+"""
+观看历史测试：增量同步时游标与最新记录之间超过增量页数不能丢记录；
+/api/user/history抓取的历史写入观看记录表，用户分析接口随后能读到
+
+接口测试需要TEST_MYSQL_URL，且DB_HOST等环境变量指向同一个测试库（main导入时会连接数据库）。
+"""
+
+import asyncio
+import os
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from user_history import save_watch_history, sync_watch_history  # noqa: E402
+
+PAGE_SIZE = 10
+
+
+class FakeCrawler:
+    """按观看时间倒序分页返回历史记录，翻页语义与BiliBiliUserCrawler.fetch_watch_history一致"""
+
+    def __init__(self, view_ats):
+        self.items = [
+            {"view_at": view_at, "history": {"bvid": f"BV{view_at}", "oid": view_at}, "title": str(view_at)}
+            for view_at in sorted(view_ats, reverse=True)
+        ]
+        self.calls = []
+
+    def save_user_data(self, user_mid, data_type, data_content):
+        self.saved = (user_mid, data_type, data_content)
+
+    def fetch_watch_history(self, max_pages=5, since_view_at=None):
+        self.calls.append(max_pages)
+        history = []
+        for page in range(max_pages):
+            items = self.items[page * PAGE_SIZE:(page + 1) * PAGE_SIZE]
+            if not items:
+                return history, True
+            if since_view_at is not None:
+                new_items = [item for item in items if item["view_at"] > since_view_at]
+                history.extend(new_items)
+                if len(new_items) < len(items):
+                    return history, True
+            else:
+                history.extend(items)
+        return history, False
+
+
+class FakeEventStore:
+    def __init__(self):
+        self.events = {}
+
+    def add_events(self, user_mid, items):
+        added = 0
+        for item in items:
+            key = (user_mid, item["history"]["bvid"], item["view_at"])
+            added += key not in self.events
+            self.events[key] = item
+        return added
+
+
+class FakeCursorStore:
+    def __init__(self, view_at=None):
+        self.cursors = {}
+        if view_at is not None:
+            self.cursors[("1", "watch_history")] = {"view_at": view_at, "max": 0}
+
+    def get(self, user_mid, data_type):
+        return self.cursors.get((user_mid, data_type))
+
+    def save(self, user_mid, data_type, view_at, max_id=0):
+        self.cursors[(user_mid, data_type)] = {"view_at": view_at, "max": max_id}
+
+
+def test_incremental_sync_advances_cursor_when_caught_up():
+    crawler = FakeCrawler(range(1, 106))
+    events, cursors = FakeEventStore(), FakeCursorStore(view_at=100)
+
+    result = sync_watch_history(events, crawler, cursors, "1", backfill_pages=10, incremental_pages=2)
+
+    assert result == {"mode": "incremental", "new_items": 5, "complete": True}
+    assert cursors.get("1", "watch_history")["view_at"] == 105
+
+
+def test_incremental_gap_falls_back_to_backfill_pages():
+    # 上次同步后新增了35条，超过增量同步的2页
+    crawler = FakeCrawler(range(1, 136))
+    events, cursors = FakeEventStore(), FakeCursorStore(view_at=100)
+
+    result = sync_watch_history(events, crawler, cursors, "1", backfill_pages=10, incremental_pages=2)
+
+    assert result["mode"] == "incremental_backfill"
+    assert result["complete"] is True
+    assert result["new_items"] == 35
+    assert crawler.calls == [2, 10]
+    assert cursors.get("1", "watch_history")["view_at"] == 135
+
+
+def test_incremental_gap_keeps_cursor_when_still_behind():
+    crawler = FakeCrawler(range(1, 136))
+    events, cursors = FakeEventStore(), FakeCursorStore(view_at=100)
+
+    result = sync_watch_history(events, crawler, cursors, "1", backfill_pages=3, incremental_pages=2)
+
+    assert result["complete"] is False
+    assert result["new_items"] == 30
+    # 101~105仍未取到，游标不能越过它们
+    assert cursors.get("1", "watch_history")["view_at"] == 100
+
+    # 下次同步时较新的记录已写入（重复写入不计数），最终补齐缺口
+    result = sync_watch_history(events, crawler, cursors, "1", backfill_pages=4, incremental_pages=2)
+    assert result["complete"] is True
+    assert result["new_items"] == 5
+    assert cursors.get("1", "watch_history")["view_at"] == 135
+
+
+def test_backfill_without_cursor_saves_newest():
+    crawler = FakeCrawler(range(1, 51))
+    events, cursors = FakeEventStore(), FakeCursorStore()
+
+    result = sync_watch_history(events, crawler, cursors, "1", backfill_pages=2, incremental_pages=1)
+
+    assert result["mode"] == "backfill"
+    assert result["new_items"] == 20
+    assert cursors.get("1", "watch_history")["view_at"] == 50
+
+
+def test_save_watch_history_writes_events_for_analysis():
+    crawler = FakeCrawler(range(1, 4))
+    events = FakeEventStore()
+
+    written = save_watch_history(events, crawler, "42", crawler.items)
+
+    assert written == 3
+    # 用户分析按同一个mid查询观看记录表
+    assert {key[0] for key in events.events} == {"42"}
+    assert crawler.saved == ("42", "watch_history", crawler.items)
+
+
+@pytest.mark.skipif(not os.getenv("TEST_MYSQL_URL"), reason="未设置TEST_MYSQL_URL")
+def test_history_endpoint_then_user_analysis(monkeypatch):
+    httpx = pytest.importorskip("httpx")
+    main = pytest.importorskip("main")
+    mid = "990000001"
+    items = FakeCrawler(range(1700000000, 1700000005)).items
+
+    class EndpointCrawler:
+        def __init__(self, cookie):
+            self.cookie = cookie
+
+        def check_cookie_validity(self):
+            return True
+
+        def get_user_info(self):
+            return {"mid": int(mid), "name": "test"}
+
+        def get_watch_history(self):
+            return items
+
+        save_user_data = main.BiliBiliUserCrawler.save_user_data
+
+    monkeypatch.setattr(main, "BiliBiliUserCrawler", EndpointCrawler)
+    with main.engine.begin() as conn:
+        conn.execute(main.text("DELETE FROM user_watch_events WHERE user_mid = :mid"), {"mid": mid})
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            history = await client.post("/api/user/history", json={"cookie": "SESSDATA=test"})
+            assert history.status_code == 200
+            return await client.get(f"/api/user/analysis/{mid}")
+
+    analysis = asyncio.run(run())
+    assert analysis.status_code == 200
+    assert analysis.json()["total_watched"] == len(items)
@@ -0,0 +1,53 @@
+"""视频列表游标分页测试（SQLite内存库，只用到与MySQL通用的SQL）"""
+
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+from sqlalchemy import create_engine, text  # noqa: E402
+
+from video_store import list_videos  # noqa: E402
+
+
+@pytest.fixture
+def conn():
+    # 声明为TIMESTAMP，sqlite3按声明类型把采集时间解析为datetime，与MySQL驱动返回的类型一致
+    engine = create_engine("sqlite://", connect_args={"detect_types": sqlite3.PARSE_DECLTYPES})
+    with engine.begin() as conn:
+        conn.execute(text("""
+        CREATE TABLE videos (
+            bvid VARCHAR(20) PRIMARY KEY, title TEXT, author TEXT, view INT, danmaku INT, reply INT,
+            favorite INT, coin INT, share INT, `like` INT, pubdate TIMESTAMP, tname TEXT, collected_at TIMESTAMP
+        )
+        """))
+        start = datetime(2024, 3, 1)
+        conn.execute(text("""
+        INSERT INTO videos (bvid, title, collected_at) VALUES (:bvid, :bvid, :collected_at)
+        """), [
+            # 每两条共用同一采集时间，验证同一时间内按bvid翻页
+            {"bvid": f"BV{i:04d}", "collected_at": start + timedelta(minutes=i // 2)}
+            for i in range(25)
+        ] + [{"bvid": f"BVNULL{i}", "collected_at": None} for i in range(3)])
+        yield conn
+
+
+def test_pages_cover_every_dated_video_once(conn):
+    seen, cursor = [], None
+    while True:
+        rows, cursor = list_videos(conn, 4, cursor)
+        seen.extend(row["bvid"] for row in rows)
+        if cursor is None:
+            break
+
+    assert seen == [f"BV{i:04d}" for i in reversed(range(25))]
+
+
+def test_null_collected_at_does_not_break_last_page(conn):
+    rows, cursor = list_videos(conn, 25)
+
+    assert len(rows) == 25
+    assert cursor is None
+    assert all(row["collected_at"] is not None for row in rows)
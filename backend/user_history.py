@@ -0,0 +1,493 @@
+"""
+用户观看历史模块
+观看记录按行存储在user_watch_events表中，并维护增量同步游标
+
+用法（一次性迁移user_data中的历史JSON）:
+    python user_history.py migrate [--drop-blobs]
+"""
+
+import argparse
+import json
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import bindparam, text
+
+logger = logging.getLogger(__name__)
+
+
+def event_from_history_item(item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """将观看历史接口返回的条目转换为观看记录行，非视频条目返回None"""
+    history = item.get('history') or {}
+    bvid = history.get('bvid') or item.get('bvid')
+    view_at = item.get('view_at')
+    if not bvid or not view_at:
+        return None
+    return {
+        "bvid": bvid,
+        "view_at": int(view_at),
+        "title": (item.get('title') or '')[:255],
+        "tname": item.get('tag_name') or item.get('tname') or '',
+        "duration": int(item.get('duration') or 0),
+        "progress": int(item.get('progress') or 0)
+    }
+
+
+def history_item_from_event(row: Dict[str, Any]) -> Dict[str, Any]:
+    """将观看记录行还原为与观看历史接口一致的条目结构，供机器学习模块使用"""
+    return {
+        "history": {"bvid": row["bvid"]},
+        "bvid": row["bvid"],
+        "title": row["title"],
+        "tag_name": row["tname"],
+        "tname": row["tname"],
+        "duration": row["duration"],
+        "progress": row["progress"],
+        "view_at": row["view_at"]
+    }
+
+
+class WatchEventStore:
+    """观看记录存储：每次观看一行，按用户与视频两个方向建立索引"""
+
+    def __init__(self, engine):
+        """
+        初始化观看记录存储
+
+        Args:
+            engine: SQLAlchemy数据库引擎
+        """
+        self.engine = engine
+        self._init_table()
+
+    def _init_table(self):
+        """初始化观看记录表"""
+        with self.engine.begin() as conn:
+            # 主键(user_mid, view_at, bvid)服务“用户最近的观看记录”，
+            # idx_bvid_user服务“看过某视频的用户”
+            conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS user_watch_events (
+                user_mid VARCHAR(20) NOT NULL,
+                view_at INT UNSIGNED NOT NULL,
+                bvid VARCHAR(20) NOT NULL,
+                title VARCHAR(255) NOT NULL DEFAULT '',
+                tname VARCHAR(50) NOT NULL DEFAULT '',
+                duration INT UNSIGNED NOT NULL DEFAULT 0,
+                progress INT NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_mid, view_at, bvid),
+                INDEX idx_bvid_user (bvid, user_mid)
+            )
+            """))
+
+    def add_events(self, user_mid: str, items: Iterable[Dict[str, Any]], conn=None) -> int:
+        """
+        写入观看历史条目，重复同步的条目只更新观看进度
+
+        Args:
+            user_mid: 用户标识
+            items: 观看历史接口返回的条目
+            conn: 可选的连接，传入时由调用方管理事务
+
+        Returns:
+            int: 有效条目数
+        """
+        rows = []
+        for item in items:
+            event = event_from_history_item(item)
+            if event is not None:
+                rows.append({"user_mid": user_mid, **event})
+        if not rows:
+            return 0
+
+        statement = text("""
+        INSERT INTO user_watch_events (user_mid, view_at, bvid, title, tname, duration, progress)
+        VALUES (:user_mid, :view_at, :bvid, :title, :tname, :duration, :progress)
+        ON DUPLICATE KEY UPDATE progress = VALUES(progress)
+        """)
+        if conn is not None:
+            conn.execute(statement, rows)
+        else:
+            with self.engine.begin() as conn:
+                conn.execute(statement, rows)
+        return len(rows)
+
+    def recent(self, user_mid: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """获取用户最近的观看记录（按观看时间倒序，结构与观看历史接口一致）"""
+        sql = """
+        SELECT bvid, view_at, title, tname, duration, progress
+        FROM user_watch_events
+        WHERE user_mid = :user_mid
+        ORDER BY view_at DESC
+        """
+        params = {"user_mid": user_mid}
+        if limit:
+            sql += " LIMIT :limit"
+            params["limit"] = limit
+
+        with self.engine.connect() as conn:
+            rows = conn.execute(text(sql), params).fetchall()
+        return [history_item_from_event(dict(row._mapping)) for row in rows]
+
+    def summary(self, user_mid: str, top_categories: int = 10) -> Optional[Dict[str, Any]]:
+        """用户观看偏好汇总：总数、分区分布与观看时段分布，没有记录时返回None"""
+        with self.engine.connect() as conn:
+            total = conn.execute(text("""
+            SELECT COUNT(*) FROM user_watch_events WHERE user_mid = :user_mid
+            """), {"user_mid": user_mid}).scalar()
+            if not total:
+                return None
+
+            categories = conn.execute(text("""
+            SELECT tname, COUNT(*) AS cnt
+            FROM user_watch_events
+            WHERE user_mid = :user_mid AND tname <> ''
+            GROUP BY tname
+            ORDER BY cnt DESC
+            LIMIT :limit
+            """), {"user_mid": user_mid, "limit": top_categories}).fetchall()
+
+            hours = conn.execute(text("""
+            SELECT HOUR(FROM_UNIXTIME(view_at)) AS hour, COUNT(*) AS cnt
+            FROM user_watch_events
+            WHERE user_mid = :user_mid
+            GROUP BY hour
+            """), {"user_mid": user_mid}).fetchall()
+
+        return {
+            "total": int(total),
+            "categories": {row.tname: int(row.cnt) for row in categories},
+            "hours": {int(row.hour): int(row.cnt) for row in hours}
+        }
+
+    def users_who_watched(self, bvid: str) -> List[str]:
+        """看过某视频的用户"""
+        with self.engine.connect() as conn:
+            rows = conn.execute(text("""
+            SELECT DISTINCT user_mid FROM user_watch_events WHERE bvid = :bvid
+            """), {"bvid": bvid}).fetchall()
+        return [row.user_mid for row in rows]
+
+    def latest_view_at(self, user_mid: str) -> Optional[int]:
+        """用户最新一条观看记录的时间"""
+        with self.engine.connect() as conn:
+            value = conn.execute(text("""
+            SELECT MAX(view_at) FROM user_watch_events WHERE user_mid = :user_mid
+            """), {"user_mid": user_mid}).scalar()
+        return int(value) if value else None
+
+
+class UserHistoryRepository:
+    """批量加载用户及其观看记录，供机器学习接口使用；查询次数与用户数无关"""
+
+    def __init__(self, engine, history_limit: Optional[int] = None):
+        """
+        初始化用户数据仓库
+
+        Args:
+            engine: SQLAlchemy数据库引擎
+            history_limit: 每个用户最多读取的最近观看记录条数
+        """
+        self.engine = engine
+        self.history_limit = history_limit
+
+    def load_users(self, user_ids: Optional[List[int]] = None,
+                   include_info: bool = False) -> List[Dict[str, Any]]:
+        """
+        加载已绑定B站账号的用户及其观看记录
+
+        Args:
+            user_ids: 只加载指定用户，默认全部
+            include_info: 是否合并user_data中最新的user_info
+
+        Returns:
+            List: [{'user_info': {...}, 'watch_history': [...]}]，按用户ID排序
+        """
+        if user_ids is not None and not user_ids:
+            return []
+
+        with self.engine.connect() as conn:
+            user_filter = "AND u.id IN :user_ids" if user_ids is not None else ""
+            users_query = text(f"""
+            SELECT u.id, u.username, u.bilibili_mid, u.bilibili_name
+            FROM users u
+            WHERE u.bilibili_mid IS NOT NULL {user_filter}
+            ORDER BY u.id
+            """)
+            params = {}
+            if user_ids is not None:
+                users_query = users_query.bindparams(bindparam("user_ids", expanding=True))
+                params["user_ids"] = list(user_ids)
+
+            users = {}
+            for row in conn.execute(users_query, params):
+                users[str(row.id)] = {
+                    'user_info': {
+                        'user_id': row.id,
+                        'username': row.username,
+                        'bilibili_mid': row.bilibili_mid,
+                        'bilibili_name': row.bilibili_name
+                    },
+                    'watch_history': []
+                }
+            if not users:
+                return []
+
+            user_mids = list(users)
+            for user_mid, item in self._stream_history(conn, user_mids):
+                users[user_mid]['watch_history'].append(item)
+
+            if include_info:
+                for user_mid, info in self._stream_user_info(conn, user_mids):
+                    user = users[user_mid]
+                    user['user_info'] = {**user['user_info'], **info}
+
+        return list(users.values())
+
+    def _stream_history(self, conn, user_mids: List[str]):
+        """单条查询流式读取所有用户最近的观看记录"""
+        rank_filter = "WHERE rn <= :limit" if self.history_limit else ""
+        query = text(f"""
+        SELECT user_mid, bvid, view_at, title, tname, duration, progress
+        FROM (
+            SELECT e.*, ROW_NUMBER() OVER (PARTITION BY e.user_mid ORDER BY e.view_at DESC) AS rn
+            FROM user_watch_events e
+            WHERE e.user_mid IN :user_mids
+        ) ranked
+        {rank_filter}
+        ORDER BY user_mid, view_at DESC
+        """).bindparams(bindparam("user_mids", expanding=True))
+        params = {"user_mids": user_mids}
+        if self.history_limit:
+            params["limit"] = self.history_limit
+
+        result = conn.execution_options(stream_results=True, yield_per=1000).execute(query, params)
+        for row in result:
+            yield row.user_mid, history_item_from_event(dict(row._mapping))
+
+    def _stream_user_info(self, conn, user_mids: List[str]):
+        """单条查询流式读取所有用户最新的user_info，逐行解析JSON"""
+        query = text("""
+        SELECT d.user_mid, d.data_content
+        FROM user_data d
+        JOIN (
+            SELECT user_mid, MAX(id) AS id
+            FROM user_data
+            WHERE data_type = 'user_info' AND user_mid IN :user_mids
+            GROUP BY user_mid
+        ) latest ON latest.id = d.id
+        """).bindparams(bindparam("user_mids", expanding=True))
+
+        result = conn.execution_options(stream_results=True, yield_per=1000).execute(
+            query, {"user_mids": user_mids}
+        )
+        for row in result:
+            try:
+                yield row.user_mid, json.loads(row.data_content) or {}
+            except (TypeError, ValueError) as e:
+                logger.error(f"用户 {row.user_mid} 的user_info无法解析: {str(e)}")
+
+
+class SyncCursorStore:
+    """同步游标存储：记录每个用户每类数据已同步到的最新位置"""
+
+    def __init__(self, engine):
+        """
+        初始化游标存储
+
+        Args:
+            engine: SQLAlchemy数据库引擎
+        """
+        self.engine = engine
+        self._init_table()
+
+    def _init_table(self):
+        """初始化游标表"""
+        with self.engine.begin() as conn:
+            conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS user_sync_cursors (
+                user_mid VARCHAR(20) NOT NULL,
+                data_type VARCHAR(50) NOT NULL,
+                cursor_view_at BIGINT NOT NULL DEFAULT 0,
+                cursor_max BIGINT NOT NULL DEFAULT 0,
+                updated_at DATETIME NOT NULL,
+                PRIMARY KEY (user_mid, data_type)
+            )
+            """))
+
+    def get(self, user_mid: str, data_type: str) -> Optional[Dict[str, int]]:
+        """获取游标，不存在时返回None"""
+        with self.engine.connect() as conn:
+            row = conn.execute(text("""
+            SELECT cursor_view_at, cursor_max
+            FROM user_sync_cursors
+            WHERE user_mid = :user_mid AND data_type = :data_type
+            """), {"user_mid": user_mid, "data_type": data_type}).fetchone()
+
+        if not row:
+            return None
+        return {"view_at": int(row.cursor_view_at), "max": int(row.cursor_max)}
+
+    def save(self, user_mid: str, data_type: str, view_at: int, max_id: int = 0):
+        """保存游标"""
+        with self.engine.begin() as conn:
+            conn.execute(text("""
+            INSERT INTO user_sync_cursors (user_mid, data_type, cursor_view_at, cursor_max, updated_at)
+            VALUES (:user_mid, :data_type, :view_at, :max_id, :updated_at)
+            ON DUPLICATE KEY UPDATE
+                cursor_view_at = VALUES(cursor_view_at),
+                cursor_max = VALUES(cursor_max),
+                updated_at = VALUES(updated_at)
+            """), {
+                "user_mid": user_mid,
+                "data_type": data_type,
+                "view_at": view_at,
+                "max_id": max_id,
+                "updated_at": datetime.now()
+            })
+
+
+def sync_watch_history(event_store: WatchEventStore, crawler, cursor_store: SyncCursorStore, user_mid: str,
+                       full_backfill: bool = False, backfill_pages: int = 10,
+                       incremental_pages: int = 5) -> Dict[str, Any]:
+    """
+    同步观看历史
+
+    已有游标时只抓取比游标更新的条目，直到翻到不晚于游标的记录为止；incremental_pages页内没有接上游标时
+    改为按backfill_pages页继续抓取，仍然接不上则保留原游标，避免跳过中间的记录。
+    没有游标或要求全量回填时抓取backfill_pages页。抓取结果写入观看记录表，重复条目只更新进度。
+
+    Args:
+        event_store: 观看记录存储
+        crawler: BiliBiliUserCrawler实例
+        cursor_store: 同步游标存储
+        user_mid: 用户标识
+        full_backfill: 是否全量回填
+        backfill_pages: 全量回填的页数
+        incremental_pages: 增量同步的最大页数
+
+    Returns:
+        Dict: 同步结果，complete为False表示与上次同步之间仍有未取到的记录
+    """
+    cursor = None if full_backfill else cursor_store.get(user_mid, 'watch_history')
+
+    if cursor is None:
+        mode = 'backfill'
+        new_items, complete = crawler.fetch_watch_history(max_pages=backfill_pages)
+    else:
+        mode = 'incremental'
+        new_items, complete = crawler.fetch_watch_history(
+            max_pages=incremental_pages, since_view_at=cursor['view_at'])
+        if not complete and backfill_pages > incremental_pages:
+            mode = 'incremental_backfill'
+            new_items, complete = crawler.fetch_watch_history(
+                max_pages=backfill_pages, since_view_at=cursor['view_at'])
+
+    written = event_store.add_events(user_mid, new_items)
+    # 全量回填时游标之前没有记录可以遗漏；增量同步只有接上旧游标后才能前移
+    if new_items and (cursor is None or complete):
+        newest = max(new_items, key=lambda item: item.get('view_at', 0))
+        if cursor is None or newest.get('view_at', 0) > cursor['view_at']:
+            cursor_store.save(
+                user_mid, 'watch_history',
+                view_at=int(newest.get('view_at') or 0),
+                max_id=int((newest.get('history') or {}).get('oid') or 0)
+            )
+    elif not complete:
+        logger.warning(f"用户 {user_mid} 观看历史未能接上同步游标，保留原游标等待下次同步")
+
+    logger.info(f"用户 {user_mid} 观看历史同步完成({mode}): 新增{written}条")
+    return {"mode": mode, "new_items": written, "complete": complete}
+
+
+def save_watch_history(event_store: WatchEventStore, crawler, user_mid: str,
+                       history: List[Dict[str, Any]]) -> int:
+    """
+    保存一次完整抓取的观看历史：写入观看记录表（用户分析从该表读取），同时保留user_data中的原始JSON
+
+    Args:
+        event_store: 观看记录存储
+        crawler: BiliBiliUserCrawler实例
+        user_mid: 用户标识（与用户分析接口的user_mid一致）
+        history: 观看历史接口返回的条目
+
+    Returns:
+        int: 写入观看记录表的有效条目数
+    """
+    crawler.save_user_data(user_mid, 'watch_history', history)
+    return event_store.add_events(user_mid, history)
+
+
+def migrate_watch_history_blobs(engine, event_store: WatchEventStore, cursor_store: SyncCursorStore,
+                                drop_blobs: bool = False) -> Dict[str, int]:
+    """
+    一次性迁移：将user_data中每个用户最新的观看历史JSON拆分写入观看记录表，并初始化同步游标
+
+    Args:
+        engine: SQLAlchemy数据库引擎
+        event_store: 观看记录存储
+        cursor_store: 同步游标存储
+        drop_blobs: 迁移完成后是否删除user_data中的观看历史JSON
+
+    Returns:
+        Dict: 迁移统计
+    """
+    with engine.connect() as conn:
+        user_mids = [row[0] for row in conn.execute(text("""
+        SELECT DISTINCT user_mid FROM user_data WHERE data_type = 'watch_history'
+        """)).fetchall()]
+
+    stats = {"users": 0, "events": 0}
+    for user_mid in user_mids:
+        with engine.connect() as conn:
+            row = conn.execute(text("""
+            SELECT data_content
+            FROM user_data
+            WHERE user_mid = :user_mid AND data_type = 'watch_history'
+            ORDER BY created_at DESC
+            LIMIT 1
+            """), {"user_mid": user_mid}).fetchone()
+        if not row:
+            continue
+
+        try:
+            history = json.loads(row[0]) or []
+        except (TypeError, ValueError) as e:
+            logger.error(f"用户 {user_mid} 的观看历史无法解析: {str(e)}")
+            continue
+
+        with engine.begin() as conn:
+            stats["events"] += event_store.add_events(user_mid, history, conn=conn)
+            if drop_blobs:
+                conn.execute(text("""
+                DELETE FROM user_data WHERE user_mid = :user_mid AND data_type = 'watch_history'
+                """), {"user_mid": user_mid})
+
+        latest = event_store.latest_view_at(user_mid)
+        if latest and cursor_store.get(user_mid, 'watch_history') is None:
+            cursor_store.save(user_mid, 'watch_history', view_at=latest)
+        stats["users"] += 1
+
+    logger.info(f"观看历史迁移完成: {stats}")
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="用户观看历史维护")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrate_parser = subparsers.add_parser("migrate", help="将user_data中的观看历史JSON迁移到观看记录表")
+    migrate_parser.add_argument("--drop-blobs", action="store_true", help="迁移后删除原JSON数据")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    # 延迟导入：复用主服务的数据库引擎与表初始化
+    from main import engine, sync_cursor_store, watch_event_store
+
+    if args.command == "migrate":
+        print(migrate_watch_history_blobs(engine, watch_event_store, sync_cursor_store, args.drop_blobs))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,408 @@
+"""
+视频数据写入模块
+提供批量upsert、带缓冲的视频写入器与统计快照存储
+"""
+
+import base64
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import bindparam, text
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+VIDEO_UPSERT_SQL = text("""
+INSERT INTO videos (
+    bvid, title, aid, author, mid, view, danmaku, reply,
+    favorite, coin, share, `like`, duration, pubdate, tid,
+    tname, copyright, tags, `desc`, ctime, collected_at, updated_at
+) VALUES (
+    :bvid, :title, :aid, :author, :mid, :view,
+    :danmaku, :reply, :favorite, :coin, :share,
+    :like, :duration, :pubdate, :tid, :tname,
+    :copyright, :tags, :desc, :ctime, :collected_at, :updated_at
+)
+ON DUPLICATE KEY UPDATE
+    title=VALUES(title), view=VALUES(view), danmaku=VALUES(danmaku),
+    reply=VALUES(reply), favorite=VALUES(favorite), coin=VALUES(coin),
+    share=VALUES(share), `like`=VALUES(`like`), tags=VALUES(tags),
+    updated_at=VALUES(updated_at)
+""")
+
+
+def upsert_videos(conn, rows: List[Dict[str, Any]]) -> int:
+    """
+    在给定连接上批量upsert视频数据
+
+    传入多行参数时由pymysql的executemany改写为单条多行INSERT语句。
+
+    Args:
+        conn: SQLAlchemy连接（由调用方管理事务）
+        rows: 视频数据列表
+
+    Returns:
+        int: 写入行数
+    """
+    if not rows:
+        return 0
+    conn.execute(VIDEO_UPSERT_SQL, rows)
+    return len(rows)
+
+
+VIDEO_LIST_COLUMNS = """
+    bvid, title, author, view, danmaku, reply,
+    favorite, coin, share, `like`, pubdate, tname, collected_at
+"""
+
+
+def encode_video_cursor(collected_at: datetime, bvid: str) -> str:
+    """将列表最后一行的(collected_at, bvid)编码为不透明的翻页游标"""
+    payload = json.dumps({"c": collected_at.isoformat(), "b": bvid}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_video_cursor(cursor: str) -> Tuple[datetime, str]:
+    """解析翻页游标，格式错误时抛出ValueError"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(payload["c"]), str(payload["b"])
+    except Exception as e:
+        raise ValueError(f"无效的翻页游标: {cursor}") from e
+
+
+def _video_list_query(page_size: int, cursor: Optional[str]):
+    """视频列表一页的查询语句与参数，多取一行用于判断是否还有下一页"""
+    params: Dict[str, Any] = {"limit": page_size + 1}
+    where = "WHERE collected_at IS NOT NULL"
+    if cursor:
+        params["collected_at"], params["bvid"] = decode_video_cursor(cursor)
+        where = """
+        WHERE collected_at < :collected_at
+           OR (collected_at = :collected_at AND bvid < :bvid)
+        """
+
+    return text(f"""
+    SELECT {VIDEO_LIST_COLUMNS}
+    FROM videos
+    {where}
+    ORDER BY collected_at DESC, bvid DESC
+    LIMIT :limit
+    """), params
+
+
+def _video_page(rows: List[Dict[str, Any]], page_size: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_video_cursor(rows[-1]["collected_at"], rows[-1]["bvid"])
+    return rows, next_cursor
+
+
+def list_videos(conn, page_size: int, cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    按(collected_at, bvid)倒序的游标分页，走idx_collected_bvid索引，翻页深度不影响耗时
+
+    collected_at为NULL的行无法编码为游标，不参与分页（建表初始化时会为这类行补上采集时间）。
+
+    Args:
+        conn: SQLAlchemy连接
+        page_size: 每页条数
+        cursor: 上一页返回的游标，为空时从第一页开始
+
+    Returns:
+        Tuple: (当前页数据, 下一页游标；没有下一页时为None)
+    """
+    statement, params = _video_list_query(page_size, cursor)
+    return _video_page([dict(row._mapping) for row in conn.execute(statement, params)], page_size)
+
+
+async def list_videos_async(conn, page_size: int,
+                            cursor: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    在异步连接（aiomysql）上执行的list_videos，查询期间不占用IO线程
+
+    Args:
+        conn: SQLAlchemy异步连接
+        page_size: 每页条数
+        cursor: 上一页返回的游标，为空时从第一页开始
+
+    Returns:
+        Tuple: (当前页数据, 下一页游标；没有下一页时为None)
+    """
+    statement, params = _video_list_query(page_size, cursor)
+    result = await conn.execute(statement, params)
+    return _video_page([dict(row._mapping) for row in result], page_size)
+
+
+class BufferedVideoSink:
+    """带缓冲的视频写入器：按数量或时间阈值批量落库，写入失败的批次重试后放回缓冲区"""
+
+    def __init__(self, engine, batch_size: int = 100, flush_interval: float = 5.0,
+                 hooks: Optional[Iterable[Callable[[Any, List[Dict[str, Any]]], None]]] = None,
+                 pre_hooks: Optional[Iterable[Callable[[Any, List[Dict[str, Any]]], None]]] = None,
+                 max_retries: int = 2, retry_backoff: float = 0.5, max_buffer: Optional[int] = None,
+                 isolation_level: Optional[str] = None):
+        """
+        初始化写入器
+
+        Args:
+            engine: SQLAlchemy数据库引擎
+            batch_size: 缓冲达到该行数时触发写入
+            flush_interval: 距上次写入超过该秒数时触发写入（后台定时检查，缓冲区空闲时也会按时落库）
+            hooks: 写入钩子列表，签名为hook(conn, rows)，在upsert之后、同一事务中执行
+            pre_hooks: 写入前钩子列表，签名同上，在upsert之前、同一事务中执行（可读取旧数据）
+            max_retries: 单次写入失败后的重试次数（死锁、连接断开等瞬时错误）
+            retry_backoff: 首次重试前等待的秒数，之后每次翻倍
+            max_buffer: 写入持续失败时缓冲区最多保留的行数，默认batch_size的10倍，超出部分计为失败
+            isolation_level: 写入事务的隔离级别，如READ COMMITTED，默认使用连接的隔离级别
+        """
+        self.engine = engine
+        self._write_engine = engine.execution_options(isolation_level=isolation_level) if isolation_level else engine
+        self.hooks = list(hooks or [])
+        self.pre_hooks = list(pre_hooks or [])
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = flush_interval
+        self.max_retries = max(0, int(max_retries))
+        self.retry_backoff = retry_backoff
+        self.max_buffer = max_buffer or self.batch_size * 10
+        self.total_written = 0
+        self.total_failed = 0
+        self._buffer: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._closed = threading.Event()
+        self._timer: Optional[threading.Thread] = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _ensure_timer(self):
+        """首次写入时启动定时落库线程"""
+        if self._timer is None and self.flush_interval:
+            self._timer = threading.Thread(target=self._flush_periodically, name="video-sink-flush", daemon=True)
+            self._timer.start()
+
+    def _flush_periodically(self):
+        while not self._closed.wait(self.flush_interval):
+            with self._lock:
+                due = self._buffer and time.monotonic() - self._last_flush >= self.flush_interval
+            if due:
+                self.flush()
+
+    def add(self, video_data: Dict[str, Any]):
+        """加入一条视频数据，必要时触发批量写入"""
+        with self._lock:
+            self._ensure_timer()
+            self._buffer.append(video_data)
+            metrics.SINK_BUFFER_DEPTH.inc()
+            should_flush = (
+                len(self._buffer) >= self.batch_size
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+
+        if should_flush:
+            self.flush()
+
+    def _write(self, rows: List[Dict[str, Any]]) -> int:
+        with self._write_engine.begin() as conn:
+            for hook in self.pre_hooks:
+                hook(conn, rows)
+            written = upsert_videos(conn, rows)
+            for hook in self.hooks:
+                hook(conn, rows)
+        return written
+
+    def flush(self) -> int:
+        """将缓冲区中的数据写入数据库；重试后仍失败的批次放回缓冲区，下次写入时再试"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._buffer = self._buffer, []
+                self._last_flush = time.monotonic()
+
+            if not pending:
+                return 0
+
+            # 同一批次内重复的bvid只保留最后一次采集结果；按bvid排序，并发写入按相同顺序加行锁
+            latest = {row["bvid"]: row for row in pending}
+            rows = [latest[bvid] for bvid in sorted(latest)]
+            metrics.SINK_BUFFER_DEPTH.dec(len(pending) - len(rows))
+
+            for attempt in range(self.max_retries + 1):
+                try:
+                    written = self._write(rows)
+                    break
+                except Exception as e:
+                    metrics.record_error(e)
+                    logger.error(f"批量写入{len(rows)}条视频失败(第{attempt + 1}次): {str(e)}")
+                    if attempt < self.max_retries:
+                        time.sleep(self.retry_backoff * (2 ** attempt))
+            else:
+                self._requeue(rows)
+                return 0
+
+            metrics.SINK_BUFFER_DEPTH.dec(len(rows))
+            self.total_written += written
+            metrics.DB_UPSERTED_ROWS.inc(written)
+            logger.info(f"批量写入视频: {written}条")
+            return written
+
+    def _requeue(self, rows: List[Dict[str, Any]]):
+        """失败的批次放回缓冲区头部；超过max_buffer的最旧数据放弃并计为失败"""
+        with self._lock:
+            buffer = rows + self._buffer
+            dropped = max(0, len(buffer) - self.max_buffer)
+            self._buffer = buffer[dropped:]
+        if dropped:
+            self._drop(dropped)
+
+    def _drop(self, count: int):
+        self.total_failed += count
+        metrics.SINK_BUFFER_DEPTH.dec(count)
+        metrics.DB_UPSERT_FAILED_ROWS.inc(count)
+        logger.error(f"放弃写入{count}条视频")
+
+    def close(self) -> int:
+        """停止定时落库并写入剩余数据，仍无法写入的数据计为失败"""
+        self._closed.set()
+        if self._timer is not None:
+            self._timer.join()
+        written = self.flush()
+        with self._lock:
+            remaining, self._buffer = len(self._buffer), []
+        if remaining:
+            self._drop(remaining)
+        return written
+
+
+class VideoSnapshotStore:
+    """视频统计快照存储：只追加，每次采集记录一行紧凑的统计数据"""
+
+    def __init__(self, engine):
+        """
+        初始化快照存储
+
+        Args:
+            engine: SQLAlchemy数据库引擎
+        """
+        self.engine = engine
+        self._video_ids: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._init_tables()
+
+    def _init_tables(self):
+        """初始化快照相关表"""
+        with self.engine.begin() as conn:
+            # bvid到整数代理键的映射，快照表只存4字节的video_id
+            conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS video_keys (
+                id INT UNSIGNED AUTO_INCREMENT PRIMARY KEY,
+                bvid VARCHAR(20) NOT NULL,
+                UNIQUE KEY uk_bvid (bvid)
+            )
+            """))
+
+            # 主键(video_id, snapshot_at)服务“某视频最近N次快照”，
+            # idx_snapshot_at服务“时间窗口内的全部快照”
+            conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS video_stat_snapshots (
+                video_id INT UNSIGNED NOT NULL,
+                snapshot_at DATETIME NOT NULL,
+                view INT UNSIGNED NOT NULL DEFAULT 0,
+                danmaku INT UNSIGNED NOT NULL DEFAULT 0,
+                reply INT UNSIGNED NOT NULL DEFAULT 0,
+                favorite INT UNSIGNED NOT NULL DEFAULT 0,
+                coin INT UNSIGNED NOT NULL DEFAULT 0,
+                share INT UNSIGNED NOT NULL DEFAULT 0,
+                `like` INT UNSIGNED NOT NULL DEFAULT 0,
+                PRIMARY KEY (video_id, snapshot_at),
+                INDEX idx_snapshot_at (snapshot_at)
+            )
+            """))
+
+    def _resolve_video_ids(self, bvids: List[str]) -> Dict[str, int]:
+        """获取bvid对应的代理键，不存在的先批量创建"""
+        with self._lock:
+            missing = [bvid for bvid in bvids if bvid not in self._video_ids]
+
+        if missing:
+            # 代理键在独立事务中创建，外层写入回滚时内存中的映射依然有效
+            with self.engine.begin() as conn:
+                conn.execute(text("INSERT IGNORE INTO video_keys (bvid) VALUES (:bvid)"),
+                             [{"bvid": bvid} for bvid in missing])
+                rows = conn.execute(
+                    text("SELECT id, bvid FROM video_keys WHERE bvid IN :bvids")
+                    .bindparams(bindparam("bvids", expanding=True)),
+                    {"bvids": missing}
+                ).fetchall()
+            with self._lock:
+                for row in rows:
+                    self._video_ids[row.bvid] = row.id
+
+        with self._lock:
+            return {bvid: self._video_ids[bvid] for bvid in bvids if bvid in self._video_ids}
+
+    def write(self, conn, rows: List[Dict[str, Any]]):
+        """追加一批快照，可直接作为BufferedVideoSink的写入钩子"""
+        if not rows:
+            return
+
+        video_ids = self._resolve_video_ids([row["bvid"] for row in rows])
+        snapshot_at = datetime.now().replace(microsecond=0)
+        snapshots = [
+            {
+                "video_id": video_ids[row["bvid"]],
+                "snapshot_at": snapshot_at,
+                "view": row.get("view") or 0,
+                "danmaku": row.get("danmaku") or 0,
+                "reply": row.get("reply") or 0,
+                "favorite": row.get("favorite") or 0,
+                "coin": row.get("coin") or 0,
+                "share": row.get("share") or 0,
+                "like": row.get("like") or 0
+            }
+            for row in rows if row["bvid"] in video_ids
+        ]
+
+        conn.execute(text("""
+        INSERT IGNORE INTO video_stat_snapshots (
+            video_id, snapshot_at, view, danmaku, reply, favorite, coin, share, `like`
+        ) VALUES (
+            :video_id, :snapshot_at, :view, :danmaku, :reply, :favorite, :coin, :share, :like
+        )
+        """), snapshots)
+
+    def latest(self, bvid: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """获取某视频最近N次快照（按时间倒序）"""
+        with self.engine.connect() as conn:
+            rows = conn.execute(text("""
+            SELECT s.snapshot_at, s.view, s.danmaku, s.reply, s.favorite, s.coin, s.share, s.`like`
+            FROM video_keys k
+            JOIN video_stat_snapshots s ON s.video_id = k.id
+            WHERE k.bvid = :bvid
+            ORDER BY s.snapshot_at DESC
+            LIMIT :limit
+            """), {"bvid": bvid, "limit": limit}).fetchall()
+        return [dict(row._mapping) for row in rows]
+
+    def between(self, start: datetime, end: datetime) -> List[Dict[str, Any]]:
+        """获取时间窗口[start, end)内的全部快照"""
+        with self.engine.connect() as conn:
+            rows = conn.execute(text("""
+            SELECT k.bvid, s.snapshot_at, s.view, s.danmaku, s.reply, s.favorite, s.coin, s.share, s.`like`
+            FROM video_stat_snapshots s
+            JOIN video_keys k ON k.id = s.video_id
+            WHERE s.snapshot_at >= :start AND s.snapshot_at < :end
+            ORDER BY s.snapshot_at
+            """), {"start": start, "end": end}).fetchall()
+        return [dict(row._mapping) for row in rows]
@@ -40,7 +40,7 @@ import {
   RadialBar,
   Legend
 } from 'recharts';
-import { videoAPI } from '../services/api';
+import { dashboardAPI } from '../services/api';
 import './DataDashboard.css';
 
 const { Title, Text } = Typography;
@@ -163,88 +163,78 @@ const DataDashboard = () => {
     },
     activities: []
   });
-  const [refreshInterval, setRefreshInterval] = useState(null);
+  const [lastUpdated, setLastUpdated] = useState(null);
+  // 最近一次收到的完整汇总，增量推送合并到它上面
+  const summaryRef = useRef(null);
 
-  // 获取仪表板数据
-  const fetchDashboardData = async () => {
-    try {
-      const [analysisData, videosData] = await Promise.all([
-        videoAPI.getAnalysis(),
-        videoAPI.getVideos(null, null, 20)
-      ]);
+  // 把后端汇总转换为大屏数据
+  const applySummary = (summary) => {
+    summaryRef.current = summary;
 
-      // 处理指标数据
-      const metrics = {
-        totalVideos: analysisData.total_videos,
-        avgViews: analysisData.avg_views,
-        interactionRate: (analysisData.avg_interaction_rate * 100).toFixed(1),
-        topTags: analysisData.top_tags.slice(0, 10)
-      };
-
-      // 处理图表数据
-      const hourlyData = analysisData.best_publish_hours?.map(hour => ({
-        hour: `${hour}:00`,
-        videos: Math.floor(Math.random() * 50) + 10,
-        views: Math.floor(Math.random() * 100000) + 50000
-      })) || [];
+    const metrics = {
+      totalVideos: summary.metrics.total_videos,
+      avgViews: summary.metrics.avg_views,
+      interactionRate: (summary.metrics.interaction_rate * 100).toFixed(1),
+      topTags: summary.top_tags.slice(0, 10)
+    };
 
-      const categoryData = analysisData.top_tags.slice(0, 6).map(([name, value]) => ({
-        name,
-        value,
-        fill: COLORS[analysisData.top_tags.indexOf([name, value]) % COLORS.length]
-      }));
+    const trendData = summary.trend.map(point => ({
+      time: new Date(point.hour).getHours() + ':00',
+      views: point.views,
+      interactions: point.interactions,
+      newVideos: point.new_videos
+    }));
 
-      // 模拟实时活动数据
-      const activities = videosData.slice(0, 5).map(video => ({
-        title: video.title,
-        time: new Date(video.pubdate).toLocaleString(),
-        views: video.view,
-        likes: video.like
-      }));
+    const hourlyData = trendData.map(point => ({
+      hour: point.time,
+      videos: point.newVideos,
+      views: point.views
+    }));
 
-      setDashboardData({
-        metrics,
-        charts: {
-          hourlyData,
-          categoryData,
-          trendData: generateTrendData()
-        },
-        activities
-      });
+    const categoryData = summary.categories.slice(0, 6).map(([name, value], index) => ({
+      name,
+      value,
+      fill: COLORS[index % COLORS.length]
+    }));
 
-    } catch (error) {
-      console.error('获取仪表板数据失败:', error);
-    } finally {
-      setLoading(false);
-    }
-  };
+    const activities = summary.recent_videos.slice(0, 5).map(video => ({
+      title: video.title,
+      time: new Date(video.pubdate).toLocaleString(),
+      views: video.view,
+      likes: video.like
+    }));
 
-  // 生成趋势数据
-  const generateTrendData = () => {
-    const data = [];
-    const now = new Date();
-    for (let i = 23; i >= 0; i--) {
-      const time = new Date(now.getTime() - i * 60 * 60 * 1000);
-      data.push({
-        time: time.getHours() + ':00',
-        views: Math.floor(Math.random() * 10000) + 5000,
-        interactions: Math.floor(Math.random() * 1000) + 500,
-        newVideos: Math.floor(Math.random() * 20) + 5
-      });
-    }
-    return data;
+    setDashboardData({
+      metrics,
+      charts: {
+        hourlyData,
+        categoryData,
+        trendData
+      },
+      activities
+    });
+    setLastUpdated(new Date(summary.updated_at));
+    setLoading(false);
   };
 
   useEffect(() => {
-    fetchDashboardData();
-    
-    // 设置自动刷新
-    const interval = setInterval(fetchDashboardData, 30000); // 30秒刷新一次
-    setRefreshInterval(interval);
-
-    return () => {
-      if (interval) clearInterval(interval);
+    // 订阅服务端推送：连接后先收到完整汇总，之后只在爬虫写入新数据时收到变化的字段，无需定时轮询
+    const source = new EventSource(dashboardAPI.getStreamUrl());
+    source.addEventListener('summary', (event) => {
+      applySummary(JSON.parse(event.data));
+    });
+    source.addEventListener('delta', (event) => {
+      if (summaryRef.current) {
+        applySummary({ ...summaryRef.current, ...JSON.parse(event.data) });
+      }
+    });
+    source.onerror = (error) => {
+      // EventSource会自动重连，重连后重新收到完整汇总
+      console.error('数据大屏推送连接中断:', error);
+      setLoading(false);
     };
+
+    return () => source.close();
   }, []);
 
   if (loading) {
@@ -264,7 +254,7 @@ const DataDashboard = () => {
           B站数据分析实时监控中心
         </Title>
         <Text style={{ color: '#fff', opacity: 0.8 }}>
-          实时更新 • 最后更新: {new Date().toLocaleString()}
+          实时更新 • 最后更新: {lastUpdated ? lastUpdated.toLocaleString() : '-'}
         </Text>
       </div>
 
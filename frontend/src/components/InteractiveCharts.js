@@ -45,7 +45,7 @@ import {
   Brush,
   ReferenceLine
 } from 'recharts';
-import { videoAPI } from '../services/api';
+import { dashboardAPI } from '../services/api';
 import './InteractiveCharts.css';
 
 const { Title, Text } = Typography;
@@ -371,22 +371,21 @@ const InteractiveCharts = () => {
   // 获取图表数据
   const fetchChartsData = async () => {
     try {
-      const [analysisData, videosData] = await Promise.all([
-        videoAPI.getAnalysis(),
-        videoAPI.getVideos(null, null, 50)
-      ]);
+      // 大屏汇总由服务端在内存中维护，一次请求即可拿到标签、互动率与最新视频
+      const summary = await dashboardAPI.getSummary();
+      const videosData = summary.recent_videos;
 
       console.log('视频数据:', videosData.slice(0, 5)); // 调试信息
-      console.log('分析数据:', analysisData); // 调试信息
+      console.log('汇总数据:', summary.metrics); // 调试信息
 
       // 生成时间序列数据
       const timeSeriesData = generateTimeSeriesData(videosData);
       
       // 生成分区数据
-      const categoryData = analysisData.top_tags.slice(0, 8).map(([name, value]) => ({
+      const categoryData = summary.top_tags.slice(0, 8).map(([name, value], index) => ({
         name,
         value,
-        fill: COLORS[analysisData.top_tags.indexOf([name, value]) % COLORS.length]
+        fill: COLORS[index % COLORS.length]
       }));
 
       // 生成视频表现数据
@@ -403,7 +402,7 @@ const InteractiveCharts = () => {
       console.log('分区分布:', Array.from(new Set(videoPerformanceData.map(item => item.category)))); // 调试信息
 
       // 生成雷达图数据
-      const radarData = generateRadarData(analysisData);
+      const radarData = generateRadarData(summary.metrics);
 
       setChartsData({
         timeSeries: timeSeriesData,
@@ -445,9 +444,9 @@ const InteractiveCharts = () => {
   };
 
   // 生成雷达图数据
-  const generateRadarData = (analysisData) => {
+  const generateRadarData = (metrics) => {
     // 修复：将互动率转换为合理的0-100范围数值
-    const interactionScore = Math.min(Math.max(analysisData.avg_interaction_rate * 100, 0), 100);
+    const interactionScore = Math.min(Math.max(metrics.interaction_rate * 100, 0), 100);
     
     return [
       {
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { 
   Card, 
   Button, 
@@ -41,6 +41,10 @@ import './VideoAnalysis.css';
 
 const { Title, Text, Paragraph } = Typography;
 
+// 图表渲染状态轮询间隔与次数
+const CHART_POLL_INTERVAL = 2000;
+const CHART_POLL_ATTEMPTS = 30;
+
 const VideoAnalysis = () => {
   const [loading, setLoading] = useState(false);
   const [crawling, setCrawling] = useState(false);
@@ -54,6 +58,9 @@ const VideoAnalysis = () => {
     total: 0,
     totalPages: 0
   });
+  // 每页起始游标，cursorsRef.current[i]对应第i+1页
+  const cursorsRef = useRef([null]);
+  const chartTimerRef = useRef(null);
 
   // 获取分析数据
   const fetchAnalysis = async () => {
@@ -61,7 +68,12 @@ const VideoAnalysis = () => {
     try {
       const data = await videoAPI.getAnalysis();
       setAnalysis(data);
-      setChartUrl(videoAPI.getChart());
+      if (data.chart?.etag) {
+        setChartUrl(videoAPI.getChart(data.chart.etag));
+      }
+      if (data.chart?.pending) {
+        waitForChart();
+      }
       message.success('分析数据获取成功');
     } catch (error) {
       if (error.response?.status === 404) {
@@ -74,17 +86,45 @@ const VideoAnalysis = () => {
     }
   };
 
-  // 获取视频列表（支持分页）
+  // 图表在后台渲染，渲染完成后再加载新图表
+  const waitForChart = (attempt = 0) => {
+    clearTimeout(chartTimerRef.current);
+    chartTimerRef.current = setTimeout(async () => {
+      try {
+        const status = await videoAPI.getChartStatus();
+        if (status.etag) {
+          setChartUrl(videoAPI.getChart(status.etag));
+        }
+        if (status.pending && attempt < CHART_POLL_ATTEMPTS) {
+          waitForChart(attempt + 1);
+        }
+      } catch (error) {
+        console.error('获取图表状态失败:', error);
+      }
+    }, CHART_POLL_INTERVAL);
+  };
+
+  // 获取视频列表（游标分页）
   const fetchVideos = async (page = 1, pageSize = 10) => {
+    if (page === 1 || pageSize !== pagination.pageSize) {
+      // 回到第一页或修改每页条数时重新开始翻页
+      cursorsRef.current = [null];
+      page = 1;
+    }
+    // 游标分页只能逐页前进，跳转到未访问过的页时停在已知的最后一页
+    page = Math.min(page, cursorsRef.current.length);
+
     setLoading(true);
     try {
-      const response = await videoAPI.getVideos(page, pageSize);
+      const response = await videoAPI.getVideos(cursorsRef.current[page - 1], pageSize);
       
       // 检查响应格式
       if (response.data && response.pagination) {
-        // 新的分页格式
         setVideos(response.data);
-        setPagination(response.pagination);
+        if (response.pagination.nextCursor) {
+          cursorsRef.current[page] = response.pagination.nextCursor;
+        }
+        setPagination({ ...response.pagination, current: page });
       } else {
         // 旧的格式（向后兼容）
         setVideos(response);
@@ -148,6 +188,7 @@ const VideoAnalysis = () => {
   useEffect(() => {
     fetchAnalysis();
     fetchVideos(1, 10); // 明确指定第一页，每页10条
+    return () => clearTimeout(chartTimerRef.current);
   }, []);
 
   // 视频表格列定义
@@ -629,7 +670,6 @@ const VideoAnalysis = () => {
                     pageSize: pagination.pageSize,
                     total: pagination.total,
                     showSizeChanger: true,
-                    showQuickJumper: true,
                     showTotal: (total, range) => 
                       `第 ${range[0]}-${range[1]} 条，共 ${total} 条记录`,
                     onChange: handleTableChange,
@@ -40,19 +40,35 @@ export const videoAPI = {
   // 获取视频分析结果
   getAnalysis: () => api.get('/api/analysis/videos'),
   
-  // 获取分析图表
-  getChart: () => `${API_BASE_URL}/api/analysis/chart?t=${Date.now()}`,
+  // 获取分析图表（按ETag区分版本，图表未变化时浏览器使用缓存）
+  getChart: (etag) => `${API_BASE_URL}/api/analysis/chart?v=${encodeURIComponent(etag || '')}`,
+
+  // 获取图表渲染状态
+  getChartStatus: () => api.get('/api/analysis/chart/status'),
   
-  // 获取视频列表（支持分页）
-  getVideos: (page = 1, pageSize = 10, limit = null) => {
+  // 获取视频列表（游标分页，cursor为上一页返回的nextCursor）
+  getVideos: (cursor = null, pageSize = 10, limit = null) => {
     if (limit !== null) {
-      // 向后兼容，使用limit参数
+      // 只取最新的limit条
       return api.get(`/api/videos?limit=${limit}`);
     }
-    return api.get(`/api/videos?page=${page}&page_size=${pageSize}`);
+    const params = { page_size: pageSize };
+    if (cursor) {
+      params.cursor = cursor;
+    }
+    return api.get('/api/videos', { params });
   },
 };
 
+// 数据大屏相关API
+export const dashboardAPI = {
+  // 获取大屏汇总
+  getSummary: () => api.get('/api/dashboard/summary'),
+
+  // 大屏推送地址（Server-Sent Events）
+  getStreamUrl: () => `${API_BASE_URL}/api/dashboard/stream`,
+};
+
 // 用户数据相关API
 export const userAPI = {
   // 获取用户信息
@@ -32,22 +32,26 @@ CREATE TABLE IF NOT EXISTS videos (
     `desc` TEXT COMMENT '视频描述',
     ctime DATETIME COMMENT '创建时间',
     collected_at DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '采集时间',
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '最后更新时间',
     
     INDEX idx_mid (mid),
     INDEX idx_pubdate (pubdate),
     INDEX idx_tid (tid),
     INDEX idx_view (view),
-    INDEX idx_collected_at (collected_at)
+    INDEX idx_collected_at (collected_at),
+    INDEX idx_collected_bvid (collected_at, bvid) COMMENT '视频列表游标分页',
+    INDEX idx_updated_at (updated_at) COMMENT 'Arrow镜像增量刷新'
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='视频数据表';
 
 -- 创建用户数据表
 CREATE TABLE IF NOT EXISTS user_data (
-    id INT AUTO_INCREMENT PRIMARY KEY COMMENT '自增ID',
+    id INT AUTO_INCREMENT COMMENT '自增ID',
     user_mid VARCHAR(20) NOT NULL COMMENT '用户UID',
     data_type VARCHAR(50) NOT NULL COMMENT '数据类型(watch_history/favorites)',
     data_content JSON COMMENT '数据内容(JSON格式)',
-    created_at DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
     
+    PRIMARY KEY (id, created_at) COMMENT '包含分区列created_at',
     INDEX idx_user_mid (user_mid),
     INDEX idx_data_type (data_type),
     INDEX idx_created_at (created_at)
@@ -55,18 +59,22 @@ CREATE TABLE IF NOT EXISTS user_data (
 
 -- 创建系统日志表(可选)
 CREATE TABLE IF NOT EXISTS system_logs (
-    id INT AUTO_INCREMENT PRIMARY KEY COMMENT '自增ID',
+    id INT AUTO_INCREMENT COMMENT '自增ID',
     log_type VARCHAR(50) NOT NULL COMMENT '日志类型',
     log_level VARCHAR(20) DEFAULT 'INFO' COMMENT '日志级别',
     message TEXT COMMENT '日志消息',
     details JSON COMMENT '详细信息',
-    created_at DATETIME DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP COMMENT '创建时间',
     
+    PRIMARY KEY (id, created_at) COMMENT '包含分区列created_at',
     INDEX idx_log_type (log_type),
     INDEX idx_log_level (log_level),
     INDEX idx_created_at (created_at)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='系统日志表';
 
+-- user_data、system_logs、video_stat_snapshots、user_watch_events按月分区：
+-- 建表后在backend目录执行 python partitions.py setup，之后由定时任务维护分区与归档
+
 -- 插入一些示例数据(可选)
 -- INSERT INTO videos (bvid, title, author, view, `like`, pubdate, tname, collected_at) VALUES
 -- ('BV1234567890', '示例视频标题', '示例UP主', 10000, 500, NOW(), '生活', NOW());